@@ -0,0 +1,99 @@
+"""
+Meet de doorvoer van import_jsonl.py met 1, 2 en 4 workers op een synthetisch logbestand.
+Elke run importeert hetzelfde bestand in een nieuwe, lege database en rapporteert regels/s.
+Met --clock-jump springt de klok halverwege het bestand een uur terug, zodat ook het samenvoegen
+van overlappende bereiken wordt gemeten.
+
+De schaling over meerdere kernen is niet geverifieerd: het script is alleen op een machine met één
+kern gedraaid, waar extra workers alleen overhead toevoegen. Heeft de machine minder kernen dan
+workers, dan meldt het script dat de resultaten voor die aantallen niets over schaling zeggen.
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import import_jsonl
+
+def write_synthetic_log(path, lines, clock_jump=False):
+    """Schrijft een log in het formaat van de logger: een meting per 10 s, met wisselende timestamp-precisie."""
+    start = datetime(2024, 1, 1)
+    jump_at = lines // 2 if clock_jump else None
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            ts = start + timedelta(seconds=10 * i)
+            if jump_at is not None and i >= jump_at:
+                ts -= timedelta(hours=1)
+            if i % 3 == 0:
+                ts += timedelta(microseconds=123456)
+            f.write(json.dumps({
+                "timestamp": ts.isoformat(),
+                "data": {
+                    "active_power_w": (i * 37) % 4000 - 1500,
+                    "total_power_import_kwh": round(100 + i * 0.001, 3),
+                    "total_power_export_kwh": round(5 + i * 0.0005, 3),
+                },
+            }) + "\n")
+
+def run_import(log_path, db_path, workers):
+    """Importeert het log in een nieuwe database. Retourneert (verwerkt, toegevoegd, seconden)."""
+    conn = sqlite3.connect(db_path)
+    for pragma, value in import_jsonl.IMPORT_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    conn.execute('''
+        CREATE TABLE metingen (
+            timestamp REAL PRIMARY KEY,
+            active_power_w REAL,
+            total_power_import_kwh REAL,
+            total_power_export_kwh REAL
+        )
+    ''')
+    import_jsonl.create_manifest_table(conn)
+    conn.commit()
+
+    # De pool wordt vooraf gestart: het opstarten van de processen hoort niet bij de doorvoer
+    pool = import_jsonl.create_worker_pool(workers)
+    try:
+        start = time.perf_counter()
+        processed, inserted, _ = import_jsonl.import_file(conn, "metingen", log_path, pool)
+        elapsed = time.perf_counter() - start
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        conn.close()
+    return processed, inserted, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Meet de importsnelheid van import_jsonl.py voor 1, 2 en 4 workers.")
+    parser.add_argument('--lines', type=int, default=500000, help="Aantal regels in het synthetische log (standaard 500000).")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Aantallen workers om te meten (standaard 1 2 4).")
+    parser.add_argument('--clock-jump', action='store_true', help="Laat de klok halverwege het log een uur terugspringen.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'p1.jsonl')
+        write_synthetic_log(log_path, args.lines, args.clock_jump)
+        size_mb = os.path.getsize(log_path) / 1e6
+        print(f"Synthetisch log: {args.lines} regels, {size_mb:.1f} MB, {os.cpu_count()} CPU-kernen")
+
+        cpu_count = os.cpu_count() or 1
+        if max(args.workers) > cpu_count:
+            print(f"Let op: {cpu_count} CPU-kern(en) voor maximaal {max(args.workers)} workers; "
+                  f"voor meer workers dan kernen meet dit alleen de overhead, niet de schaling.")
+        baseline = None
+        for workers in args.workers:
+            db_path = os.path.join(tmp, f'p1_{workers}.db')
+            processed, inserted, elapsed = run_import(log_path, db_path, workers)
+            rate = processed / max(elapsed, 1e-9)
+            baseline = baseline or rate
+            print(f"  {workers} worker(s): {processed} regels, {inserted} toegevoegd in {elapsed:.2f} s "
+                  f"({rate:.0f} regels/s, {rate / baseline:.2f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Meet het uitdunnen van daggrafieken (downsample_day_dataset, LTTB) voor de verschillende binbreedtes:
+de rekentijd met en zonder NumPy en de grootte van het JSON-antwoord met en zonder uitdunnen.
+Met de standaardbins van 5 minuten (288 punten) past een dag binnen het budget en wordt er niets uitgedund.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import generate_P1_dashboard as g
+
+def make_day_dataset(bin_minutes, seed=1):
+    """Een synthetische daggrafiek: ruis rond een basisverbruik, teruglevering midden op de dag, pieken en een gat."""
+    rng = random.Random(seed)
+    count = 24 * 60 // bin_minutes
+    labels, imports, exports = [], [], []
+    for i in range(count):
+        minute = i * bin_minutes
+        labels.append(f"{minute // 60:02d}:{minute % 60:02d}")
+        if 3 * 60 <= minute < 4 * 60:
+            imports.append(None)
+            exports.append(None)
+            continue
+        net = abs(rng.gauss(300, 100)) + (2500 if rng.random() < 0.01 else 0)
+        if 10 * 60 <= minute < 16 * 60:
+            net -= 1200
+        imports.append(max(net, 0.0))
+        exports.append(max(-net, 0.0))
+    return {"labels": labels, "imports": imports, "exports": exports,
+            "total_import": 8.0, "total_export": 4.0, "title": "synthetisch", "type": "line"}
+
+def time_downsample(dataset, points, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sampled = g.downsample_day_dataset(dataset, points)
+    return (time.perf_counter() - start) / repeat, sampled
+
+def main():
+    parser = argparse.ArgumentParser(description="Meet LTTB-uitdunnen van daggrafieken per binbreedte.")
+    parser.add_argument('--bins', type=int, nargs='+', default=[1, 2, 5], help="Binbreedtes in minuten (standaard 1 2 5).")
+    parser.add_argument('--points', type=int, default=g.DAY_POINT_BUDGET, help=f"Puntenbudget (standaard {g.DAY_POINT_BUDGET}).")
+    parser.add_argument('--repeat', type=int, default=50, help="Aantal herhalingen per meting (standaard 50).")
+    args = parser.parse_args()
+
+    numpy_module = g.np
+    print(f"Budget: {args.points} punten, NumPy {'beschikbaar' if numpy_module is not None else 'niet beschikbaar'}")
+    for bin_minutes in args.bins:
+        dataset = make_day_dataset(bin_minutes)
+        full_bytes = len(json.dumps(dataset))
+        timings = {}
+        for label, module in (("NumPy", numpy_module), ("Python", None)):
+            if label == "NumPy" and module is None:
+                continue
+            g.np = module
+            timings[label], sampled = time_downsample(dataset, args.points, args.repeat)
+        g.np = numpy_module
+
+        thinned = len(sampled["labels"]) < len(dataset["labels"])
+        times = ", ".join(f"{label} {seconds * 1000:.2f} ms" for label, seconds in timings.items())
+        print(f"  bins van {bin_minutes} min: {len(dataset['labels'])} -> {len(sampled['labels'])} punten"
+              f"{'' if thinned else ' (niet uitgedund)'}, {times}, "
+              f"JSON {full_bytes / 1000:.1f} kB -> {len(json.dumps(sampled)) / 1000:.1f} kB, "
+              f"f32 {len(json.dumps(g.encode_day_dataset(sampled))) / 1000:.1f} kB")
+
+if __name__ == '__main__':
+    main()
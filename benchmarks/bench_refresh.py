@@ -0,0 +1,72 @@
+"""
+Meet de tijd van een warme refresh (één nieuwe meting, een nieuwe engine na een eerste refresh) bij een
+groeiende meetgeschiedenis. tests/test_refresh_cost.py controleert dat de SQL-kosten gelijk blijven;
+hier is te zien hoeveel het opbouwen van de overzichten in Python met het aantal dagen groeit.
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import generate_P1_dashboard as g
+
+SAMPLE_SECONDS = 120
+START_TS = 1704063600  # 1 januari 2024, lokale middernacht
+
+def fill_db(path, days):
+    """Een v1-database met een meting per SAMPLE_SECONDS gedurende `days` dagen."""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE metingen (
+            timestamp REAL PRIMARY KEY,
+            active_power_w REAL,
+            total_power_import_kwh REAL,
+            total_power_export_kwh REAL
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO metingen
+        WITH RECURSIVE r(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM r WHERE i < ?)
+        SELECT ? + i * ?, 200 + i % 97 * 10, 1000 + i * 0.002, 500 + i * 0.0005 FROM r
+    ''', (days * 86400 // SAMPLE_SECONDS - 1, START_TS, SAMPLE_SECONDS))
+    conn.commit()
+    return conn
+
+def time_warm_refresh(tmp, days, repeat):
+    """Retourneert de snelste van `repeat` warme refreshes in seconden."""
+    db_path = os.path.join(tmp, f'p1_{days}.db')
+    output_path = os.path.join(tmp, f'dashboard_{days}', 'energie_dashboard.html')
+    conn = fill_db(db_path, days)
+    g.get_db_path = lambda: db_path
+    g.DashboardEngine(output_path).refresh()
+
+    best = None
+    for _ in range(repeat):
+        ts, power, import_kwh, export_kwh = conn.execute("SELECT * FROM metingen ORDER BY timestamp DESC LIMIT 1").fetchone()
+        conn.execute("INSERT INTO metingen VALUES (?, ?, ?, ?)", (ts + SAMPLE_SECONDS, power, import_kwh + 0.002, export_kwh))
+        conn.commit()
+        # Een nieuwe engine begint vanaf de opgeslagen stand in de database, zoals na een herstart van de server
+        engine = g.DashboardEngine(output_path)
+        start = time.perf_counter()
+        engine.refresh()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    conn.close()
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Meet de tijd van een warme refresh bij een groeiende meetgeschiedenis.")
+    parser.add_argument('--days', type=int, nargs='+', default=[20, 200], help="Aantallen dagen meetgeschiedenis (standaard 20 200).")
+    parser.add_argument('--repeat', type=int, default=5, help="Aantal refreshes per meting, de snelste telt (standaard 5).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for days in args.days:
+            seconds = time_warm_refresh(tmp, days, args.repeat)
+            print(f"  {days} dagen ({days * 86400 // SAMPLE_SECONDS} metingen): warme refresh in {seconds * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+'''
+Dit script dunt oude metingen in `p1_data.db` uit (retentie in twee lagen):
+- metingen van de laatste `--keep-days` dagen blijven op volle resolutie staan;
+- van oudere metingen blijven per blok van 5 of 15 minuten alleen de eerste en de laatste
+  meting over, met hun meterstanden. Het minimum, gemiddelde en maximum vermogen van alle
+  metingen in het blok wordt bewaard in de tabel "metingen_compact".
+
+Omdat de eerste en laatste meterstand van elk blok blijven staan, telt het verschil tussen die
+twee op tot precies de som van de tussenliggende verschillen. Dag-, week-, maand- en jaartotalen
+blijven daardoor gelijk. Blokken met een meterreset (dalende meterstand) worden niet uitgedund.
+Met --dry-run wordt alleen gerapporteerd hoeveel rijen en bytes er vrij zouden komen.
+'''
+
+import os
+import time
+import sqlite3
+import argparse
+from datetime import date, datetime, timedelta
+
+# --- CONFIGURATIE ---
+
+# Bepaal database pad dynamisch
+if os.path.isdir("/data/data/com.termux/files/home"): # Check if on Termux
+    DB_PATH = os.path.join(os.path.expanduser('~'), 'p1_data.db')
+else: # Fallback for other environments (e.g., Windows)
+    DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'p1_data.db'))
+
+TABLE_NAME = "metingen"
+COMPACT_TABLE_NAME = "metingen_compact"
+# Zie BLOK 2.1 van generate_P1_dashboard.py
+ROLLUP_STATE_TABLE = "rollup_state"
+GENERATION_TABLE = "metingen_generatie"
+
+KEEP_DAYS = 90
+BUCKET_MINUTES = 15
+
+# Metingen worden per dag (UTC) gelezen, uitgedund en gecommit
+WINDOW_SECONDS = 86400
+
+# Kolommen per schemaversie (zie migrate_schema_v2.py); alleen volledige metingen tellen mee
+MEASUREMENT_COLUMNS = {
+    1: ("total_power_import_kwh", "total_power_export_kwh",
+        "active_power_w IS NOT NULL AND total_power_import_kwh IS NOT NULL AND total_power_export_kwh IS NOT NULL"),
+    2: ("import_wh", "export_wh", "1"),
+}
+
+
+def get_schema_version(conn):
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE_NAME})")}
+    if not columns:
+        return 0
+    return 2 if "import_wh" in columns else 1
+
+
+def get_file_size(db_path):
+    return sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+
+
+def create_compact_table(conn):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {COMPACT_TABLE_NAME} (
+            bucket_start INTEGER PRIMARY KEY,
+            first_ts REAL NOT NULL,
+            last_ts REAL NOT NULL,
+            sample_count INTEGER NOT NULL,
+            min_active_power_w REAL NOT NULL,
+            mean_active_power_w REAL NOT NULL,
+            max_active_power_w REAL NOT NULL
+        )
+    ''')
+
+
+def table_bytes_per_row(conn):
+    """
+    Schat het aantal bytes per meting in de metingen-tabel (inclusief index).
+    Gebruikt de dbstat-tabel als SQLite daarmee gebouwd is, anders de grootte van het hele bestand.
+    """
+    row_count = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+    if not row_count:
+        return 0.0
+    try:
+        table_bytes = conn.execute('''
+            SELECT SUM(pgsize) FROM dbstat
+            WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = ?)
+        ''', (TABLE_NAME,)).fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        table_bytes = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+    return table_bytes / row_count
+
+
+def bump_generation(conn):
+    """
+    Verhoogt de generatie van de metingen, zodat het dashboard zijn opgeslagen dagreeksen opnieuw berekent.
+    Retourneert de nieuwe generatie.
+    """
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {GENERATION_TABLE} (
+            source_table TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL
+        )
+    ''')
+    conn.execute(f'''
+        INSERT INTO {GENERATION_TABLE} (source_table, generation) VALUES (?, 1)
+        ON CONFLICT(source_table) DO UPDATE SET generation = generation + 1
+    ''', (TABLE_NAME,))
+    return conn.execute(f"SELECT generation FROM {GENERATION_TABLE} WHERE source_table = ?", (TABLE_NAME,)).fetchone()[0]
+
+
+def has_rollup_generation(conn):
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ROLLUP_STATE_TABLE,)).fetchone()
+    return bool(exists) and "generation" in {row[1] for row in conn.execute(f"PRAGMA table_info({ROLLUP_STATE_TABLE})")}
+
+
+def plan_buckets(rows, bucket_seconds, existing):
+    """
+    Deelt de metingen (timestamp, vermogen, import, export) van één venster op in blokken.
+    `existing` bevat de samenvattingen die een eerdere run al voor deze blokken heeft opgeslagen.
+    Retourneert (te verwijderen timestamps, samenvattingen, aantal overgeslagen blokken met meterreset).
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(int(row[0] // bucket_seconds), []).append(row)
+
+    delete_ts = []
+    summaries = []
+    skipped = 0
+    for bucket, group in groups.items():
+        if len(group) <= 2:
+            continue
+        if any(b[2] < a[2] or b[3] < a[3] for a, b in zip(group, group[1:])):
+            skipped += 1
+            continue
+
+        delete_ts.extend((row[0],) for row in group[1:-1])
+
+        # Bij een eerder uitgedund blok zitten de bewaarde randmetingen al in de oude samenvatting
+        previous = existing.get(bucket)
+        if previous is not None:
+            powers = [row[1] for row in group if row[0] not in (previous["first_ts"], previous["last_ts"])]
+        else:
+            powers = [row[1] for row in group]
+        summary = {
+            "bucket_start": bucket * bucket_seconds,
+            "first_ts": group[0][0],
+            "last_ts": group[-1][0],
+            "sample_count": len(powers),
+            "min": min(powers),
+            "sum": sum(powers),
+            "max": max(powers),
+        }
+        if previous is not None:
+            summary["sample_count"] += previous["sample_count"]
+            summary["min"] = min(summary["min"], previous["min"])
+            summary["sum"] += previous["mean"] * previous["sample_count"]
+            summary["max"] = max(summary["max"], previous["max"])
+        summaries.append(summary)
+
+    return delete_ts, summaries, skipped
+
+
+def compact_metingen(db_path=DB_PATH, keep_days=KEEP_DAYS, bucket_minutes=BUCKET_MINUTES, dry_run=False, vacuum=False):
+    """
+    Dunt de metingen ouder dan `keep_days` dagen uit tot de eerste en laatste meting per blok
+    van `bucket_minutes` minuten. Retourneert het aantal (te) verwijderen rijen.
+    """
+    print(f"--- Start Uitdunnen Metingen{' (dry-run)' if dry_run else ''} ---")
+    if not os.path.exists(db_path):
+        print(f"Fout: Database '{db_path}' niet gevonden.")
+        return 0
+
+    conn = sqlite3.connect(db_path, timeout=120)
+    version = get_schema_version(conn)
+    if version == 0:
+        print(f"Fout: Tabel '{TABLE_NAME}' bestaat niet in '{db_path}'.")
+        conn.close()
+        return 0
+
+    import_column, export_column, not_null_sql = MEASUREMENT_COLUMNS[version]
+    bucket_seconds = bucket_minutes * 60
+    # Volle dagen bewaren: grens op lokale middernacht
+    cutoff_date = date.today() - timedelta(days=keep_days)
+    cutoff_ts = datetime(cutoff_date.year, cutoff_date.month, cutoff_date.day).timestamp()
+    # Alle tijdzones wijken een veelvoud van 15 minuten af van UTC, dus een blok valt nooit over een lokale
+    # dag- of uurgrens. De grens zelf wordt naar beneden afgerond zodat er geen half blok uitgedund wordt.
+    cutoff_ts = cutoff_ts // bucket_seconds * bucket_seconds
+
+    size_before = get_file_size(db_path)
+    bytes_per_row = table_bytes_per_row(conn)
+    rows_before = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+    first_ts = conn.execute(f"SELECT MIN(timestamp) FROM {TABLE_NAME}").fetchone()[0]
+
+    if not dry_run:
+        create_compact_table(conn)
+    has_compact_table = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (COMPACT_TABLE_NAME,)).fetchone()
+    track_rollups = has_rollup_generation(conn)
+    conn.commit()
+
+    print(f"Metingen vóór {cutoff_date} worden uitgedund tot blokken van {bucket_minutes} minuten.")
+    removed = 0
+    compacted_buckets = 0
+    skipped_buckets = 0
+    start_time = time.perf_counter()
+    window_start = first_ts // WINDOW_SECONDS * WINDOW_SECONDS if first_ts is not None else cutoff_ts
+    while window_start < cutoff_ts:
+        window_end = min(window_start + WINDOW_SECONDS, cutoff_ts)
+        rows = conn.execute(f'''
+            SELECT timestamp, active_power_w, {import_column}, {export_column} FROM {TABLE_NAME}
+            WHERE timestamp >= ? AND timestamp < ? AND {not_null_sql}
+            ORDER BY timestamp ASC
+        ''', (window_start, window_end)).fetchall()
+
+        existing = {}
+        if has_compact_table and rows:
+            for bucket_start, first, last, count, low, mean, high in conn.execute(f'''
+                SELECT bucket_start, first_ts, last_ts, sample_count, min_active_power_w, mean_active_power_w, max_active_power_w
+                FROM {COMPACT_TABLE_NAME} WHERE bucket_start >= ? AND bucket_start < ?
+            ''', (window_start, window_end)):
+                existing[bucket_start // bucket_seconds] = {
+                    "first_ts": first, "last_ts": last, "sample_count": count, "min": low, "mean": mean, "max": high,
+                }
+
+        delete_ts, summaries, skipped = plan_buckets(rows, bucket_seconds, existing)
+        removed += len(delete_ts)
+        compacted_buckets += len(summaries)
+        skipped_buckets += skipped
+
+        if delete_ts and not dry_run:
+            conn.executemany(f"DELETE FROM {TABLE_NAME} WHERE timestamp = ?", delete_ts)
+            conn.executemany(f'''
+                INSERT OR REPLACE INTO {COMPACT_TABLE_NAME}
+                    (bucket_start, first_ts, last_ts, sample_count, min_active_power_w, mean_active_power_w, max_active_power_w)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (s["bucket_start"], s["first_ts"], s["last_ts"], s["sample_count"], s["min"], s["sum"] / s["sample_count"], s["max"])
+                for s in summaries
+            ])
+            # De totalen blijven gelijk, dus rollups die bij de vorige generatie hoorden blijven geldig;
+            # alleen de dagreeksen worden opnieuw berekend
+            generation = bump_generation(conn)
+            if track_rollups:
+                conn.execute(f'''
+                    UPDATE {ROLLUP_STATE_TABLE} SET generation = ? WHERE source_table = ? AND generation = ?
+                ''', (generation, TABLE_NAME, generation - 1))
+            conn.commit()
+
+        window_start = window_end
+
+    elapsed = time.perf_counter() - start_time
+
+    if vacuum and removed and not dry_run:
+        print("Vrijgekomen ruimte teruggeven aan het bestandssysteem (VACUUM)...")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size_after = get_file_size(db_path)
+    conn.close()
+
+    print(f"\n--- Uitdunnen {'Gesimuleerd' if dry_run else 'Voltooid'} ({elapsed:.1f} s) ---")
+    print(f"Rijen:                   {rows_before} -> {rows_before - removed} ({removed} {'te verwijderen' if dry_run else 'verwijderd'})")
+    print(f"Uitgedunde blokken:      {compacted_buckets}")
+    print(f"Overgeslagen (reset):    {skipped_buckets}")
+    print(f"Vrij te maken ruimte:    ~{removed * bytes_per_row / 1e6:.1f} MB")
+    if not dry_run:
+        print(f"Bestandsgrootte:         {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+        if not vacuum:
+            print("Vrijgekomen pagina's worden hergebruikt; gebruik --vacuum om het bestand te verkleinen.")
+    return removed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dunt oude metingen uit tot de eerste en laatste meting per blok.")
+    parser.add_argument('--keep-days', type=int, default=KEEP_DAYS, help="Aantal dagen dat op volle resolutie bewaard blijft.")
+    parser.add_argument('--bucket-minutes', type=int, default=BUCKET_MINUTES, choices=(5, 15), help="Blokgrootte in minuten voor oudere metingen.")
+    parser.add_argument('--dry-run', action='store_true', help="Rapporteer alleen hoeveel rijen en bytes er vrij zouden komen.")
+    parser.add_argument('--vacuum', action='store_true', help="Verklein het databasebestand na het uitdunnen (VACUUM).")
+    args = parser.parse_args()
+    compact_metingen(keep_days=args.keep_days, bucket_minutes=args.bucket_minutes, dry_run=args.dry_run, vacuum=args.vacuum)
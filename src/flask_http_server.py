@@ -1,58 +1,572 @@
 import os
 import sys
-import subprocess
-from flask import Flask, send_from_directory, jsonify
+import json
+import math
+import mmap
+import mimetypes
+import time
+import struct
+import sqlite3
+import argparse
+import threading
+import collections
+from datetime import datetime
+from flask import Flask, Response, send_file, jsonify, request
+from werkzeug.security import safe_join
 
 # --- Configuratie met Vaste Paden voor Termux ---
 # Dit script is aangepast om te werken wanneer het, samen met het generatie-script,
 # in de Termux home directory staat: /data/data/com.termux/files/home/
 
-# Pad naar het script dat het dashboard genereert.
+# Pad naar het script dat het dashboard genereert. Het wordt als module geïmporteerd.
 SCRIPT_TO_RUN = '/data/data/com.termux/files/home/generate_P1_dashboard.py'
 
 # Pad naar de map waar de uiteindelijke 'energie_dashboard.html' wordt opgeslagen.
 OUTPUT_DIR = '/data/data/com.termux/files/home/p1logs/'
+DASHBOARD_FILE = 'energie_dashboard.html'
+# Het databestand en de map met onveranderlijke bestanden die de generator naast het dashboard schrijft
+DATA_FILE = 'energie_dashboard.json'
+STATIC_DIR = 'static'
+# Bestanden in STATIC_DIR hebben een inhoudshash in hun naam en mogen een jaar in de browser blijven
+STATIC_MAX_AGE_S = 365 * 24 * 3600
+
+# Automatisch vernieuwen bij nieuwe metingen: hoe vaak de database gecontroleerd wordt, hoe lang het
+# na de laatste wijziging stil moet zijn (debounce) en de minimale tijd tussen twee refreshes.
+AUTO_REFRESH_POLL_S = 5.0
+AUTO_REFRESH_DEBOUNCE_S = 15.0
+AUTO_REFRESH_MIN_INTERVAL_S = 60.0
+
+# Live metingen (/api/live): hoe vaak de database op nieuwe commits gecontroleerd wordt, het interval van de
+# heartbeat zonder nieuwe metingen en na hoeveel milliseconden de browser opnieuw verbinding maakt.
+LIVE_POLL_S = 1.0
+LIVE_HEARTBEAT_S = 15.0
+LIVE_RETRY_MS = 5000
+
+# Ringbuffer met de recente metingen op volle resolutie, bijgehouden door termux/p1_sql_logger.py --daemon.
+# Zelfde locatie en indeling als in de logger.
+RECENT_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else os.path.expanduser('~')
+RECENT_PATH = os.path.join(RECENT_DIR, 'p1_recent.bin')
+RECENT_MAGIC = b"P1RB"
+RECENT_VERSION = 1
+RECENT_HEADER = struct.Struct("<4sIIIQ8x")
+RECENT_COUNT = struct.Struct("<Q")
+RECENT_COUNT_OFFSET = 16
+RECENT_RECORD = struct.Struct("<dddd")
+
+if os.path.isdir(os.path.dirname(SCRIPT_TO_RUN)):
+    sys.path.insert(0, os.path.dirname(SCRIPT_TO_RUN))
+import generate_P1_dashboard
+
+# Eén engine voor de hele levensduur van de server: de aggregaties blijven in het geheugen,
+# zodat een refresh alleen de nieuwe metingen verwerkt.
+engine = generate_P1_dashboard.DashboardEngine(os.path.join(OUTPUT_DIR, DASHBOARD_FILE))
+
+# Status van de achtergrond-refresh. Er draait hooguit één refresh tegelijk; verzoeken tijdens een
+# lopende refresh sluiten daarbij aan. `run` telt de gestarte refreshes.
+refresh_lock = threading.Lock()
+refresh_status = {
+    "state": "idle",  # idle, running, success of error
+    "stage": None,
+    "run": 0,
+    "started_at": None,
+    "finished_at": None,
+    "last_error": None,
+}
+
+
+def set_refresh_stage(stage):
+    with refresh_lock:
+        refresh_status["stage"] = stage
+
+
+def run_refresh():
+    try:
+        engine.refresh(progress=set_refresh_stage)
+        error = None
+    except Exception as e:
+        error = f"Fout bij het genereren van het dashboard: {e}"
+    with refresh_lock:
+        refresh_status.update(state="error" if error else "success", stage=None, finished_at=time.time())
+        if error:
+            refresh_status["last_error"] = error
+
+
+def start_refresh():
+    """
+    Start een refresh op de achtergrond, of sluit aan bij de refresh die al loopt.
+    Retourneert het nummer van de refresh waarop gewacht moet worden.
+    """
+    with refresh_lock:
+        if refresh_status["state"] != "running":
+            refresh_status.update(state="running", stage="starten", started_at=time.time(), finished_at=None)
+            refresh_status["run"] += 1
+            threading.Thread(target=run_refresh, daemon=True).start()
+        return refresh_status["run"]
+
+
+def get_refresh_status():
+    with refresh_lock:
+        status = dict(refresh_status)
+    if status["started_at"] is not None:
+        status["elapsed_s"] = round((status["finished_at"] or time.time()) - status["started_at"], 3)
+    return status
+
+
+def has_new_measurements(conn):
+    # MAX(timestamp) komt direct uit de index op timestamp
+    max_ts = conn.execute(f"SELECT MAX(timestamp) FROM {generate_P1_dashboard.table_name}").fetchone()[0]
+    return max_ts is not None and (engine.last_ts is None or max_ts > engine.last_ts)
+
+
+def watch_database(poll_s=AUTO_REFRESH_POLL_S, debounce_s=AUTO_REFRESH_DEBOUNCE_S,
+                   min_interval_s=AUTO_REFRESH_MIN_INTERVAL_S, stop_event=None):
+    """
+    Controleert elke `poll_s` seconden met PRAGMA data_version of er in de database gecommit is.
+    Alleen als er daarbij metingen nieuwer dan de laatst verwerkte zijn bijgekomen, wordt een refresh
+    gestart: zodra het `debounce_s` seconden stil is na de laatste wijziging (of de wijzigingen al
+    `min_interval_s` seconden wachten), en nooit binnen `min_interval_s` seconden na de vorige refresh.
+    """
+    stop_event = stop_event or threading.Event()
+    conn = None
+    last_version = None
+    pending_since = None
+    last_change = None
+    while not stop_event.wait(poll_s):
+        with refresh_lock:
+            running = refresh_status["state"] == "running"
+            last_started = refresh_status["started_at"]
+        if running:
+            # De refresh schrijft zelf ook naar de database; daarna opnieuw kijken
+            continue
+
+        try:
+            if conn is None:
+                conn = sqlite3.connect(generate_P1_dashboard.get_db_path())
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            now = time.monotonic()
+            if version != last_version:
+                last_version = version
+                if has_new_measurements(conn):
+                    last_change = now
+                    pending_since = pending_since or now
+        except (FileNotFoundError, sqlite3.Error) as e:
+            print(f"Database kon niet gecontroleerd worden: {e}")
+            if conn is not None:
+                conn.close()
+            conn = None
+            last_version = None
+            continue
+
+        if pending_since is None:
+            continue
+        settled = now - last_change >= debounce_s or now - pending_since >= max(debounce_s, min_interval_s)
+        if settled and (last_started is None or time.time() - last_started >= min_interval_s):
+            start_refresh()
+            pending_since = None
+            last_change = None
+
+    if conn is not None:
+        conn.close()
+
+
+# Alleen-lezen mapping van de ringbuffer als (inode, mmap, capaciteit); wordt hergebruikt tot de logger een
+# nieuw bestand op dezelfde plaats zet. Een oude mapping wordt niet gesloten maar losgelaten, omdat een
+# andere thread er nog uit kan lezen.
+recent_lock = threading.Lock()
+recent_map = None
+
+
+def open_recent_buffer():
+    """
+    Retourneert de ringbuffer van de logger als (mmap, capaciteit), of None als die er (nog) niet is.
+    """
+    global recent_map
+    with recent_lock:
+        try:
+            inode = os.stat(RECENT_PATH).st_ino
+        except FileNotFoundError:
+            recent_map = None
+            return None
+        if recent_map is not None and recent_map[0] == inode:
+            return recent_map[1:]
+
+        recent_map = None
+        with open(RECENT_PATH, "rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            size = os.fstat(f.fileno()).st_size
+            if size < RECENT_HEADER.size:
+                return None
+            view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, capacity, record_size, _count = RECENT_HEADER.unpack_from(view)
+        if (magic, version, record_size) != (RECENT_MAGIC, RECENT_VERSION, RECENT_RECORD.size) \
+                or size != RECENT_HEADER.size + capacity * record_size:
+            return None
+        recent_map = (inode, view, capacity)
+        return view, capacity
+
+
+def read_recent(view, capacity, after_seq=0):
+    """
+    Leest de metingen met volgnummer >= `after_seq` direct uit de gemapte ringbuffer, zonder lock en zonder
+    de buffer te kopiëren. Records die de logger tijdens het lezen opnieuw beschreven kan hebben vallen af.
+    Retourneert (volgend volgnummer, metingen als [timestamp, active_w, import_kwh, export_kwh]).
+    """
+    count = RECENT_COUNT.unpack_from(view, RECENT_COUNT_OFFSET)[0]
+    if after_seq > count:
+        # De logger is met een nieuwe buffer begonnen
+        after_seq = 0
+    first = max(after_seq, count - capacity)
+    start_slot = first % capacity
+    end_slot = start_slot + count - first
+    segments = [(start_slot, end_slot)] if end_slot <= capacity else [(start_slot, capacity), (0, end_slot - capacity)]
+
+    buffer = memoryview(view)
+    records = []
+    for begin, end in segments:
+        records.extend(RECENT_RECORD.iter_unpack(buffer[RECENT_HEADER.size + begin * RECENT_RECORD.size:
+                                                        RECENT_HEADER.size + end * RECENT_RECORD.size]))
+
+    # Record `seq` is veilig zolang de logger nog niet aan `seq + capacity` begonnen kan zijn
+    count_after = RECENT_COUNT.unpack_from(view, RECENT_COUNT_OFFSET)[0]
+    records = records[max(0, count_after - capacity + 1 - first):]
+    # Zelfde eenheden als generate_P1_dashboard.read_readings(); metingen zonder vermogen overslaan
+    readings = [[ts, power / 10.0, import_kwh, export_kwh]
+                for ts, power, import_kwh, export_kwh in records if not math.isnan(power)]
+    return count, readings
+
+
+# Buffer met de metingen van de laatste LIVE_WINDOW_MINUTES minuten als kant-en-klare SSE-berichten, oplopend
+# op timestamp. Eén thread vult de buffer; elke verbonden browser schrijft alleen deze bytes naar zijn socket.
+live_condition = threading.Condition()
+live_events = collections.deque()
+live_window_s = generate_P1_dashboard.LIVE_WINDOW_MINUTES * 60
+
+
+def encode_live_event(reading):
+    ts, active_w, import_kwh, export_kwh = reading
+    record = generate_P1_dashboard.last_record({
+        "ts": datetime.fromtimestamp(ts),
+        "active_w": active_w,
+        "import_kwh": import_kwh,
+        "export_kwh": export_kwh,
+    })
+    return f"id: {ts!r}\nevent: meting\ndata: {json.dumps(record)}\n\n".encode("utf-8")
+
+
+def publish_live(readings):
+    cutoff = readings[-1][0] - live_window_s
+    events = [(reading[0], encode_live_event(reading)) for reading in readings if reading[0] >= cutoff]
+    with live_condition:
+        live_events.extend(events)
+        while live_events[0][0] < cutoff:
+            live_events.popleft()
+        live_condition.notify_all()
+
+
+def live_events_after(last_id):
+    # Aanroepen met live_condition vast; van achteren zoeken kost alleen het aantal nieuwe berichten
+    chunk = []
+    for ts, message in reversed(live_events):
+        if ts <= last_id:
+            break
+        chunk.append((ts, message))
+    chunk.reverse()
+    return chunk
+
+
+def watch_live(poll_s=LIVE_POLL_S, stop_event=None):
+    """
+    Zet nieuwe metingen in de live buffer. Houdt de logger een ringbuffer bij, dan komen ze daaruit, op volle
+    resolutie; anders uit de database zodra de logger gecommit heeft. PRAGMA data_version verandert alleen na
+    een commit van een andere verbinding, dus zonder nieuwe metingen kost een poll één pragma.
+    Bij de start wordt de buffer gevuld met de laatste LIVE_WINDOW_MINUTES minuten.
+    """
+    stop_event = stop_event or threading.Event()
+    conn = None
+    last_version = None
+    last_ts = None
+    recent_seq = 0
+    while True:
+        try:
+            recent = open_recent_buffer()
+            if recent is not None:
+                recent_seq, readings = read_recent(*recent, recent_seq)
+                readings = [reading for reading in readings if last_ts is None or reading[0] > last_ts]
+            else:
+                readings = []
+                if conn is None:
+                    conn = sqlite3.connect(generate_P1_dashboard.get_db_path())
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if version != last_version:
+                    last_version = version
+                    if last_ts is None:
+                        max_ts = conn.execute(f"SELECT MAX(timestamp) FROM {generate_P1_dashboard.table_name}").fetchone()[0]
+                        last_ts = None if max_ts is None else max_ts - live_window_s
+                    if last_ts is not None:
+                        readings = generate_P1_dashboard.read_readings(conn, last_ts)
+            if readings:
+                last_ts = readings[-1][0]
+                publish_live(readings)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Nieuwe metingen konden niet gelezen worden: {e}")
+            if conn is not None:
+                conn.close()
+            conn = None
+            last_version = None
+
+        if stop_event.wait(poll_s):
+            break
+
+    if conn is not None:
+        conn.close()
 
 
 # --- Flask Applicatie ---
-app = Flask(__name__)
+# De eigen /static-route van Flask is niet nodig; /static serveert de bestanden van de generator
+app = Flask(__name__, static_folder=None)
+
+def read_content_hash(html_path):
+    # De generator schrijft naast het HTML-bestand een .sha256 met de hash van de inhoud
+    try:
+        with open(html_path + ".sha256", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def send_generated(path, mimetype, max_age=None):
+    """
+    Serveert een bestand van de generator. De inhoudshash uit `path`.sha256 dient als sterke ETag: een browser die
+    het bestand al heeft krijgt een 304 Not Modified, en accepteert de browser gzip dan wordt de voorgecomprimeerde
+    versie gestuurd. Met `max_age` (seconden) mag de browser het bestand zo lang bewaren zonder na te vragen.
+    Geeft een FileNotFoundError als het bestand niet bestaat.
+    """
+    content_hash = read_content_hash(path)
+    use_gzip = content_hash is not None and request.accept_encodings["gzip"] > 0 and os.path.exists(path + ".gz")
+    if content_hash is None:
+        # Bestand van een oudere generator zonder hash: zonder ETag serveren
+        return send_file(path, mimetype=mimetype, max_age=max_age)
+
+    # Elke representatie heeft een eigen sterke ETag
+    response = send_file(
+        path + ".gz" if use_gzip else path,
+        mimetype=mimetype,
+        etag=f"{content_hash}-gzip" if use_gzip else content_hash,
+        conditional=True,
+        max_age=max_age,
+    )
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
 
 @app.route('/')
 def index():
     """
-    Deze functie serveert het 'energie_dashboard.html' bestand.
+    Deze functie serveert het 'energie_dashboard.html' bestand: de shell die naar de stylesheet, het script
+    en Chart.js in /static verwijst. Die verandert alleen met de code, dus meestal volstaat een 304.
     """
     if not os.path.exists(OUTPUT_DIR):
         return f"Fout: De output map ({OUTPUT_DIR}) bestaat niet.", 404
+
     try:
-        return send_from_directory(OUTPUT_DIR, 'energie_dashboard.html')
+        response = send_generated(os.path.join(OUTPUT_DIR, DASHBOARD_FILE), "text/html")
     except FileNotFoundError:
-        return f"Fout: 'energie_dashboard.html' niet gevonden in {OUTPUT_DIR}. Draai eerst het generate script.", 404
+        return f"Fout: '{DASHBOARD_FILE}' niet gevonden in {OUTPUT_DIR}. Draai eerst het generate script.", 404
+    # Altijd even navragen bij de server; ongewijzigd kost dat alleen een 304
+    response.cache_control.no_cache = True
+    return response
+
+@app.route(f'/{DATA_FILE}')
+def dashboard_data():
+    """
+    Deze functie serveert het databestand met de laatste meting en het tijdstip van de laatste generatie.
+    Dit is het enige bestand dat bij elke refresh verandert.
+    """
+    try:
+        response = send_generated(os.path.join(OUTPUT_DIR, DATA_FILE), "application/json")
+    except FileNotFoundError:
+        return jsonify(status="error", message="Het dashboard wordt nog gegenereerd."), 503
+    response.cache_control.no_cache = True
+    return response
+
+@app.route(f'/{STATIC_DIR}/<path:filename>')
+def static_file(filename):
+    """
+    Deze functie serveert de stylesheet, het script en de meegeleverde Chart.js van het dashboard. Hun namen
+    bevatten een hash van de inhoud, dus de browser mag ze zonder navragen bewaren; een nieuwe versie krijgt
+    een nieuwe naam in de shell.
+    """
+    path = safe_join(os.path.join(OUTPUT_DIR, STATIC_DIR), filename)
+    if path is None:
+        return "Niet gevonden.", 404
+    try:
+        response = send_generated(path, mimetypes.guess_type(filename)[0] or "application/octet-stream", max_age=STATIC_MAX_AGE_S)
+    except FileNotFoundError:
+        return "Niet gevonden.", 404
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/refresh')
 def refresh():
     """
-    Deze functie voert het generate_P1_dashboard.py script opnieuw uit.
+    Deze functie start het bijwerken van het dashboard op de achtergrond en keert direct terug.
+    De voortgang is op te vragen via /refresh/status.
+    """
+    run = start_refresh()
+    return jsonify(status="accepted", run=run, message="Dashboard wordt vernieuwd."), 202
+
+@app.route('/refresh/status')
+def refresh_status_view():
+    """
+    Deze functie geeft de toestand, de huidige stap, de verstreken tijd en de laatste fout van de refresh terug.
+    """
+    return jsonify(get_refresh_status())
+
+def conditional_json(body):
+    """
+    JSON-antwoord met een ETag op basis van de inhoud; een browser die de dataset al heeft krijgt een 304.
+    """
+    response = Response(body, mimetype="application/json")
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/periods/<period>')
+def api_period_keys(period):
+    """
+    Deze functie geeft de gesorteerde sleutels van een periode (day, week, month, year of years) terug.
+    """
+    keys = engine.period_keys(period)
+    if keys is None:
+        if engine.all_periods is None:
+            return jsonify(status="error", message="Het dashboard wordt nog gegenereerd."), 503
+        return jsonify(status="error", message=f"Onbekende periode '{period}'."), 404
+    return conditional_json(json.dumps({"period": period, "keys": keys}))
+
+@app.route('/api/periods/<period>/<key>')
+def api_period_dataset(period, key):
     """
-    if not os.path.isfile(SCRIPT_TO_RUN):
-        return jsonify(status="error", message=f"Fout: Het generate script is niet gevonden op {SCRIPT_TO_RUN}."), 500
+    Deze functie geeft één dataset (labels, imports, exports, totalen, titel en grafiektype) terug
+    uit de aggregaties die de engine in het geheugen houdt. Met ?encoding=f32 komt een daggrafiek in compacte
+    vorm: tijden als minuut van de dag en waarden als base64 Float32-reeksen. Daggrafieken zijn uitgedund
+    tot een vast aantal punten; ?full=1 geeft alle punten van de dag.
+    """
+    encoding = request.args.get("encoding", "json")
+    if encoding not in generate_P1_dashboard.DATASET_ENCODINGS:
+        return jsonify(status="error", message=f"Onbekende encoding '{encoding}'."), 400
+    full = request.args.get("full", "0")
+    if full not in ("0", "1"):
+        return jsonify(status="error", message="Parameter 'full' moet 0 of 1 zijn."), 400
+    body = engine.dataset_json(period, key, encoding, full=full == "1")
+    if body is None:
+        if engine.all_periods is None:
+            return jsonify(status="error", message="Het dashboard wordt nog gegenereerd."), 503
+        return jsonify(status="error", message=f"Geen data voor {period} '{key}'."), 404
+    return conditional_json(body)
+
+@app.route('/api/since')
+def api_since():
+    """
+    Deze functie geeft de metingen en de gewijzigde datasets na ?ts=<Unix timestamp> terug, zodat een
+    geopende pagina kan bijwerken zonder te herladen. Het antwoord bevat de nieuwe `ts` voor de volgende aanvraag.
+    """
+    try:
+        since_ts = float(request.args["ts"])
+    except (KeyError, ValueError):
+        since_ts = math.nan
+    if not math.isfinite(since_ts):
+        return jsonify(status="error", message="Parameter 'ts' (Unix timestamp) ontbreekt of is ongeldig."), 400
+
     try:
-        # Voer het script uit met dezelfde Python-interpreter als de server.
-        subprocess.run(
-            [sys.executable, SCRIPT_TO_RUN], 
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        return jsonify(status="success", message="Dashboard is vernieuwd.")
-    except subprocess.CalledProcessError as e:
-        # Vang fouten op die het script zelf genereert.
-        error_message = f"Het generate script gaf een foutmelding:\n{e.stderr}"
-        return jsonify(status="error", message=error_message), 500
+        changes = engine.changes_since(since_ts)
+    except (FileNotFoundError, sqlite3.Error) as e:
+        return jsonify(status="error", message=f"Fout bij het lezen van de metingen: {e}"), 500
+    if changes is None:
+        return jsonify(status="error", message="Het dashboard wordt nog gegenereerd."), 503
+    return jsonify(changes)
+
+@app.route('/api/recent')
+def api_recent():
+    """
+    Deze functie geeft de recente metingen op volle resolutie uit de ringbuffer van de logger terug, optioneel
+    alleen die na ?ts=<Unix timestamp>. Het antwoord bevat de nieuwe `ts` voor de volgende aanvraag.
+    """
+    since_ts = -math.inf
+    if "ts" in request.args:
+        try:
+            since_ts = float(request.args["ts"])
+        except ValueError:
+            since_ts = math.nan
+        if not math.isfinite(since_ts):
+            return jsonify(status="error", message="Parameter 'ts' (Unix timestamp) is ongeldig."), 400
+
+    try:
+        recent = open_recent_buffer()
+    except OSError as e:
+        return jsonify(status="error", message=f"Fout bij het lezen van de ringbuffer: {e}"), 500
+    if recent is None:
+        return jsonify(status="error", message=f"Geen ringbuffer gevonden op {RECENT_PATH}. Draai de logger met --daemon."), 404
+    _seq, readings = read_recent(*recent)
+    readings = [reading for reading in readings if reading[0] > since_ts]
+    return jsonify(ts=readings[-1][0] if readings else request.args.get("ts", type=float), readings=readings)
+
+@app.route('/api/live')
+def api_live():
+    """
+    Deze functie stuurt elke nieuwe meting als Server-Sent Event ('meting', met de Unix timestamp als id).
+    Een nieuwe verbinding krijgt eerst de metingen van de laatste LIVE_WINDOW_MINUTES minuten, een herstelde
+    verbinding alleen wat na Last-Event-ID kwam. Zonder nieuwe metingen houdt een heartbeat de verbinding open.
+    """
+    try:
+        last_id = float(request.headers.get("Last-Event-ID", "-inf"))
+    except ValueError:
+        last_id = -math.inf
+    if math.isnan(last_id):
+        last_id = -math.inf
+
+    def stream(last_id):
+        yield f"retry: {LIVE_RETRY_MS}\n\n".encode("utf-8")
+        while True:
+            with live_condition:
+                chunk = live_events_after(last_id)
+                if not chunk:
+                    live_condition.wait(LIVE_HEARTBEAT_S)
+                    chunk = live_events_after(last_id)
+            if chunk:
+                last_id = chunk[-1][0]
+                yield b"".join(message for _, message in chunk)
+            else:
+                yield b": heartbeat\n\n"
+
+    response = Response(stream(last_id), mimetype="text/event-stream")
+    response.cache_control.no_cache = True
+    # Niet bufferen in een eventuele reverse proxy
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serveert het energiedashboard en houdt het actueel.")
+    parser.add_argument('--no-auto-refresh', action='store_true', help="Vernieuw alleen via de Vernieuwen-knop.")
+    parser.add_argument('--debounce', type=float, default=AUTO_REFRESH_DEBOUNCE_S, help="Seconden stilte na de laatste nieuwe meting voor een automatische refresh.")
+    parser.add_argument('--min-interval', type=float, default=AUTO_REFRESH_MIN_INTERVAL_S, help="Minimaal aantal seconden tussen twee refreshes.")
+    parser.add_argument('--day-points', type=int, default=generate_P1_dashboard.DAY_POINT_BUDGET, help="Maximaal aantal punten per daggrafiek (0 = niet uitdunnen).")
+    parser.add_argument('--day-bin', type=int, default=generate_P1_dashboard.DAY_BIN_MINUTES, help="Breedte van de bins in de daggrafiek in minuten (1-60).")
+    parser.add_argument('--day-gap', type=int, default=generate_P1_dashboard.DAY_GAP_MINUTES, help="Minuten zonder meting die als gat in de daggrafiek gelden.")
+    args = parser.parse_args()
+    if not 1 <= args.day_bin <= 60:
+        parser.error("--day-bin moet 1 tot en met 60 minuten zijn.")
+    engine.day_points = args.day_points
+    engine.day_bin_minutes = args.day_bin
+    engine.day_gap_minutes = args.day_gap
+
     print(f"Server wordt gestart...")
     print(f"Dashboard is bereikbaar op http://<IP-ADRES-VAN-TELEFOON>:8000")
     print(f"HTML-bestand wordt verwacht in: {OUTPUT_DIR}")
-    print(f"Refresh-knop voert uit: {SCRIPT_TO_RUN}")
+    print(f"Dashboard wordt gegenereerd met: {generate_P1_dashboard.__file__}")
+    # Engine vooraf opwarmen, zodat de eerste klik op Vernieuwen al alleen nieuwe metingen verwerkt
+    start_refresh()
+    if not args.no_auto_refresh:
+        print(f"Automatisch vernieuwen bij nieuwe metingen (debounce {args.debounce} s, minimaal {args.min_interval} s tussen refreshes)")
+        threading.Thread(target=watch_database, kwargs={"debounce_s": args.debounce, "min_interval_s": args.min_interval}, daemon=True).start()
+    threading.Thread(target=watch_live, daemon=True).start()
     app.run(host='0.0.0.0', port=8000, debug=False)
\ No newline at end of file
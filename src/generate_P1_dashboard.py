@@ -1,9 +1,20 @@
 # === BLOK 1: CONFIGURATIE EN IMPORTS ===
 import os
+import sys
 import json
 from datetime import datetime, timedelta
-from collections import defaultdict
 import re
+import gzip
+import base64
+import bisect
+import hashlib
+import argparse
+from array import array
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optioneel; zonder NumPy wordt de dict-route gebruikt
+    np = None
 
 # Determine project root based on this script's location
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -16,29 +27,68 @@ else: # Fallback for other environments (e.g., Windows)
 
 output_file = os.path.join(output_dir, "energie_dashboard.html")
 
+# Daggrafiek: breedte van de bins (1 tot en met 60 minuten) en de tijd zonder meting die als gat geldt
+DAY_BIN_MINUTES = 5
+DAY_GAP_MINUTES = 30
+
 import sqlite3
 
 # === BLOK 2: READ_DATA_FROM_CHROMADB FUNCTIE ===
-def read_data_from_sqlite():
-    '''
-    Leest alle data uit de SQLite database en retourneert deze in het verwachte formaat.
-    '''
+table_name = "metingen"
+
+def get_db_path():
     # Bepaal database pad dynamisch
     if os.path.isdir("/data/data/com.termux/files/home"): # Check if on Termux
         db_path = os.path.join(os.path.expanduser('~'), 'p1_data.db')
     else: # Fallback for other environments (e.g., Windows)
         db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'p1_data.db'))
-    table_name = "metingen"
 
     if not os.path.exists(db_path):
         raise FileNotFoundError(f"SQLite database niet gevonden op '{db_path}'.")
+    return db_path
+
+def get_schema_version(conn):
+    # Schema v2 (zie migrate_schema_v2.py) slaat hele seconden en meterstanden in Wh op
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+    return 2 if "import_wh" in columns else 1
+
+def measurement_sql(conn):
+    '''
+    Retourneert (kolommen, filter) om metingen in de eenheden van schema v1 (kWh) te lezen,
+    ongeacht het schema van de database. Het filter slaat rijen met ontbrekende waarden over.
+    '''
+    if get_schema_version(conn) == 2:
+        return ("timestamp, active_power_w, import_wh / 1000.0 AS total_power_import_kwh, export_wh / 1000.0 AS total_power_export_kwh",
+                "1")
+    return ("timestamp, active_power_w, total_power_import_kwh, total_power_export_kwh",
+            "active_power_w IS NOT NULL AND total_power_import_kwh IS NOT NULL AND total_power_export_kwh IS NOT NULL")
 
-    conn = sqlite3.connect(db_path)
+def range_sql(start=None, end=None):
+    '''
+    Retourneert (voorwaarde, parameters) voor metingen met start <= timestamp <= end (Unix timestamps).
+    Een ontbrekende grens is open. De voorwaarde gebruikt de index van de primaire sleutel op timestamp.
+    '''
+    if start is not None and end is not None:
+        return "timestamp BETWEEN ? AND ?", (start, end)
+    if start is not None:
+        return "timestamp >= ?", (start,)
+    if end is not None:
+        return "timestamp <= ?", (end,)
+    return "1", ()
+
+def read_data_from_sqlite(start=None, end=None):
+    '''
+    Leest de data tussen `start` en `end` (Unix timestamps, standaard alles) uit de SQLite database
+    en retourneert deze in het verwachte formaat.
+    '''
+    conn = sqlite3.connect(get_db_path())
     conn.row_factory = sqlite3.Row  # Toegang tot kolommen via naam
     cursor = conn.cursor()
 
-    # Haal alle records op, gesorteerd op tijdstempel
-    cursor.execute(f"SELECT * FROM {table_name} ORDER BY timestamp ASC")
+    # Haal de volledige records in het bereik op, gesorteerd op tijdstempel
+    columns_sql, not_null_sql = measurement_sql(conn)
+    where_sql, params = range_sql(start, end)
+    cursor.execute(f"SELECT {columns_sql} FROM {table_name} WHERE {where_sql} AND {not_null_sql} ORDER BY timestamp ASC", params)
     db_results = cursor.fetchall()
     conn.close()
 
@@ -57,194 +107,765 @@ def read_data_from_sqlite():
     
     return records
 
-# === BLOK 3: HOOFDLOGICA - DATA VERWERKEN ===
-records = read_data_from_sqlite()
-if not records:
-    raise SystemExit("Geen data gevonden.")
-
-last = records[-1]
-last_values = {
-    "import_kwh": round(last["import_kwh"],3),
-    "export_kwh": round(last["export_kwh"],3),
-}
+def read_columns_from_sqlite(start=None, end=None):
+    '''
+    Leest de data tussen `start` en `end` (standaard alles) uit de SQLite database direct in aaneengesloten
+    float64 NumPy-arrays (kolommen timestamp, active_w, import_kwh, export_kwh), zonder per rij een dict of datetime te maken.
+    '''
+    conn = sqlite3.connect(get_db_path())
+    columns_sql, not_null_sql = measurement_sql(conn)
+    where_sql, params = range_sql(start, end)
+    cursor = conn.execute(f'''
+        SELECT {columns_sql}
+        FROM {table_name}
+        WHERE {where_sql} AND {not_null_sql}
+        ORDER BY timestamp ASC
+    ''', params)
+    flat = np.fromiter((value for row in cursor for value in row), dtype=np.float64)
+    conn.close()
+
+    table = flat.reshape(-1, 4)
+    return {
+        "timestamp": np.ascontiguousarray(table[:, 0]),
+        "active_w": table[:, 1] / 10.0,
+        "import_kwh": np.ascontiguousarray(table[:, 2]),
+        "export_kwh": np.ascontiguousarray(table[:, 3]),
+    }
 
-# === BLOK 4: AGGREGATE_DAY FUNCTIE ===
-def aggregate_day(records):
+def read_readings(conn, after_ts, until_ts=None, limit=None):
+    '''
+    Leest de (hooguit `limit` meest recente) metingen met after_ts < timestamp <= until_ts als oplopende
+    lijst van [timestamp, active_w, import_kwh, export_kwh], zoals de pagina ze verwerkt.
+    '''
+    columns_sql, not_null_sql = measurement_sql(conn)
+    where_sql, params = range_sql(None, until_ts)
+    rows = conn.execute(f'''
+        SELECT {columns_sql} FROM {table_name}
+        WHERE timestamp > ? AND {where_sql} AND {not_null_sql}
+        ORDER BY timestamp DESC LIMIT ?
+    ''', (after_ts, *params, -1 if limit is None else limit)).fetchall()
+    return [[ts, power / 10.0, import_kwh, export_kwh] for ts, power, import_kwh, export_kwh in reversed(rows)]
+
+# === BLOK 2.1: ROLLUP TABELLEN ===
+# Uur- en dagtotalen worden in dezelfde database bijgehouden, zodat de week-, maand-, jaar- en
+# jarenoverzichten niet telkens de volledige meetgeschiedenis hoeven te verwerken.
+ROLLUP_TABLES = {"hour": "rollup_hourly", "day": "rollup_daily"}
+ROLLUP_STATE_TABLE = "rollup_state"
+# Generatie van de metingen. import_jsonl.py, migrate_data.py, migrate_schema_v2.py en compact_metingen.py verhogen
+# die als ze metingen van vóór de high-water mark toevoegen of verwijderen; de logger voegt alleen nieuwe metingen toe.
+# De rollups en de opgeslagen dagreeksen onthouden met welke generatie ze gebouwd zijn.
+GENERATION_TABLE = "metingen_generatie"
+
+def get_generation(conn):
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (GENERATION_TABLE,)).fetchone()
+    if not exists:
+        return 0
+    row = conn.execute(f"SELECT generation FROM {GENERATION_TABLE} WHERE source_table = ?", (table_name,)).fetchone()
+    return row[0] if row else 0
+
+def create_rollup_tables(conn):
+    for bucket_column, rollup_table in (("hour", ROLLUP_TABLES["hour"]), ("day", ROLLUP_TABLES["day"])):
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {rollup_table} (
+                {bucket_column} TEXT PRIMARY KEY,
+                import_kwh REAL NOT NULL,
+                export_kwh REAL NOT NULL,
+                interval_count INTEGER NOT NULL,
+                sample_count INTEGER NOT NULL,
+                min_active_power_w REAL,
+                max_active_power_w REAL,
+                first_ts REAL NOT NULL,
+                last_ts REAL NOT NULL
+            )
+        ''')
+    # generation: de generatie van de metingen (zie get_generation) waarmee de rollups gebouwd zijn;
+    # -1 voor rollups van vóór deze kolom, die worden één keer opnieuw opgebouwd
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ROLLUP_STATE_TABLE} (
+            source_table TEXT PRIMARY KEY,
+            last_ts REAL NOT NULL,
+            generation INTEGER NOT NULL DEFAULT -1
+        )
+    ''')
+    state_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({ROLLUP_STATE_TABLE})")}
+    if "generation" not in state_columns:
+        conn.execute(f"ALTER TABLE {ROLLUP_STATE_TABLE} ADD COLUMN generation INTEGER NOT NULL DEFAULT -1")
+
+def reset_rollups(conn):
+    for rollup_table in ROLLUP_TABLES.values():
+        conn.execute(f"DELETE FROM {rollup_table}")
+    conn.execute(f"DELETE FROM {ROLLUP_STATE_TABLE} WHERE source_table = ?", (table_name,))
+
+def fold_into_buckets(rows, prev_row):
+    '''
+    Telt de metingen (timestamp, active_power_w, import_kwh, export_kwh) op in uur- en dagbuckets.
+    Het verschil t.o.v. de vorige meting telt mee bij de bucket van de huidige meting;
+    intervallen met een negatief verschil (meterreset) worden overgeslagen.
+    '''
+    buckets = {"hour": {}, "day": {}}
+    next_check = None
+    last_ts = None
+    for row in rows:
+        ts, power, import_kwh, export_kwh = row
+        if next_check is None or ts >= next_check:
+            # Alle tijdzones wijken een veelvoud van 15 minuten af van UTC, dus lokale uurgrenzen
+            # vallen altijd op een kwartiergrens: de sleutels alleen per kwartier herberekenen.
+            local = datetime.fromtimestamp(ts)
+            keys = {"hour": local.strftime("%Y-%m-%d %H"), "day": local.strftime("%Y-%m-%d")}
+            next_check = (ts // 900 + 1) * 900
+
+        interval = None
+        if prev_row is not None:
+            import_diff = import_kwh - prev_row[2]
+            export_diff = export_kwh - prev_row[3]
+            if import_diff >= 0 and export_diff >= 0:
+                interval = (import_diff, export_diff)
+
+        for level in ("hour", "day"):
+            key = keys[level]
+            bucket = buckets[level].get(key)
+            if bucket is None:
+                bucket = buckets[level][key] = {
+                    "import": 0, "export": 0, "interval_count": 0, "sample_count": 0,
+                    "min_power": power, "max_power": power, "first_ts": ts, "last_ts": ts,
+                }
+            if interval is not None:
+                bucket["import"] += interval[0]
+                bucket["export"] += interval[1]
+                bucket["interval_count"] += 1
+            bucket["sample_count"] += 1
+            if power < bucket["min_power"]: bucket["min_power"] = power
+            if power > bucket["max_power"]: bucket["max_power"] = power
+            bucket["last_ts"] = ts
+
+        prev_row = row
+        last_ts = ts
+
+    return buckets, last_ts
+
+def update_rollups(conn):
+    '''
+    Werkt de rollup-tabellen incrementeel bij vanaf de laatst verwerkte timestamp (high-water mark).
+    Alleen metingen die nieuwer zijn dan de vorige update worden gelezen. Als de generatie van de metingen
+    sindsdien veranderd is (bijv. door een import van oude logbestanden), worden de rollups opnieuw opgebouwd.
+    compact_metingen.py laat de totalen gelijk en houdt rollups die bij waren op de nieuwe generatie.
+    '''
+    create_rollup_tables(conn)
+    # Vóór het lezen bepalen: een import die tijdens deze update loopt, geeft bij de volgende update een nieuwe opbouw
+    generation = get_generation(conn)
+
+    row = conn.execute(f"SELECT last_ts, generation FROM {ROLLUP_STATE_TABLE} WHERE source_table = ?", (table_name,)).fetchone()
+    high_water_mark, rollup_generation = row if row else (None, None)
+
+    columns_sql, not_null_sql = measurement_sql(conn)
+    if high_water_mark is not None and rollup_generation != generation:
+        print("Er zijn metingen van vóór de vorige update bijgekomen of verwijderd, de rollups worden opnieuw opgebouwd.")
+        reset_rollups(conn)
+        high_water_mark = None
+
+    prev_row = None
+    if high_water_mark is None:
+        cursor = conn.execute(f"SELECT {columns_sql} FROM {table_name} WHERE {not_null_sql} ORDER BY timestamp ASC")
+    else:
+        prev_row = conn.execute(f'''
+            SELECT {columns_sql} FROM {table_name}
+            WHERE timestamp <= ? AND {not_null_sql}
+            ORDER BY timestamp DESC LIMIT 1
+        ''', (high_water_mark,)).fetchone()
+        cursor = conn.execute(f'''
+            SELECT {columns_sql} FROM {table_name}
+            WHERE timestamp > ? AND {not_null_sql}
+            ORDER BY timestamp ASC
+        ''', (high_water_mark,))
+
+    buckets, last_ts = fold_into_buckets(cursor, prev_row)
+    if last_ts is None:
+        conn.commit()
+        return 0
+
+    for level, rollup_table in ROLLUP_TABLES.items():
+        conn.executemany(f'''
+            INSERT INTO {rollup_table} ({level}, import_kwh, export_kwh, interval_count, sample_count,
+                                        min_active_power_w, max_active_power_w, first_ts, last_ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT({level}) DO UPDATE SET
+                import_kwh = import_kwh + excluded.import_kwh,
+                export_kwh = export_kwh + excluded.export_kwh,
+                interval_count = interval_count + excluded.interval_count,
+                sample_count = sample_count + excluded.sample_count,
+                min_active_power_w = MIN(min_active_power_w, excluded.min_active_power_w),
+                max_active_power_w = MAX(max_active_power_w, excluded.max_active_power_w),
+                first_ts = MIN(first_ts, excluded.first_ts),
+                last_ts = MAX(last_ts, excluded.last_ts)
+        ''', [
+            (key, b["import"], b["export"], b["interval_count"], b["sample_count"],
+             b["min_power"], b["max_power"], b["first_ts"], b["last_ts"])
+            for key, b in buckets[level].items()
+        ])
+
+    conn.execute(f'''
+        INSERT INTO {ROLLUP_STATE_TABLE} (source_table, last_ts, generation) VALUES (?, ?, ?)
+        ON CONFLICT(source_table) DO UPDATE SET last_ts = excluded.last_ts, generation = excluded.generation
+    ''', (table_name, last_ts, generation))
+    conn.commit()
+    return len(buckets["day"])
+
+def read_rollup_period_data(conn):
+    '''
+    Leest de dagtotalen uit de rollup en telt ze op tot maandtotalen, in de vorm die de
+    week-, maand-, jaar- en jarenoverzichten verwachten.
+    '''
+    daily_data = {}
+    monthly_data = {}
+    cursor = conn.execute(f'''
+        SELECT day, import_kwh, export_kwh, interval_count FROM {ROLLUP_TABLES['day']}
+        WHERE interval_count > 0
+        ORDER BY day ASC
+    ''')
+    for day_key, import_kwh, export_kwh, interval_count in cursor:
+        daily_data[day_key] = {
+            "import": import_kwh, "export": export_kwh, "count": interval_count,
+            "date": datetime.strptime(day_key, "%Y-%m-%d").date(),
+        }
+        month_data = monthly_data.setdefault(day_key[:7], {"import": 0, "export": 0, "count": 0})
+        month_data["import"] += import_kwh
+        month_data["export"] += export_kwh
+        month_data["count"] += interval_count
+
+    return {"daily": daily_data, "monthly": monthly_data}
+
+# === BLOK 2.2: OPGESLAGEN DAGREEKSEN ===
+# De daggrafieken zijn het enige overzicht dat alle metingen nodig heeft. Ze worden per dag in de database
+# bewaard, zodat een volgende run alleen de dagen met nieuwe metingen opnieuw hoeft te berekenen.
+DAY_SERIES_TABLE = "day_series_cache"
+DAY_SERIES_STATE_TABLE = "day_series_state"
+
+def create_day_series_tables(conn):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {DAY_SERIES_TABLE} (
+            day TEXT PRIMARY KEY,
+            series TEXT NOT NULL
+        )
+    ''')
+    # Een stand van vóór de generatie-kolom (met het aantal rijen) vervalt: de dagreeksen worden één keer opnieuw berekend
+    state_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({DAY_SERIES_STATE_TABLE})")}
+    if state_columns and "generation" not in state_columns:
+        conn.execute(f"DROP TABLE {DAY_SERIES_STATE_TABLE}")
+    # layout: indeling van de opgeslagen dagreeksen (zie day_series_layout)
+    # generation: de generatie van de metingen (zie get_generation) waarmee ze berekend zijn
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {DAY_SERIES_STATE_TABLE} (
+            source_table TEXT PRIMARY KEY,
+            last_ts REAL NOT NULL,
+            layout TEXT NOT NULL,
+            generation INTEGER NOT NULL
+        )
+    ''')
+
+def get_partial_start(conn, layout, generation):
+    '''
+    Bepaalt vanaf welke timestamp de dagreeksen opnieuw berekend moeten worden: lokale middernacht van de
+    laatst opgeslagen dag. Retourneert None als er geen bruikbare opgeslagen dagreeksen zijn, bijv. omdat er
+    metingen van vóór de vorige run zijn bijgekomen of verwijderd (een andere `generation`), of omdat ze een
+    andere `layout` hebben; dan wordt alles opnieuw berekend.
+    '''
+    create_day_series_tables(conn)
+    row = conn.execute(f"SELECT last_ts, layout, generation FROM {DAY_SERIES_STATE_TABLE} WHERE source_table = ?", (table_name,)).fetchone()
+    if row is None:
+        return None
+
+    last_ts, stored_layout, stored_generation = row
+    if stored_layout != layout:
+        print("Opgeslagen dagreeksen hebben een andere indeling, ze worden opnieuw berekend.")
+        return None
+    if stored_generation != generation:
+        print("Opgeslagen dagreeksen komen niet overeen met de metingen, ze worden opnieuw berekend.")
+        return None
+
+    last_date = datetime.fromtimestamp(last_ts).date()
+    return datetime(last_date.year, last_date.month, last_date.day).timestamp()
+
+def read_day_series(conn, before_day_key):
+    cursor = conn.execute(f"SELECT day, series FROM {DAY_SERIES_TABLE} WHERE day < ? ORDER BY day ASC", (before_day_key,))
+    return {day_key: json.loads(series) for day_key, series in cursor}
+
+def save_day_series(conn, day_series, last_ts, replace_all, layout, generation):
+    '''
+    Slaat de (opnieuw) berekende dagreeksen op, samen met de laatst verwerkte timestamp, de indeling en
+    de generatie van de metingen waarmee `get_partial_start` de opgeslagen stand controleert.
+    '''
+    create_day_series_tables(conn)
+    if replace_all:
+        conn.execute(f"DELETE FROM {DAY_SERIES_TABLE}")
+    conn.executemany(f"INSERT OR REPLACE INTO {DAY_SERIES_TABLE} (day, series) VALUES (?, ?)",
+                     [(day_key, json.dumps(series)) for day_key, series in day_series.items()])
+
+    conn.execute(f'''
+        INSERT INTO {DAY_SERIES_STATE_TABLE} (source_table, last_ts, layout, generation) VALUES (?, ?, ?, ?)
+        ON CONFLICT(source_table) DO UPDATE SET last_ts = excluded.last_ts, layout = excluded.layout,
+            generation = excluded.generation
+    ''', (table_name, last_ts, layout, generation))
+    conn.commit()
+
+# === BLOK 3: HOOFDLOGICA - DATA VERWERKEN ===
+def load_period_data(start=None, bin_minutes=DAY_BIN_MINUTES, gap_minutes=DAY_GAP_MINUTES):
+    '''
+    Leest de metingen vanaf `start` (Unix timestamp, standaard alles) en berekent de dagreeksen in bins van
+    `bin_minutes`, via NumPy als dat beschikbaar is. Retourneert (period_data, laatste meting, timestamp van
+    de laatste meting).
+    '''
+    if np is not None:
+        columns = read_columns_from_sqlite(start)
+        if len(columns["timestamp"]) == 0:
+            raise LookupError("Geen data gevonden.")
+        last = {
+            "ts": datetime.fromtimestamp(columns["timestamp"][-1]),
+            "active_w": float(columns["active_w"][-1]),
+            "import_kwh": float(columns["import_kwh"][-1]),
+            "export_kwh": float(columns["export_kwh"][-1]),
+        }
+        return collect_period_data_columnar(columns, bin_minutes, gap_minutes), last, float(columns["timestamp"][-1])
+
+    records = read_data_from_sqlite(start)
     if not records:
-        return {}
-    
-    daily_datasets = defaultdict(lambda: {"labels": [], "imports": [], "exports": [], "total_import": 0, "total_export": 0, "title": "", "type": "line"})
-    
-    first_record = records[0]
-    last_record = records[-1]
-    
-    current_date = first_record["ts"].date()
-    while current_date <= last_record["ts"].date():
-        day_key = current_date.strftime("%Y-%m-%d")
-        
-        dag_nl = ["ma", "di", "wo", "do", "vr", "za", "zo"][current_date.weekday()]
-        maand_nl = ["jan", "feb", "mrt", "apr", "mei", "jun", "jul", "aug", "sep", "okt", "nov", "dec"][current_date.month - 1]
-        daily_datasets[day_key]["title"] = f"{dag_nl} {current_date.day} {maand_nl} {current_date.year}"
-        
+        raise LookupError("Geen data gevonden.")
+    last = records[-1]
+    return collect_period_data(records, bin_minutes, gap_minutes), last, last["ts"].timestamp()
+
+# === BLOK 4: GEDEELDE HULPFUNCTIES VOOR AGGREGATIE ===
+DAG_NL = ["ma", "di", "wo", "do", "vr", "za", "zo"]
+MAAND_KORT_NL = ["jan", "feb", "mrt", "apr", "mei", "jun", "jul", "aug", "sep", "okt", "nov", "dec"]
+MAAND_NL = ["januari", "februari", "maart", "april", "mei", "juni",
+            "juli", "augustus", "september", "oktober", "november", "december"]
+
+def new_dataset(chart_type):
+    return {"labels": [], "imports": [], "exports": [], "total_import": 0, "total_export": 0, "title": "", "type": chart_type}
+
+def iter_dates(first_date, last_date):
+    current_date = first_date
+    while current_date <= last_date:
+        yield current_date
         current_date += timedelta(days=1)
-    
-    grouped = defaultdict(list)
+
+# === BLOK 5: DAGREEKSEN BEREKENEN IN ÉÉN DOORLOOP ===
+# De daggrafiek toont per vast tijdvak (bin) van DAY_BIN_MINUTES minuten het gemiddelde vermogen, gewogen
+# naar de werkelijke tijd tussen de metingen. Intervallen langer dan DAY_GAP_MINUTES gelden als gat.
+TIME_LABELS = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60)]
+
+def day_series_layout(bin_minutes, gap_minutes):
+    '''Indeling van de dagreeksen; opgeslagen dagreeksen met een andere indeling worden opnieuw berekend.'''
+    return f"bins:{bin_minutes}:{gap_minutes}"
+
+def interpolate(points, times, values):
+    '''Lineaire interpolatie van `values` (op de oplopende `times`) in de oplopende `points`, zoals np.interp.'''
+    result = []
+    j = 0
+    last = len(times) - 1
+    for x in points:
+        while j < last and times[j + 1] <= x:
+            j += 1
+        if x <= times[0]:
+            result.append(values[0])
+        elif j == last:
+            result.append(values[last])
+        else:
+            result.append(values[j] + (x - times[j]) * (values[j + 1] - values[j]) / (times[j + 1] - times[j]))
+    return result
+
+def resample_day(times, import_kwh, export_kwh, day_start, day_end, bin_minutes, gap_minutes):
+    '''
+    Tijdgewogen gemiddeld vermogen (W) per bin voor de metingen van één dag (`times` als Unix timestamp),
+    van de bin met de eerste tot en met de bin met de laatste meting. Het verbruik tussen twee metingen
+    wordt gelijkmatig over dat interval verdeeld; een interval langer dan `gap_minutes` telt niet mee,
+    en een bin zonder gemeten tijd krijgt None (een gat in de grafiek). Het vermogen wordt afgerond op 0,1 W,
+    ruim binnen de resolutie van de meter (1 Wh). Retourneert (labels, imports, exports).
+    '''
+    bin_s = bin_minutes * 60
+    gap_s = gap_minutes * 60
+    # Cumulatieve energie (Wh) en gemeten tijd (s) op elk meetmoment
+    cum_import, cum_export, covered = [0.0], [0.0], [0.0]
+    for k in range(1, len(times)):
+        dt = times[k] - times[k - 1]
+        if 0 < dt <= gap_s:
+            import_diff = (import_kwh[k] - import_kwh[k - 1]) * 1000
+            export_diff = (export_kwh[k] - export_kwh[k - 1]) * 1000
+            cum_import.append(cum_import[-1] + max(import_diff, 0))
+            cum_export.append(cum_export[-1] + max(export_diff, 0))
+            covered.append(covered[-1] + dt)
+        else:
+            cum_import.append(cum_import[-1])
+            cum_export.append(cum_export[-1])
+            covered.append(covered[-1])
+
+    first_bin = int((times[0] - day_start) // bin_s)
+    last_bin = int((times[-1] - day_start) // bin_s)
+    edges = [day_start + k * bin_s for k in range(first_bin, last_bin + 1)]
+    edges.append(min(edges[-1] + bin_s, day_end))
+
+    import_at = interpolate(edges, times, cum_import)
+    export_at = interpolate(edges, times, cum_export)
+    covered_at = interpolate(edges, times, covered)
+    labels, imports, exports = [], [], []
+    for i, k in enumerate(range(first_bin, last_bin + 1)):
+        if day_end - day_start == 86400:
+            labels.append(TIME_LABELS[k * bin_minutes])
+        else:
+            # Dag met zomer-/wintertijdwissel: labels via datetime
+            labels.append(datetime.fromtimestamp(edges[i]).strftime("%H:%M"))
+        span = covered_at[i + 1] - covered_at[i]
+        if span > 0:
+            imports.append(round((import_at[i + 1] - import_at[i]) / span * 3600, 1))
+            exports.append(round((export_at[i + 1] - export_at[i]) / span * 3600, 1))
+        else:
+            imports.append(None)
+            exports.append(None)
+    return labels, imports, exports
+
+def collect_period_data(records, bin_minutes=DAY_BIN_MINUTES, gap_minutes=DAY_GAP_MINUTES):
+    '''
+    Loopt één keer door alle records en bouwt de intraday reeksen voor de daggrafiek (zie `resample_day`).
+    De dagtotalen voor de overige perioden komen uit de rollup-tabellen (zie BLOK 2.1).
+    '''
+    day_series = {}
+    day_samples = {}
+
+    current_date = None
+    series = None
+    samples = None
+    day_prev = None
     for r in records:
-        day_key = r["ts"].strftime("%Y-%m-%d")
-        grouped[day_key].append(r)
-    
-    for day, recs in grouped.items():
-        prev_import = recs[0]["import_kwh"]
-        prev_export = recs[0]["export_kwh"]
-        
-        for r in recs:
-            daily_datasets[day]["labels"].append(r["ts"].strftime("%H:%M"))
-            import_diff = (r["import_kwh"] - prev_import) * 1000
-            export_diff = (r["export_kwh"] - prev_export) * 1000
-            
-            if import_diff < 0: import_diff = 0
-            if export_diff < 0: export_diff = 0
-
-            daily_datasets[day]["imports"].append(import_diff / 0.25)
-            daily_datasets[day]["exports"].append(export_diff / 0.25)
-            
-            daily_datasets[day]["total_import"] += import_diff / 1000
-            daily_datasets[day]["total_export"] += export_diff / 1000
-            
-            prev_import, prev_export = r["import_kwh"], r["export_kwh"]
-        
-        daily_datasets[day]["total_import"] = round(daily_datasets[day]["total_import"], 3)
-        daily_datasets[day]["total_export"] = round(daily_datasets[day]["total_export"], 3)
-            
+        ts = r["ts"]
+        date_current = ts.date()
+        if date_current != current_date:
+            # Sleutels alleen opnieuw berekenen als de datum wisselt
+            current_date = date_current
+            day_key = date_current.strftime("%Y-%m-%d")
+            series = {"labels": [], "imports": [], "exports": [], "total_import": 0, "total_export": 0}
+            day_series[day_key] = series
+            samples = day_samples[day_key] = ([], [], [])
+            day_prev = r
+
+        # Dagtotaal: verschil t.o.v. de vorige meting van dezelfde dag, negatief wordt 0
+        import_diff = (r["import_kwh"] - day_prev["import_kwh"]) * 1000
+        export_diff = (r["export_kwh"] - day_prev["export_kwh"]) * 1000
+        if import_diff < 0: import_diff = 0
+        if export_diff < 0: export_diff = 0
+
+        series["total_import"] += import_diff / 1000
+        series["total_export"] += export_diff / 1000
+        samples[0].append(ts.timestamp())
+        samples[1].append(r["import_kwh"])
+        samples[2].append(r["export_kwh"])
+        day_prev = r
+
+    for day_key, (times, import_kwh, export_kwh) in day_samples.items():
+        day = datetime.strptime(day_key, "%Y-%m-%d")
+        day_start = day.timestamp()
+        day_end = (day + timedelta(days=1)).timestamp()
+        series = day_series[day_key]
+        series["labels"], series["imports"], series["exports"] = resample_day(
+            times, import_kwh, export_kwh, day_start, day_end, bin_minutes, gap_minutes)
+
+    return {
+        "first_date": records[0]["ts"].date(),
+        "last_date": records[-1]["ts"].date(),
+        "day_series": day_series,
+    }
+
+# === BLOK 5.1: DAGREEKSEN BEREKENEN MET NUMPY ===
+
+def segment_starts(bucket_idx):
+    # Startindex van elke aaneengesloten reeks gelijke bucket-indices
+    return np.flatnonzero(np.concatenate(([True], bucket_idx[1:] != bucket_idx[:-1])))
+
+def collect_period_data_columnar(columns, bin_minutes=DAY_BIN_MINUTES, gap_minutes=DAY_GAP_MINUTES):
+    '''
+    Gevectoriseerde variant van `collect_period_data`: de verschillen en dagtotalen worden
+    met NumPy berekend (diff, searchsorted op de daggrenzen en add.reduceat), de bins met
+    np.interp op de cumulatieve energie en gemeten tijd. Het resultaat heeft dezelfde vorm.
+    '''
+    ts = columns["timestamp"]
+    imp = columns["import_kwh"]
+    exp = columns["export_kwh"]
+    bin_s = bin_minutes * 60
+    gap_s = gap_minutes * 60
+
+    first_date = datetime.fromtimestamp(ts[0]).date()
+    last_date = datetime.fromtimestamp(ts[-1]).date()
+    dates = list(iter_dates(first_date, last_date + timedelta(days=1)))
+    # Lokale middernacht van elke dag (plus de dag na de laatste) als Unix timestamp
+    day_bounds = np.array([datetime(d.year, d.month, d.day).timestamp() for d in dates])
+    day_keys = [d.strftime("%Y-%m-%d") for d in dates]
+
+    day_idx = np.searchsorted(day_bounds, ts, side="right") - 1
+    starts = segment_starts(day_idx)
+    ends = np.append(starts[1:], len(ts))
+
+    # Dagtotaal: verschil t.o.v. de vorige meting van dezelfde dag, negatief wordt 0
+    day_import = np.zeros_like(imp)
+    day_export = np.zeros_like(exp)
+    day_import[1:] = (imp[1:] - imp[:-1]) * 1000
+    day_export[1:] = (exp[1:] - exp[:-1]) * 1000
+    day_import[starts] = 0
+    day_export[starts] = 0
+    np.maximum(day_import, 0, out=day_import)
+    np.maximum(day_export, 0, out=day_export)
+
+    day_total_import = np.add.reduceat(day_import / 1000, starts)
+    day_total_export = np.add.reduceat(day_export / 1000, starts)
+
+    # Cumulatieve energie (Wh) en gemeten tijd (s) op elk meetmoment; intervallen over een
+    # daggrens of langer dan `gap_minutes` tellen niet mee (zie `resample_day`)
+    dt = np.diff(ts)
+    counted = (dt > 0) & (dt <= gap_s) & (day_idx[1:] == day_idx[:-1])
+    cum_import = np.concatenate(([0.0], np.cumsum(np.where(counted, day_import[1:], 0))))
+    cum_export = np.concatenate(([0.0], np.cumsum(np.where(counted, day_export[1:], 0))))
+    covered = np.concatenate(([0.0], np.cumsum(np.where(counted, dt, 0))))
+
+    # Bins per dag: van de bin met de eerste tot en met de bin met de laatste meting
+    day_start = day_bounds[day_idx[starts]]
+    day_end = day_bounds[day_idx[starts] + 1]
+    first_bin = ((ts[starts] - day_start) // bin_s).astype(np.int64)
+    last_bin = ((ts[ends - 1] - day_start) // bin_s).astype(np.int64)
+    bin_counts = last_bin - first_bin + 1
+    bin_ends = np.cumsum(bin_counts)
+    bin_starts = bin_ends - bin_counts
+    bin_day = np.repeat(np.arange(len(starts)), bin_counts)
+    bin_k = first_bin[bin_day] + np.arange(bin_ends[-1]) - bin_starts[bin_day]
+    lo = day_start[bin_day] + bin_k * bin_s
+    hi = np.minimum(lo + bin_s, day_end[bin_day])
+
+    span = np.interp(hi, ts, covered) - np.interp(lo, ts, covered)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bin_import = np.round((np.interp(hi, ts, cum_import) - np.interp(lo, ts, cum_import)) / span * 3600, 1)
+        bin_export = np.round((np.interp(hi, ts, cum_export) - np.interp(lo, ts, cum_export)) / span * 3600, 1)
+    # Bins zonder gemeten tijd worden None (NaN is geen geldige JSON)
+    imports = bin_import.tolist()
+    exports = bin_export.tolist()
+    for i in np.flatnonzero(span <= 0).tolist():
+        imports[i] = exports[i] = None
+    minutes = (bin_k * bin_minutes).tolist()
+    lo = lo.tolist()
+
+    day_series = {}
+    for n, (start, end) in enumerate(zip(bin_starts.tolist(), bin_ends.tolist())):
+        i = int(day_idx[starts[n]])
+        if day_bounds[i + 1] - day_bounds[i] == 86400:
+            labels = [TIME_LABELS[minute] for minute in minutes[start:end]]
+        else:
+            # Dag met zomer-/wintertijdwissel: labels via datetime
+            labels = [datetime.fromtimestamp(t).strftime("%H:%M") for t in lo[start:end]]
+        day_series[day_keys[i]] = {
+            "labels": labels,
+            "imports": imports[start:end],
+            "exports": exports[start:end],
+            "total_import": float(day_total_import[n]),
+            "total_export": float(day_total_export[n]),
+        }
+
+    return {
+        "first_date": first_date,
+        "last_date": last_date,
+        "day_series": day_series,
+    }
+
+# === BLOK 5.2: DAGGRAFIEKEN UITDUNNEN (LTTB) ===
+# Standaard aantal punten per daggrafiek. De daggrafieken worden eerst in bins verdeeld (`resample_day`) en pas
+# daarna uitgedund. Met de standaardbins van 5 minuten heeft een dag 288 punten, dus doet LTTB standaard niets;
+# alleen bij bins van 1 of 2 minuten (1440 of 720 punten) of een lager budget wordt er uitgedund. Het budget is in
+# te stellen met --day-points van flask_http_server.py: de server levert de datasets, deze generator alleen de shell.
+# Is een dag niet uitgedund, dan is de knop "Alle punten" in de pagina verborgen.
+DAY_POINT_BUDGET = 500
+
+def lttb_indices(values, threshold):
+    '''
+    Largest-Triangle-Three-Buckets: kiest `threshold` indices uit `values` die de vorm van de reeks
+    zo goed mogelijk behouden. Het eerste en laatste punt blijven staan; de rest wordt in gelijke buckets
+    verdeeld en per bucket blijft het punt dat de grootste driehoek maakt met het vorige gekozen punt en
+    het gemiddelde van de volgende bucket. Pieken maken grote driehoeken en blijven dus zichtbaar.
+    De x-as is de index, net als de categorie-as van de grafiek.
+    '''
+    n = len(values)
+    if threshold < 3 or n <= threshold:
+        return list(range(n))
+
+    buckets = threshold - 2
+    bounds = [1 + i * (n - 2) // buckets for i in range(buckets + 1)]
+    # Gemiddelde x en y van de bucket na elke bucket (voor de laatste: het laatste punt)
+    next_starts = bounds[1:-1] + [n - 1]
+    next_ends = bounds[2:] + [n]
+
+    # NumPy rekent per bucket; dat loont pas vanaf zo'n 20 punten per bucket (zie benchmarks/bench_lttb.py).
+    # Daggrafieken hebben hooguit 1440 bins, dus bij het standaardbudget is de lus in Python sneller.
+    if np is not None and n >= 20 * threshold:
+        y = np.asarray(values, dtype=float)
+        sums = np.concatenate(([0.0], np.cumsum(y)))
+        starts, ends = np.array(next_starts), np.array(next_ends)
+        avg_x = ((starts + ends - 1) / 2).tolist()
+        avg_y = ((sums[ends] - sums[starts]) / (ends - starts)).tolist()
+        x = np.arange(n, dtype=float)
+        selected = [0]
+        a = 0
+        for i in range(buckets):
+            start, end = bounds[i], bounds[i + 1]
+            ay = y[a]
+            # Dubbele driehoeksoppervlakte voor alle punten in de bucket tegelijk
+            area = np.abs((a - avg_x[i]) * (y[start:end] - ay) - (a - x[start:end]) * (avg_y[i] - ay))
+            a = start + int(area.argmax())
+            selected.append(a)
+        selected.append(n - 1)
+        return selected
+
+    sums = [0.0]
+    for value in values:
+        sums.append(sums[-1] + value)
+    selected = [0]
+    a = 0
+    for i in range(buckets):
+        start, end = bounds[i], bounds[i + 1]
+        cx = (next_starts[i] + next_ends[i] - 1) / 2
+        cy = (sums[next_ends[i]] - sums[next_starts[i]]) / (next_ends[i] - next_starts[i])
+        ay = values[a]
+        best = -1.0
+        for j in range(start, end):
+            area = abs((a - cx) * (values[j] - ay) - (a - j) * (cy - ay))
+            if area > best:
+                best, choice = area, j
+        a = choice
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
+
+def include_index(indices, index):
+    '''
+    Vervangt in de gesorteerde `indices` het dichtstbijzijnde punt (niet het eerste of laatste) door `index`,
+    zodat het aantal punten en de volgorde gelijk blijven.
+    '''
+    pos = bisect.bisect_left(indices, index)
+    if pos < len(indices) and indices[pos] == index:
+        return
+    # `index` ligt tussen indices[pos - 1] en indices[pos]; beide kunnen vervangen worden zonder de volgorde te breken
+    candidates = [p for p in (pos - 1, pos) if 0 < p < len(indices) - 1]
+    if candidates:
+        replace = min(candidates, key=lambda p: abs(indices[p] - index))
+        indices[replace] = index
+
+def downsample_day_dataset(dataset, points=DAY_POINT_BUDGET):
+    '''
+    Daggrafiek met hooguit `points` punten (minder dan 3 = alle punten), gekozen met LTTB op het netto vermogen
+    (verbruik min teruglevering). LTTB houdt pieken meestal vast; de hoogste meting van beide reeksen
+    staat er altijd in, en elk gat (bins met None) houdt minstens één None zodat de lijn onderbroken blijft.
+    De totalen komen nog steeds uit alle metingen; `full_count` geeft het oorspronkelijke aantal punten.
+    '''
+    count = len(dataset["labels"])
+    if points < 3 or count <= points:
+        return dataset
+    imports, exports = dataset["imports"], dataset["exports"]
+    indices = lttb_indices([0 if imp is None else imp - exp for imp, exp in zip(imports, exports)], points)
+
+    selected = set(indices)
+    for i in range(count):
+        # Begin van een gat waarin geen enkel punt gekozen is
+        if imports[i] is None and (i == 0 or imports[i - 1] is not None):
+            end = i
+            while end < count and imports[end] is None:
+                end += 1
+            if selected.isdisjoint(range(i, end)):
+                include_index(indices, i)
+    for values in (imports, exports):
+        present = [i for i in range(count) if values[i] is not None]
+        if present:
+            include_index(indices, max(present, key=values.__getitem__))
+
+    sampled = dict(dataset)
+    for field in ("labels", "imports", "exports"):
+        values = dataset[field]
+        sampled[field] = [values[i] for i in indices]
+    sampled["full_count"] = count
+    return sampled
+
+# === BLOK 6: DAG- EN WEEKOVERZICHT ===
+def build_day_datasets(period_data):
+    daily_datasets = {}
+    for current_date in iter_dates(period_data["first_date"], period_data["last_date"]):
+        day_key = current_date.strftime("%Y-%m-%d")
+        dataset = new_dataset("line")
+        dataset["title"] = f"{DAG_NL[current_date.weekday()]} {current_date.day} {MAAND_KORT_NL[current_date.month - 1]} {current_date.year}"
+
+        series = period_data["day_series"].get(day_key)
+        if series:
+            dataset["labels"] = series["labels"]
+            dataset["imports"] = series["imports"]
+            dataset["exports"] = series["exports"]
+            dataset["total_import"] = round(series["total_import"], 3)
+            dataset["total_export"] = round(series["total_export"], 3)
+
+        daily_datasets[day_key] = dataset
+
     return daily_datasets
 
-# === BLOK 5: AGGREGATE_WEEK FUNCTIE ===
-def aggregate_week(records):
-    if not records:
-        return {}
-    
-    daily_data = defaultdict(lambda: {"import": 0, "export": 0, "count": 0, "date": None})
-    for i in range(1, len(records)):
-        r_prev = records[i-1]
-        r_current = records[i]
-        
-        import_diff = r_current["import_kwh"] - r_prev["import_kwh"]
-        export_diff = r_current["export_kwh"] - r_prev["export_kwh"]
-        
-        if import_diff < 0 or export_diff < 0:
-            continue
-            
-        date_current = r_current["ts"].date()
-        day_key = date_current.strftime("%Y-%m-%d")
-        
-        daily_data[day_key]["import"] += import_diff
-        daily_data[day_key]["export"] += export_diff
-        daily_data[day_key]["count"] += 1
-        daily_data[day_key]["date"] = date_current
-        
-    weekly_datasets = defaultdict(lambda: {"labels": [], "imports": [], "exports": [], "total_import": 0, "total_export": 0, "title": "", "type": "bar"})
-    
-    first_record_date = records[0]["ts"].date()
-    last_record_date = records[-1]["ts"].date()
-    
-    current_date = first_record_date
-    while current_date <= last_record_date:
+def build_week_datasets(period_data):
+    weekly_datasets = {}
+    for current_date in iter_dates(period_data["first_date"], period_data["last_date"]):
         year, week_num, _ = current_date.isocalendar()
         week_key = f"{year}-{week_num:02d}"
-        
         if week_key not in weekly_datasets:
+            weekly_datasets[week_key] = new_dataset("bar")
             weekly_datasets[week_key]["title"] = f"Week {week_num}, {year}"
 
-        current_date += timedelta(days=1)
-        
-    for day_key, data in sorted(daily_data.items()):
+    for day_key, data in sorted(period_data["daily"].items()):
         if data["count"] > 0:
             date = data["date"]
             year, week_num, weekday = date.isocalendar()
-            week_key = f"{year}-{week_num:02d}"
-            
-            dag_nl = ["ma", "di", "wo", "do", "vr", "za", "zo"][weekday - 1]
-            label = f"{dag_nl} {date.day}/{date.month}"
-            
-            weekly_datasets[week_key]["labels"].append(label)
-            weekly_datasets[week_key]["imports"].append(round(data["import"], 3))
-            weekly_datasets[week_key]["exports"].append(round(data["export"], 3))
-            weekly_datasets[week_key]["total_import"] += data["import"]
-            weekly_datasets[week_key]["total_export"] += data["export"]
-    
+            week = weekly_datasets[f"{year}-{week_num:02d}"]
+
+            week["labels"].append(f"{DAG_NL[weekday - 1]} {date.day}/{date.month}")
+            week["imports"].append(round(data["import"], 3))
+            week["exports"].append(round(data["export"], 3))
+            week["total_import"] += data["import"]
+            week["total_export"] += data["export"]
+
     for week in weekly_datasets.values():
         week["total_import"] = round(week["total_import"], 3)
         week["total_export"] = round(week["total_export"], 3)
-        
+
     return weekly_datasets
 
-# === BLOK 6: AGGREGATE_MONTH FUNCTIE ===
-def aggregate_month(records):
-    if not records:
-        return {}
-
-    daily_data = defaultdict(lambda: {"import": 0, "export": 0, "count": 0, "date": None})
-    for i in range(1, len(records)):
-        r_prev = records[i-1]
-        r_current = records[i]
-        
-        import_diff = r_current["import_kwh"] - r_prev["import_kwh"]
-        export_diff = r_current["export_kwh"] - r_prev["export_kwh"]
-        
-        if import_diff < 0 or export_diff < 0:
-            continue
-            
-        date_current = r_current["ts"].date()
-        day_key = date_current.strftime("%Y-%m-%d")
-        
-        daily_data[day_key]["import"] += import_diff
-        daily_data[day_key]["export"] += export_diff
-        daily_data[day_key]["count"] += 1
-        daily_data[day_key]["date"] = date_current
-        
-    monthly_datasets = defaultdict(lambda: {"labels": [], "imports": [], "exports": [], "total_import": 0, "total_export": 0, "title": "", "type": "bar"})
-    
-    first_record_date = records[0]["ts"].date()
-    last_record_date = records[-1]["ts"].date()
-    
-    current_date = first_record_date
-    while current_date <= last_record_date:
+# === BLOK 7: MAAND-, JAAR- EN JARENOVERZICHT ===
+def build_month_datasets(period_data):
+    monthly_datasets = {}
+    for current_date in iter_dates(period_data["first_date"], period_data["last_date"]):
         month_key = current_date.strftime("%Y-%m")
         if month_key not in monthly_datasets:
-            year, month = month_key.split('-')
-            maand_nl = ["januari", "februari", "maart", "april", "mei", "juni", 
-                       "juli", "augustus", "september", "oktober", "november", "december"][int(month) - 1]
-            monthly_datasets[month_key]["title"] = f"{maand_nl} {year}"
-            
-        current_date += timedelta(days=1)
-    
-    weekly_data = defaultdict(lambda: {"import": 0, "export": 0, "start_date": None, "end_date": None})
-    for day_key, data in sorted(daily_data.items()):
+            monthly_datasets[month_key] = new_dataset("bar")
+            monthly_datasets[month_key]["title"] = f"{MAAND_NL[current_date.month - 1]} {current_date.year}"
+
+    weekly_data = {}
+    for day_key, data in sorted(period_data["daily"].items()):
         date = data["date"]
         year, week_num, _ = date.isocalendar()
         week_key = f"{year}-{week_num:02d}"
-        
-        weekly_data[week_key]["import"] += data["import"]
-        weekly_data[week_key]["export"] += data["export"]
-        
-        if weekly_data[week_key]["start_date"] is None or date < weekly_data[week_key]["start_date"]:
-            weekly_data[week_key]["start_date"] = date
-        if weekly_data[week_key]["end_date"] is None or date > weekly_data[week_key]["end_date"]:
-            weekly_data[week_key]["end_date"] = date
+
+        week = weekly_data.get(week_key)
+        if week is None:
+            week = weekly_data[week_key] = {"import": 0, "export": 0, "start_date": date, "end_date": date}
+        week["import"] += data["import"]
+        week["export"] += data["export"]
+        if date < week["start_date"]:
+            week["start_date"] = date
+        if date > week["end_date"]:
+            week["end_date"] = date
 
     for week_key, data in sorted(weekly_data.items()):
-        if data["start_date"]:
-            month_key = data["start_date"].strftime("%Y-%m")
-            
-            start_date_nl = f"{data['start_date'].day}-{data['start_date'].month}"
-            end_date_nl = f"{data['end_date'].day}-{data['end_date'].month}"
-            label = f"W{week_key.split('-')[1]} ({start_date_nl} t/m {end_date_nl})"
-            
-            monthly_datasets[month_key]["labels"].append(label)
-            monthly_datasets[month_key]["imports"].append(round(data["import"], 3))
-            monthly_datasets[month_key]["exports"].append(round(data["export"], 3))
-            monthly_datasets[month_key]["total_import"] += data["import"]
-            monthly_datasets[month_key]["total_export"] += data["export"]
+        month = monthly_datasets[data["start_date"].strftime("%Y-%m")]
+
+        start_date_nl = f"{data['start_date'].day}-{data['start_date'].month}"
+        end_date_nl = f"{data['end_date'].day}-{data['end_date'].month}"
+        month["labels"].append(f"W{week_key.split('-')[1]} ({start_date_nl} t/m {end_date_nl})")
+        month["imports"].append(round(data["import"], 3))
+        month["exports"].append(round(data["export"], 3))
+        month["total_import"] += data["import"]
+        month["total_export"] += data["export"]
 
     for month in monthly_datasets.values():
         month["total_import"] = round(month["total_import"], 3)
@@ -252,169 +873,322 @@ def aggregate_month(records):
 
     return monthly_datasets
 
-# === BLOK 7: AGGREGATE_YEAR FUNCTIE ===
-def aggregate_year(records):
-    if not records:
-        return {}
-    
-    monthly_data = defaultdict(lambda: {"import": 0, "export": 0, "count": 0})
-    
-    for i in range(1, len(records)):
-        r_prev = records[i-1]
-        r_current = records[i]
-        
-        import_diff = r_current["import_kwh"] - r_prev["import_kwh"]
-        export_diff = r_current["export_kwh"] - r_prev["export_kwh"]
-        
-        if import_diff < 0 or export_diff < 0:
-            continue
-            
-        month_key = r_current["ts"].strftime("%Y-%m")
-        
-        monthly_data[month_key]["import"] += import_diff
-        monthly_data[month_key]["export"] += export_diff
-        monthly_data[month_key]["count"] += 1
-    
-    years = defaultdict(lambda: {"labels": [], "imports": [], "exports": [], "total_import": 0, "total_export": 0, "title": "", "type": "bar"})
-    
-    first_record_date = records[0]["ts"].date()
-    last_record_date = records[-1]["ts"].date()
-    
-    current_date = first_record_date
-    while current_date <= last_record_date:
+def build_year_datasets(period_data):
+    years = {}
+    for current_date in iter_dates(period_data["first_date"], period_data["last_date"]):
         year_key = str(current_date.year)
         if year_key not in years:
+            years[year_key] = new_dataset("bar")
             years[year_key]["title"] = year_key
-        
-        current_date += timedelta(days=1)
-        
-    for month_key, data in sorted(monthly_data.items()):
+
+    for month_key, data in sorted(period_data["monthly"].items()):
         if data["count"] > 0:
-            year = month_key[:4]
-            maand_nl = ["jan", "feb", "mrt", "apr", "mei", "jun", "jul", "aug", "sep", "okt", "nov", "dec"][int(month_key.split('-')[1]) - 1]
-            
-            years[year]["labels"].append(maand_nl)
-            years[year]["imports"].append(round(data["import"], 3))
-            years[year]["exports"].append(round(data["export"], 3))
-            years[year]["total_import"] += data["import"]
-            years[year]["total_export"] += data["export"]
-    
+            year = years[month_key[:4]]
+            year["labels"].append(MAAND_KORT_NL[int(month_key[5:7]) - 1])
+            year["imports"].append(round(data["import"], 3))
+            year["exports"].append(round(data["export"], 3))
+            year["total_import"] += data["import"]
+            year["total_export"] += data["export"]
+
     for year in years.values():
         year["total_import"] = round(year["total_import"], 3)
         year["total_export"] = round(year["total_export"], 3)
-        
-    return years
-
-
-# === BLOK 7.1: AGGREGATE_YEARS FUNCTIE ===
-def aggregate_years(records):
-    if not records:
-        return {}
-
-    # Reuse the aggregate_year function to get yearly totals
-    yearly_data_from_agg_year = aggregate_year(records) # This already has total_import and total_export per year
-
-    all_years = sorted(yearly_data_from_agg_year.keys())
-    years_datasets = defaultdict(lambda: {"labels": [], "imports": [], "exports": [], "total_import": 0, "total_export": 0, "title": "", "type": "bar"})
-    
-    chunk_size = 10
-    for i in range(0, len(all_years), chunk_size):
-        year_chunk_keys = all_years[i:i + chunk_size]
-        first_year = year_chunk_keys[0]
-        last_year = year_chunk_keys[-1]
-        chunk_key = f"{first_year}-{last_year}"
-        
-        years_datasets[chunk_key]["title"] = f"Jaren {first_year} t/m {last_year}"
-        
-        for year_key in year_chunk_keys:
-            year_data = yearly_data_from_agg_year[year_key]
-            years_datasets[chunk_key]["labels"].append(str(year_key))
-            years_datasets[chunk_key]["imports"].append(round(year_data["total_import"], 3))
-            years_datasets[chunk_key]["exports"].append(round(year_data["total_export"], 3))
-            years_datasets[chunk_key]["total_import"] += year_data["total_import"]
-            years_datasets[chunk_key]["total_export"] += year_data["total_export"]
-        
-        years_datasets[chunk_key]["total_import"] = round(years_datasets[chunk_key]["total_import"], 3)
-        years_datasets[chunk_key]["total_export"] = round(years_datasets[chunk_key]["total_export"], 3)
-
-    return years_datasets
 
+    return years
 
-# === BLOK 7.1: AGGREGATE_YEARS FUNCTIE ===
-def aggregate_years(records):
-    if not records:
-        return {}
-
-    daily_data = defaultdict(lambda: {"import": 0, "export": 0, "count": 0, "date": None})
-    for i in range(1, len(records)):
-        r_prev = records[i-1]
-        r_current = records[i]
-        
-        import_diff = r_current["import_kwh"] - r_prev["import_kwh"]
-        export_diff = r_current["export_kwh"] - r_prev["export_kwh"]
-        
-        if import_diff < 0 or export_diff < 0:
-            continue
-            
-        date_current = r_current["ts"].date()
-        day_key = date_current.strftime("%Y-%m-%d")
-        
-        daily_data[day_key]["import"] += import_diff
-        daily_data[day_key]["export"] += export_diff
-        daily_data[day_key]["count"] += 1
-        daily_data[day_key]["date"] = date_current
-
-    yearly_totals = defaultdict(lambda: {"import": 0, "export": 0})
-    for day_key, data in daily_data.items():
-        year = data["date"].year
-        yearly_totals[year]["import"] += data["import"]
-        yearly_totals[year]["export"] += data["export"]
+def build_years_datasets(period_data):
+    yearly_totals = {}
+    for data in period_data["daily"].values():
+        totals = yearly_totals.setdefault(data["date"].year, {"import": 0, "export": 0})
+        totals["import"] += data["import"]
+        totals["export"] += data["export"]
 
     all_years = sorted(yearly_totals.keys())
-    years_datasets = defaultdict(lambda: {"labels": [], "imports": [], "exports": [], "total_import": 0, "total_export": 0, "title": "", "type": "bar"})
-    
+    years_datasets = {}
+
     chunk_size = 10
     for i in range(0, len(all_years), chunk_size):
         year_chunk = all_years[i:i + chunk_size]
         first_year = year_chunk[0]
         last_year = year_chunk[-1]
-        chunk_key = f"{first_year}-{last_year}"
-        
-        years_datasets[chunk_key]["title"] = f"Jaren {first_year} t/m {last_year}"
-        
+
+        chunk = years_datasets[f"{first_year}-{last_year}"] = new_dataset("bar")
+        chunk["title"] = f"Jaren {first_year} t/m {last_year}"
+
         for year in year_chunk:
-            years_datasets[chunk_key]["labels"].append(str(year))
-            years_datasets[chunk_key]["imports"].append(round(yearly_totals[year]["import"], 3))
-            years_datasets[chunk_key]["exports"].append(round(yearly_totals[year]["export"], 3))
-            years_datasets[chunk_key]["total_import"] += yearly_totals[year]["import"]
-            years_datasets[chunk_key]["total_export"] += yearly_totals[year]["export"]
-        
-        years_datasets[chunk_key]["total_import"] = round(years_datasets[chunk_key]["total_import"], 3)
-        years_datasets[chunk_key]["total_export"] = round(years_datasets[chunk_key]["total_export"], 3)
+            chunk["labels"].append(str(year))
+            chunk["imports"].append(round(yearly_totals[year]["import"], 3))
+            chunk["exports"].append(round(yearly_totals[year]["export"], 3))
+            chunk["total_import"] += yearly_totals[year]["import"]
+            chunk["total_export"] += yearly_totals[year]["export"]
+
+        chunk["total_import"] = round(chunk["total_import"], 3)
+        chunk["total_export"] = round(chunk["total_export"], 3)
 
     return years_datasets
 
+def build_all_periods(period_data):
+    return {
+        "day": build_day_datasets(period_data),
+        "week": build_week_datasets(period_data),
+        "month": build_month_datasets(period_data),
+        "year": build_year_datasets(period_data),
+        "years": build_years_datasets(period_data)
+    }
 
-# === BLOK 8: DATA AGGREGATIE ===
-all_periods = {
-    "day": aggregate_day(records),
-    "week": aggregate_week(records),
-    "month": aggregate_month(records),
-    "year": aggregate_year(records),
-    "years": aggregate_years(records)
-}
+def merge_day_series(period_data, cached_day_series):
+    '''
+    Voegt opgeslagen dagreeksen van eerdere dagen samen met de zojuist berekende dagreeksen.
+    '''
+    if not cached_day_series:
+        return
+    day_series = dict(cached_day_series)
+    day_series.update(period_data["day_series"])
+    period_data["day_series"] = day_series
+    period_data["first_date"] = datetime.strptime(min(day_series), "%Y-%m-%d").date()
+
+def aggregate_periods(period_data, rollup_data, cached_day_series=None):
+    '''
+    Bouwt de volledige `all_periods` structuur voor het HTML-template: de daggrafieken uit de dagreeksen
+    van `collect_period_data` (aangevuld met opgeslagen dagreeksen), de overige perioden uit de dagtotalen
+    van de rollup.
+    '''
+    merge_day_series(period_data, cached_day_series)
+    period_data.update(rollup_data)
+    return build_all_periods(period_data)
+
+# === BLOK 8: DASHBOARD ENGINE ===
+# Grenzen voor het bijwerken van een geopende pagina (zie DashboardEngine.changes_since)
+SINCE_MAX_READINGS = 1000
+SINCE_MAX_DAYS = 31
+# Aantal minuten dat de live grafiek in de Nu-weergave toont (zie /api/live in de server)
+LIVE_WINDOW_MINUTES = 10
+
+def last_record(last):
+    '''De laatste meting in de vorm van `lastRecord` in de pagina.'''
+    return {
+        "ts": last["ts"].strftime("%Y-%m-%d %H:%M"),
+        "unix_ts": last["ts"].timestamp(),
+        "active_w": last["active_w"],
+        "is_export": last["active_w"] < 0,
+        "total_import": round(last["import_kwh"], 3),
+        "total_export": round(last["export_kwh"], 3),
+    }
+
+# Vormen waarin `DashboardEngine.dataset_json` een daggrafiek kan leveren
+DATASET_ENCODINGS = ("json", "f32")
+NAN = float("nan")
+
+def encode_array(typecode, values):
+    '''Base64 van `values` als little-endian typed array (zoals Float32Array/Uint16Array in de browser).'''
+    packed = array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+def encode_day_dataset(dataset):
+    '''
+    Compacte vorm ("f32") van een daggrafiek voor de API. De tijden worden als minuut van de dag
+    meegegeven: bij een vaste stap alleen `start` en `step`, anders `start` met de verschillen als
+    Uint8-reeks `deltas`, of (bij een wintertijdwissel of een gat van meer dan 255 minuten) alle minuten
+    als Uint16-reeks `minutes`. De waarden gaan als Float32-reeksen; de pagina maakt er zelf weer labels
+    en getallen van.
+    '''
+    minutes = [int(label[:2]) * 60 + int(label[3:]) for label in dataset["labels"]]
+    encoded = {key: dataset[key] for key in ("title", "type", "total_import", "total_export")}
+    if "full_count" in dataset:
+        encoded["full_count"] = dataset["full_count"]
+    encoded["encoding"] = "f32"
+    encoded["count"] = len(minutes)
+    deltas = [b - a for a, b in zip(minutes, minutes[1:])]
+    steps = set(deltas)
+    if len(steps) <= 1:
+        encoded["start"] = minutes[0] if minutes else 0
+        encoded["step"] = steps.pop() if steps else 0
+    elif min(steps) >= 0 and max(steps) <= 255:
+        encoded["start"] = minutes[0]
+        encoded["deltas"] = encode_array("B", deltas)
+    else:
+        encoded["minutes"] = encode_array("H", minutes)
+    # Gaten (None) gaan als NaN
+    encoded["imports"] = encode_array("f", [NAN if value is None else value for value in dataset["imports"]])
+    encoded["exports"] = encode_array("f", [NAN if value is None else value for value in dataset["exports"]])
+    return encoded
+
+class DashboardEngine:
+    '''
+    Genereert het dashboard en houdt de dagreeksen en de laatste meting in het geheugen, zodat een
+    volgende `refresh()` alleen de metingen vanaf de laatst verwerkte dag hoeft te lezen en te verwerken.
+    De week-, maand-, jaar- en jarenoverzichten komen steeds uit de (incrementeel bijgewerkte) rollups.
+
+    De datasets zelf staan niet in de HTML; de server haalt ze met `period_keys()` en `dataset_json()`
+    uit de laatste `all_periods`. De daggrafieken bestaan uit bins van `day_bin_minutes` (1 tot en met 60)
+    minuten met gaten vanaf `day_gap_minutes` (zie `resample_day`) en gaan standaard uitgedund naar hooguit
+    `day_points` punten (zie `downsample_day_dataset`, 0 = alle punten); de volledige resolutie blijft op te vragen.
+    Met de standaardwaarden (5 minuten, 500 punten) past een hele dag binnen het budget en wordt er niet uitgedund.
+    '''
+
+    def __init__(self, output_path=None, day_points=DAY_POINT_BUDGET, day_bin_minutes=DAY_BIN_MINUTES,
+                 day_gap_minutes=DAY_GAP_MINUTES):
+        if not 1 <= day_bin_minutes <= 60:
+            raise ValueError(f"Binbreedte moet 1 tot en met 60 minuten zijn, niet {day_bin_minutes}.")
+        self.output_path = output_path or output_file
+        self.day_points = day_points
+        self.day_bin_minutes = day_bin_minutes
+        self.day_gap_minutes = day_gap_minutes
+        self.day_series = None
+        self.last_ts = None
+        self.last = None
+        self.all_periods = None
+        # Resultaat van de laatste refresh; wordt in één keer vervangen zodat gelijktijdige lezers
+        # (de API van de server) nooit gegevens van twee verschillende refreshes combineren
+        self.snapshot = {"all_periods": None, "day_json": {}, "last_ts": None, "last": None}
+
+    def period_keys(self, period):
+        '''Gesorteerde sleutels van een periode, of None als de periode (nog) niet bestaat.'''
+        all_periods = self.snapshot["all_periods"]
+        if all_periods is None or period not in all_periods:
+            return None
+        return sorted(all_periods[period])
+
+    def dataset_json(self, period, key, encoding="json", full=False):
+        '''
+        JSON van één dataset uit de laatste `all_periods`, of None als die niet bestaat. Daggrafieken zijn
+        uitgedund tot `day_points` punten, tenzij `full=True`, en kunnen met `encoding="f32"` compact worden
+        opgevraagd (zie `encode_day_dataset`). De JSON van daggrafieken wordt per vorm bewaard tot de dag bij
+        een refresh opnieuw berekend wordt.
+        '''
+        snapshot = self.snapshot
+        all_periods, day_json = snapshot["all_periods"], snapshot["day_json"]
+        if all_periods is None or key not in all_periods.get(period, {}):
+            return None
+        if period != "day":
+            return json.dumps(all_periods[period][key])
+        fragment = day_json.get((key, encoding, full))
+        if fragment is None:
+            dataset = all_periods["day"][key]
+            if not full:
+                dataset = downsample_day_dataset(dataset, self.day_points)
+            fragment = day_json[(key, encoding, full)] = json.dumps(encode_day_dataset(dataset) if encoding == "f32" else dataset)
+        return fragment
+
+    def changes_since(self, since_ts, max_readings=SINCE_MAX_READINGS, max_days=SINCE_MAX_DAYS):
+        '''
+        Alles wat een geopende pagina nodig heeft om bij te werken vanaf `since_ts` (Unix timestamp), tot en
+        met de laatste refresh: de laatste meting, de (hooguit `max_readings` meest recente) metingen en de
+        datasets van alle periodesleutels waar nieuwe metingen in kunnen vallen (daggrafieken uitgedund). De
+        metingen zijn bedoeld voor clients zonder live stream (/api/live), zoals een tablet die alleen peilt.
+        Ligt `since_ts` meer dan `max_days` dagen terug, dan is herladen goedkoper en staat "reload" op True.
+        Retourneert None als er nog geen refresh is geweest.
+        '''
+        snapshot = self.snapshot
+        all_periods, last_ts = snapshot["all_periods"], snapshot["last_ts"]
+        if all_periods is None:
+            return None
+
+        changes = {"ts": last_ts, "last": last_record(snapshot["last"]), "reload": False, "readings": [], "periods": {}}
+        if since_ts >= last_ts:
+            return changes
+
+        first_date = datetime.fromtimestamp(since_ts).date()
+        last_date = datetime.fromtimestamp(last_ts).date()
+        if (last_date - first_date).days > max_days:
+            changes["reload"] = True
+            return changes
+
+        conn = sqlite3.connect(get_db_path())
+        try:
+            changes["readings"] = read_readings(conn, since_ts, last_ts, max_readings)
+        finally:
+            conn.close()
+
+        # Dezelfde sleutels als in BLOK 6 en 7
+        period_keys = {period: set() for period in all_periods}
+        for current_date in iter_dates(first_date, last_date):
+            year, week_num, _ = current_date.isocalendar()
+            period_keys["day"].add(current_date.strftime("%Y-%m-%d"))
+            period_keys["week"].add(f"{year}-{week_num:02d}")
+            period_keys["month"].add(current_date.strftime("%Y-%m"))
+            period_keys["year"].add(str(current_date.year))
+            period_keys["years"].update(key for key in all_periods["years"]
+                                        if int(key[:4]) <= current_date.year <= int(key[5:]))
+        for period, keys in period_keys.items():
+            datasets = {key: all_periods[period][key] for key in sorted(keys) if key in all_periods[period]}
+            if period == "day":
+                datasets = {key: downsample_day_dataset(dataset, self.day_points) for key, dataset in datasets.items()}
+            if datasets:
+                changes["periods"][period] = datasets
+        return changes
+
+    def refresh(self, full=False, progress=None):
+        '''
+        Werkt de aggregaties bij met de nieuwe metingen en schrijft het HTML-bestand opnieuw.
+        Met `full=True` worden alle dagreeksen opnieuw berekend. `progress` wordt (indien opgegeven)
+        aangeroepen met de naam van elke stap. Retourneert `all_periods`.
+        '''
+        report = progress or (lambda stage: None)
+        report("rollups bijwerken")
+        conn = sqlite3.connect(get_db_path())
+        try:
+            # Vóór het lezen van de metingen, net als in update_rollups
+            generation = get_generation(conn)
+            update_rollups(conn)
+            rollup_data = read_rollup_period_data(conn)
+            # Partiële regeneratie: alleen de metingen vanaf de laatst opgeslagen dag inlezen
+            layout = day_series_layout(self.day_bin_minutes, self.day_gap_minutes)
+            start = None if full else get_partial_start(conn, layout, generation)
+            cached_day_series = {}
+            day_json = {}
+            if start is not None:
+                start_key = datetime.fromtimestamp(start).strftime("%Y-%m-%d")
+                stored_ts = conn.execute(f"SELECT last_ts FROM {DAY_SERIES_STATE_TABLE} WHERE source_table = ?", (table_name,)).fetchone()[0]
+                if self.day_series is not None and self.last_ts == stored_ts:
+                    # Niemand anders heeft de opgeslagen stand bijgewerkt: de dagreeksen in het geheugen zijn actueel
+                    cached_day_series = {key: series for key, series in self.day_series.items() if key < start_key}
+                    day_json = {cache_key: fragment for cache_key, fragment in self.snapshot["day_json"].items()
+                                if cache_key[0] < start_key}
+                else:
+                    cached_day_series = read_day_series(conn, start_key)
+        finally:
+            conn.close()
+
+        report("metingen lezen")
+        period_data, last, last_ts = load_period_data(start, self.day_bin_minutes, self.day_gap_minutes)
+        new_day_series = period_data["day_series"]
+        report("aggregeren")
+        all_periods = aggregate_periods(period_data, rollup_data, cached_day_series)
+        report("HTML schrijven")
+        write_dashboard(last, self.output_path)
+
+        # Alleen de opnieuw berekende dagen opslaan; bij een volledige berekening de hele opgeslagen stand vervangen
+        report("dagreeksen opslaan")
+        conn = sqlite3.connect(get_db_path())
+        try:
+            save_day_series(conn, new_day_series, last_ts, replace_all=start is None, layout=layout, generation=generation)
+        finally:
+            conn.close()
+
+        self.day_series = period_data["day_series"]
+        self.last_ts = last_ts
+        self.last = last
+        self.all_periods = all_periods
+        self.snapshot = {"all_periods": all_periods, "day_json": day_json, "last_ts": last_ts, "last": last}
+        return all_periods
 
 # === BLOK 9: HTML TEMPLATE ===
-html_content = f"""
-<!DOCTYPE html>
-<html lang="nl">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>Energie Dashboard</title>
-<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-<style>
-:root {{
+# Chart.js 4.5.1 wordt meegeleverd in vendor/ en met het dashboard geserveerd, zodat het ook zonder internet laadt.
+# Het bestand is dist/chart.umd.js van chart.js 4.5.1, ongewijzigd (zie README). Een bestand met een andere hash
+# wordt niet geserveerd; werk bij vervangen van het bestand de hash en de SRI-hash bij.
+# Ontbreekt het bestand of klopt de hash niet, dan laadt de pagina dezelfde versie van het CDN. De browser voert
+# dat script alleen uit als het byte voor byte gelijk is aan het meegeleverde bestand (Subresource Integrity).
+CHARTJS_VENDOR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vendor", "chart.umd.js")
+CHARTJS_VENDOR_SHA256 = "ecc3cd1eeb8c34d2178e3f59fd63ec5a3d84358c11730af0b9958dc886d7652a"
+CHARTJS_CDN_URL = "https://cdn.jsdelivr.net/npm/chart.js@4.5.1/dist/chart.umd.js"
+CHARTJS_CDN_INTEGRITY = "sha384-hfkuqrKeWFmnTMWN31VWyoe8xgdTADD11kgxmdpx2uyE6j5Az5uZq6u6AKYYmAOw"
+
+def render_css():
+    '''De stylesheet van het dashboard.'''
+    return """:root {
     --bg-primary: #1e1e1e;
     --bg-secondary: #2c2c2e;
     --text-primary: #ffffff;
@@ -423,72 +1197,72 @@ html_content = f"""
     --accent-export: #32CD32;
     --accent-active: #4169E1;
     --grid-color: #3a3a3c;
-}}
+}
 
-body {{ 
+body { 
     font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; 
     margin: 0; 
     padding: 0; 
     background: var(--bg-primary); 
     color: var(--text-primary);
-}}
+}
 
-.container {{ 
+.container { 
     max-width: 100%; 
     margin: 0 auto; 
     padding: 16px; 
-}}
+}
 
-.header {{ 
+.header { 
     text-align: center; 
     margin-bottom: 10px; 
-}}
+}
 
-.header h1 {{ 
+.header h1 { 
     font-size: 24px; 
     font-weight: 600; 
     margin: 0 0 5px 0; 
     color: var(--text-primary);
-}}
+}
 
-.period-title {{ 
+.period-title { 
     text-align: center; 
     font-size: 18px; 
     font-weight: 600; 
     margin: 10px 0;
-}}
+}
 
-.period-totals {{ 
+.period-totals { 
     text-align: center; 
     margin: 8px 0; 
     font-size: 14px;
-}}
+}
 
-.period-totals .import {{ color: var(--accent-import); }}
-.period-totals .export {{ color: var(--accent-export); }}
+.period-totals .import { color: var(--accent-import); }
+.period-totals .export { color: var(--accent-export); }
 
-.chart-container {{ 
+.chart-container { 
     position: relative; 
     height: 40vh; 
     width: 100%; 
     margin-bottom: 10px;
-}}
+}
 
-.chart-canvas {{ 
+.chart-canvas { 
     background: var(--bg-secondary); 
     border-radius: 12px; 
     padding: 16px; 
     box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
-}}
+}
 
-.period-nav {{ 
+.period-nav { 
     display: flex; 
     justify-content: center; 
     gap: 8px; 
     margin: 10px 0;
-}}
+}
 
-.period-nav button, .period-nav select {{ 
+.period-nav button, .period-nav select { 
     background: var(--bg-secondary); 
     border: none; 
     color: var(--text-primary); 
@@ -497,31 +1271,31 @@ body {{
     font-size: 14px; 
     cursor: pointer; 
     transition: all 0.2s ease;
-}}
+}
 
-.period-nav select {{
+.period-nav select {
     -webkit-appearance: none;
     -moz-appearance: none;
     appearance: none;
-}}
+}
 
-.period-nav button:hover {{ 
+.period-nav button:hover { 
     background: #3a3a3c; 
-}}
+}
 
-.period-nav button.active, .period-nav select.active {{ 
+.period-nav button.active, .period-nav select.active { 
     background: var(--accent-active); 
     font-weight: 600;
-}}
+}
 
-.nav-controls {{ 
+.nav-controls { 
     display: flex; 
     justify-content: center; 
     gap: 8px; 
     margin: 10px 0;
-}}
+}
 
-.nav-controls button {{ 
+.nav-controls button { 
     background: var(--bg-secondary); 
     border: none; 
     color: var(--text-primary); 
@@ -531,60 +1305,32 @@ body {{
     font-weight: 500; 
     cursor: pointer; 
     transition: all 0.2s ease;
-}}
+}
 
-.nav-controls button:hover {{ 
+.nav-controls button:hover { 
     background: #3a3a3c; 
-}}
+}
 
-.nav-controls button:disabled {{ 
+.nav-controls button:disabled { 
     opacity: 0.5; 
     cursor: not-allowed;
-}}
+}
 
-.info-text {{ 
+.nav-controls button.active { 
+    background: var(--accent-active); 
+}
+
+.info-text { 
     text-align: center; 
     color: var(--text-secondary); 
     font-size: 12px; 
     margin-top: 15px;
-}}
-</style>
-</head>
-<body>
-<div class="container">
-    <div class="header">
-        <h1>Energie Dashboard</h1>
-        <button id="refreshBtn" onclick="refreshDashboard()" style="padding: 8px 16px; border-radius: 20px; border: none; background: var(--accent-active); color: var(--text-primary); cursor: pointer; font-size: 14px; margin-top: 10px;">Vernieuwen</button>
-        <div id="refreshStatus" class="info-text" style="margin-top: 5px;"></div>
-    </div>
-
-    <div class="period-title" id="periodTitle">Huidig verbruik</div>
-    
-    <div class="period-totals" id="periodTotals"></div>
-
-    <div class="chart-container">
-        <canvas id="energyChart" class="chart-canvas"></canvas>
-    </div>
-
-    <div class="nav-controls">
-        <button id="btnPrev" onclick="navigatie(-1)" disabled>←</button>
-        <button id="btnCurrent" onclick="navigatie(0)" disabled>Huidige</button>
-        <button id="btnNext" onclick="navigatie(1)" disabled>→</button>
-    </div>
-
-    <div class="period-nav">
-        <button id="btnYears" onclick="setPeriod('years')">Jaren</button>
-        <button id="btnDay" onclick="setPeriod('day')">Dag</button>
-        <button id="btnWeek" onclick="setPeriod('week')">Week</button>
-        <button id="btnMonth" onclick="setPeriod('month')">Maand</button>
-                <select id="yearSelector" class="period-nav-button" onchange="showYear(this.value)"><option value="">Jaar</option></select>
-    </div>
-
-    <div class="info-text" id="updateInfo">Laatste update: {datetime.now().strftime('%d-%m-%Y %H:%M')}</div>
-</div>
+}
+"""
 
-<script>
-function refreshDashboard() {{
+def render_js(data_file):
+    '''Het script van het dashboard; `data_file` is de naam van het databestand naast de pagina.'''
+    return f"""function refreshDashboard() {{
     const refreshBtn = document.getElementById('refreshBtn');
     const refreshStatus = document.getElementById('refreshStatus');
 
@@ -592,6 +1338,7 @@ function refreshDashboard() {{
     refreshBtn.textContent = 'Bezig...';
     refreshStatus.textContent = '';
 
+    // De server vernieuwt op de achtergrond; daarna wordt /refresh/status gevolgd tot de refresh klaar is
     fetch('/refresh')
         .then(response => {{
             if (!response.ok) {{
@@ -602,15 +1349,12 @@ function refreshDashboard() {{
             }}
             return response.json();
         }})
-        .then(data => {{
-            if (data.status === 'success') {{
-                refreshStatus.textContent = 'Succes! Pagina wordt herladen...';
-                setTimeout(() => {{
-                    window.location.reload();
-                }}, 1000); // Wacht 1 seconde zodat de gebruiker de melding kan zien
-            }} else {{
-                throw new Error(data.message || 'Onbekende fout opgetreden.');
-            }}
+        .then(data => waitForRefresh(data.run))
+        .then(() => syncSince())
+        .then(() => {{
+            refreshStatus.textContent = 'Bijgewerkt.';
+            refreshBtn.disabled = false;
+            refreshBtn.textContent = 'Vernieuwen';
         }})
         .catch(error => {{
             console.error('Fout bij vernieuwen:', error);
@@ -620,7 +1364,237 @@ function refreshDashboard() {{
         }});
 }}
 
-const allData = {json.dumps(all_periods)};
+function waitForRefresh(run) {{
+    const refreshStatus = document.getElementById('refreshStatus');
+    return fetch('/refresh/status')
+        .then(response => {{
+            if (!response.ok) throw new Error(`Serverfout: ${{response.statusText}}`);
+            return response.json();
+        }})
+        .then(status => {{
+            if (status.run === run && status.state === 'running') {{
+                refreshStatus.textContent = `${{status.stage || 'Bezig'}}... (${{(status.elapsed_s || 0).toFixed(1)}} s)`;
+                return new Promise(resolve => setTimeout(resolve, 500)).then(() => waitForRefresh(run));
+            }}
+            if (status.run === run && status.state === 'error') {{
+                throw new Error(status.last_error || 'Onbekende fout opgetreden.');
+            }}
+            // Klaar, of alweer ingehaald door een nieuwere refresh
+        }});
+}}
+
+// De datasets worden per periode en sleutel bij de server opgehaald (/api/periods), zodat de pagina
+// niet groeit met de meetgeschiedenis. Opgehaalde datasets blijven in een kleine cache.
+const PERIODS = ['day', 'week', 'month', 'year', 'years'];
+const DATASET_CACHE_SIZE = 60;
+const SYNC_INTERVAL_MS = 60000;
+const periodIndex = {{}};
+const datasetCache = new Map();
+let chartRequest = 0;
+let syncing = null;
+
+function fetchJson(url) {{
+    return fetch(url).then(response => {{
+        if (!response.ok) {{
+            return response.json().catch(() => ({{}})).then(err => {{
+                throw new Error(err.message || `Serverfout: ${{response.statusText}}`);
+            }});
+        }}
+        return response.json();
+    }});
+}}
+
+function loadIndex(period) {{
+    return fetchJson(`/api/periods/${{period}}`).then(data => {{
+        periodIndex[period] = data.keys;
+        return data.keys;
+    }});
+}}
+
+function cacheDataset(cacheKey, promise) {{
+    // Achteraan zetten: de cache verwijdert de langst niet gebruikte dataset
+    datasetCache.delete(cacheKey);
+    datasetCache.set(cacheKey, promise);
+    while (datasetCache.size > DATASET_CACHE_SIZE) {{
+        datasetCache.delete(datasetCache.keys().next().value);
+    }}
+    return promise;
+}}
+
+// Daggrafieken komen compact binnen (?encoding=f32): tijden als minuut van de dag en waarden als base64
+// Float32-reeksen, die hier met typed arrays zonder tekst-parsing worden uitgelezen.
+const TIME_LABELS = Array.from({{ length: 24 * 60 }}, (_, minute) =>
+    `${{String(Math.floor(minute / 60)).padStart(2, '0')}}:${{String(minute % 60).padStart(2, '0')}}`);
+
+function decodeBase64(text) {{
+    const binary = atob(text);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    return bytes.buffer;
+}}
+
+// NaN is een gat in de daggrafiek; Chart.js onderbreekt de lijn bij null
+function decodeValues(text) {{
+    const floats = new Float32Array(decodeBase64(text));
+    const values = new Array(floats.length);
+    for (let i = 0; i < floats.length; i++) {{
+        const value = floats[i];
+        values[i] = value === value ? value : null;
+    }}
+    return values;
+}}
+
+function decodeDataset(dataset) {{
+    if (dataset.encoding !== 'f32') return dataset;
+    const labels = new Array(dataset.count);
+    if (dataset.minutes !== undefined) {{
+        const minutes = new Uint16Array(decodeBase64(dataset.minutes));
+        for (let i = 0; i < dataset.count; i++) labels[i] = TIME_LABELS[minutes[i]];
+    }} else if (dataset.deltas !== undefined) {{
+        const deltas = new Uint8Array(decodeBase64(dataset.deltas));
+        let minute = dataset.start;
+        for (let i = 0; i < dataset.count; i++) {{
+            labels[i] = TIME_LABELS[minute];
+            minute += deltas[i] || 0;
+        }}
+    }} else {{
+        for (let i = 0; i < dataset.count; i++) labels[i] = TIME_LABELS[dataset.start + i * dataset.step];
+    }}
+    return {{
+        title: dataset.title,
+        type: dataset.type,
+        total_import: dataset.total_import,
+        total_export: dataset.total_export,
+        full_count: dataset.full_count,
+        labels: labels,
+        imports: decodeValues(dataset.imports),
+        exports: decodeValues(dataset.exports)
+    }};
+}}
+
+// Daggrafieken zijn standaard uitgedund tot een vast aantal punten; met `full` alle punten van de dag
+function datasetKey(period, key, full) {{
+    return `${{period}}/${{key}}` + (full ? '/full' : '');
+}}
+
+function loadDataset(period, key, full = false) {{
+    const cacheKey = datasetKey(period, key, full);
+    let promise = datasetCache.get(cacheKey);
+    if (!promise) {{
+        const query = period === 'day' ? '?encoding=f32' + (full ? '&full=1' : '') : '';
+        promise = fetchJson(`/api/periods/${{period}}/${{encodeURIComponent(key)}}${{query}}`).then(decodeDataset);
+        promise.catch(() => datasetCache.delete(cacheKey));
+    }}
+    return cacheDataset(cacheKey, promise);
+}}
+
+function addYearOption(year) {{
+    const option = document.createElement('option');
+    option.value = year;
+    option.textContent = year;
+    document.getElementById('yearSelector').appendChild(option);
+}}
+
+// Haalt de metingen en gewijzigde datasets sinds de vorige synchronisatie op (/api/since) en werkt
+// de gegevens in het geheugen en de getoonde grafiek bij, zonder de pagina te herladen.
+function syncSince() {{
+    if (syncing) return syncing;
+    syncing = fetchJson(`/api/since?ts=${{state.since}}`)
+        .then(changes => {{
+            if (changes.reload) {{
+                window.location.reload();
+                return;
+            }}
+            // De live stream van de Nu-weergave kan al een nieuwere meting hebben
+            if (changes.last.unix_ts >= lastRecord.unix_ts) Object.assign(lastRecord, changes.last);
+            Object.entries(changes.periods).forEach(([period, datasets]) => {{
+                const keys = periodIndex[period];
+                Object.entries(datasets).forEach(([key, dataset]) => {{
+                    if (keys && !keys.includes(key)) {{
+                        keys.push(key);
+                        keys.sort();
+                        state.lastKeys[period] = keys[keys.length - 1];
+                        if (period === 'year') addYearOption(key);
+                    }}
+                    cacheDataset(datasetKey(period, key), Promise.resolve(dataset));
+                    if (state.chartKey === datasetKey(period, key)) updateChartInPlace(dataset);
+                    // Een daggrafiek met alle punten opnieuw ophalen als die getoond wordt
+                    const fullKey = datasetKey(period, key, true);
+                    datasetCache.delete(fullKey);
+                    if (state.chartKey === fullKey) {{
+                        loadDataset(period, key, true)
+                            .then(full => {{ if (state.chartKey === fullKey) updateChartInPlace(full); }})
+                            .catch(error => console.error('Fout bij bijwerken:', error));
+                    }}
+                }});
+            }});
+            // Zonder verbonden stream (bijv. een tablet die alleen peilt) vullen de metingen de Nu-weergave
+            if (!liveSource) changes.readings.forEach(([ts, activeW]) => addLivePoint(ts, activeW));
+            if (state.period === 'now') updateNowView();
+            else if (state.chartKey) updateNavigationButtons();
+            state.since = changes.ts;
+            const now = new Date();
+            const pad = n => String(n).padStart(2, '0');
+            document.getElementById('updateInfo').textContent =
+                `Laatste update: ${{pad(now.getDate())}}-${{pad(now.getMonth() + 1)}}-${{now.getFullYear()}} ${{pad(now.getHours())}}:${{pad(now.getMinutes())}}`;
+        }})
+        .finally(() => {{ syncing = null; }});
+    return syncing;
+}}
+
+// Live metingen voor de Nu-weergave via Server-Sent Events (/api/live). Na een onderbreking maakt de
+// browser zelf opnieuw verbinding en krijgt dan alleen de metingen na de laatst ontvangen id.
+const LIVE_WINDOW_MS = {LIVE_WINDOW_MINUTES * 60000};
+let liveSource = null;
+let livePoints = [];
+let liveRedraw = null;
+
+function startLive() {{
+    if (liveSource || !window.EventSource) return;
+    livePoints = [];
+    liveSource = new EventSource('/api/live');
+    liveSource.addEventListener('meting', event => {{
+        const record = JSON.parse(event.data);
+        if (!addLivePoint(record.unix_ts, record.active_w)) return;
+        if (record.unix_ts > lastRecord.unix_ts) Object.assign(lastRecord, record);
+        // Een reeks berichten (zoals de eerste minuten na verbinden) in één keer tekenen
+        if (!liveRedraw) {{
+            liveRedraw = setTimeout(() => {{
+                liveRedraw = null;
+                if (state.period === 'now') updateNowView();
+            }}, 200);
+        }}
+    }});
+}}
+
+// Voegt een meting toe aan de live grafiek, ook vanuit /api/since als de stream niet beschikbaar is
+function addLivePoint(unixTs, activeW) {{
+    const x = unixTs * 1000;
+    if (livePoints.length && x <= livePoints[livePoints.length - 1].x) return false;
+    livePoints.push({{ x: x, y: activeW }});
+    while (livePoints[0].x < x - LIVE_WINDOW_MS) livePoints.shift();
+    return true;
+}}
+
+function stopLive() {{
+    if (!liveSource) return;
+    liveSource.close();
+    liveSource = null;
+}}
+
+function formatClock(ms) {{
+    const date = new Date(ms);
+    const pad = n => String(n).padStart(2, '0');
+    return `${{pad(date.getHours())}}:${{pad(date.getMinutes())}}:${{pad(date.getSeconds())}}`;
+}}
+
+function prefetchNeighbours(period, key) {{
+    const keys = periodIndex[period] || [];
+    const index = keys.indexOf(key);
+    [index - 1, index + 1].forEach(i => {{
+        if (i >= 0 && i < keys.length) loadDataset(period, keys[i], isFullDay()).catch(() => {{}});
+    }});
+}}
 
 const myLabelsPlugin = {{
     id: 'my-labels',
@@ -659,53 +1633,43 @@ let clickedStates = {{}};
 let state = {{
     period: 'now',
     currentKey: null,
+    chartKey: null,  // periode/sleutel van de dataset in de huidige grafiek
+    fullDay: false,  // daggrafiek met alle punten in plaats van uitgedund
+    since: null,
     history: []
 }};
 
-const lastRecord = {{
-    ts: '{records[-1]["ts"].strftime("%Y-%m-%d %H:%M") if records else "Geen data"}',
-    active_w: {records[-1]["active_w"] if records else 0},
-    is_export: {str(records[-1]["active_w"] < 0).lower() if records else "false"},
-    total_import: {last_values["import_kwh"]},
-    total_export: {last_values["export_kwh"]}
-}};
+// De laatste meting en het tijdstip van genereren komen uit het databestand naast de pagina (zie loadData)
+const DATA_FILE = {json.dumps(data_file)};
+const lastRecord = {{}};
+
+function loadData() {{
+    return fetchJson(DATA_FILE).then(data => {{
+        Object.assign(lastRecord, data.last);
+        state.since = lastRecord.unix_ts;
+        document.getElementById('updateInfo').textContent = `Laatste update: ${{data.generated}}`;
+    }});
+}}
 
 function init() {{
-    const firstDayKey = Object.keys(allData.day).sort()[0];
-    const firstWeekKey = Object.keys(allData.week).sort()[0];
-    const firstMonthKey = Object.keys(allData.month).sort()[0];
-    const firstYearKey = Object.keys(allData.year).sort()[0];
-
-    const lastDayKey = Object.keys(allData.day).sort().pop();
-    const lastWeekKey = Object.keys(allData.week).sort().pop();
-    const lastMonthKey = Object.keys(allData.month).sort().pop();
-    const lastYearKey = Object.keys(allData.year).sort().pop();
-
-    state.initialKeys = {{
-        'day': firstDayKey,
-        'week': firstWeekKey,
-        'month': firstMonthKey,
-        'year': firstYearKey,
-        'years': Object.keys(allData.years).sort()[0] // First chunk of years
-    }};
-    state.lastKeys = {{
-        'day': lastDayKey,
-        'week': lastWeekKey,
-        'month': lastMonthKey,
-        'year': lastYearKey,
-        'years': Object.keys(allData.years).sort().pop() // Last chunk of years
-    }};
+    Promise.all([loadData(), ...PERIODS.map(loadIndex)]).then(() => {{
+        state.initialKeys = {{}};
+        state.lastKeys = {{}};
+        PERIODS.forEach(period => {{
+            state.initialKeys[period] = periodIndex[period][0];
+            state.lastKeys[period] = periodIndex[period][periodIndex[period].length - 1];
+        }});
+
+        periodIndex.year.forEach(addYearOption);
 
-    const yearSelect = document.getElementById('yearSelector');
-    const years = Object.keys(allData.year).sort();
-    years.forEach(year => {{
-        const option = document.createElement('option');
-        option.value = year;
-        option.textContent = year;
-        yearSelect.appendChild(option);
+        setPeriod('years');
+        setInterval(() => {{
+            if (!document.hidden) syncSince().catch(error => console.error('Fout bij bijwerken:', error));
+        }}, SYNC_INTERVAL_MS);
+    }}).catch(error => {{
+        console.error('Fout bij laden:', error);
+        renderNoData(`Fout bij laden: ${{error.message}}`);
     }});
-    
-    setPeriod('years');
 }}
 
 function findPeriodKey(periodType, date) {{
@@ -750,16 +1714,69 @@ function showYear(year) {{
 }}
 
 function updateChart() {{
-    if (chart) {{
-        chart.destroy();
-    }}
-
+    const request = ++chartRequest;
     if (state.period === 'now') {{
         renderNowView();
         return;
     }}
-    
-    const currentItem = allData[state.period][state.currentKey];
+    stopLive();
+
+    const period = state.period;
+    const key = state.currentKey;
+    loadDataset(period, key, isFullDay())
+        .then(currentItem => {{
+            // Intussen verder genavigeerd: deze dataset niet meer tonen
+            if (request !== chartRequest) return;
+            renderChart(currentItem);
+            prefetchNeighbours(period, key);
+        }})
+        .catch(error => {{
+            if (request !== chartRequest) return;
+            console.error('Fout bij laden:', error);
+            renderNoData(`Fout bij laden: ${{error.message}}`);
+        }});
+}}
+
+function isFullDay() {{
+    return state.period === 'day' && state.fullDay;
+}}
+
+function toggleFullDay() {{
+    state.fullDay = !state.fullDay;
+    updateChart();
+}}
+
+function renderPeriodHeader(currentItem) {{
+    document.getElementById('periodTitle').textContent = currentItem.title;
+    document.getElementById('periodTotals').innerHTML = 
+        `<span class="import">Verbruik: ${{currentItem.total_import.toFixed(2)}} kWh</span> • ` +
+        `<span class="export">Teruglevering: ${{currentItem.total_export.toFixed(2)}} kWh</span>`;
+
+    // Alleen zichtbaar bij een uitgedunde daggrafiek (of om terug te gaan naar de uitgedunde)
+    const btnFullDay = document.getElementById('btnFullDay');
+    btnFullDay.hidden = !(isFullDay() || currentItem.full_count);
+    if (isFullDay()) btnFullDay.classList.add('active');
+    else btnFullDay.classList.remove('active');
+}}
+
+// Nieuwe gegevens voor de getoonde dataset: de bestaande grafiek bijwerken in plaats van opnieuw opbouwen
+function updateChartInPlace(currentItem) {{
+    if (!currentItem.labels || currentItem.labels.length === 0) {{
+        renderChart(currentItem);
+        return;
+    }}
+    chart.data.labels = currentItem.labels;
+    chart.data.datasets[0].data = currentItem.imports;
+    chart.data.datasets[1].data = currentItem.exports;
+    renderPeriodHeader(currentItem);
+    chart.update('none');
+}}
+
+function renderChart(currentItem) {{
+    if (chart) {{
+        chart.destroy();
+    }}
+    state.chartKey = null;
 
     if (!currentItem || !currentItem.labels || currentItem.labels.length === 0) {{
         renderNoData();
@@ -767,11 +1784,7 @@ function updateChart() {{
     }}
     
     updateNavigationButtons();
-    
-    document.getElementById('periodTitle').textContent = currentItem.title;
-    document.getElementById('periodTotals').innerHTML = 
-        `<span class="import">Verbruik: ${{currentItem.total_import.toFixed(2)}} kWh</span> • ` +
-        `<span class="export">Teruglevering: ${{currentItem.total_export.toFixed(2)}} kWh</span>`;
+    renderPeriodHeader(currentItem);
     
     const gradientImport = ctx.createLinearGradient(0, 0, 0, 400);
     gradientImport.addColorStop(0, 'rgba(147, 112, 219, 0.6)');
@@ -863,31 +1876,31 @@ function updateChart() {{
         data: chartData,
         options: options
     }});
+    state.chartKey = datasetKey(state.period, state.currentKey, isFullDay());
 }}
 
 function renderNowView() {{
-    document.getElementById('periodTitle').textContent = 'Huidig verbruik';
-    document.getElementById('periodTotals').innerHTML = 
-        `Laatste meting: ${{lastRecord.ts}}`;
-    
-    const value = Math.abs(lastRecord.active_w);
-    const isExport = lastRecord.is_export;
-    
+    state.chartKey = null;
+    startLive();
+
     const chartData = {{
-        labels: ['Huidig verbruik'],
         datasets: [
             {{
-                label: isExport ? 'Teruglevering' : 'Verbruik',
-                data: [value],
-                backgroundColor: isExport ? colorExport : colorImport,
-                borderColor: isExport ? colorExport : colorImport,
+                label: 'Vermogen',
+                data: livePoints.length ? livePoints : [{{ x: lastRecord.unix_ts * 1000, y: lastRecord.active_w }}],
                 borderWidth: 2,
-                borderRadius: 6,
-                barPercentage: 0.6
+                pointRadius: 0,
+                tension: 0.2,
+                // Verbruik boven de nullijn, teruglevering eronder
+                segment: {{
+                    borderColor: (context) => context.p1.parsed.y < 0 ? colorExport : colorImport
+                }},
+                borderColor: colorImport,
+                fill: {{ target: 'origin', above: colorImport + '40', below: colorExport + '40' }}
             }}
         ]
     }};
-    
+
     const options = {{
         responsive: true,
         maintainAspectRatio: false,
@@ -895,40 +1908,60 @@ function renderNowView() {{
             legend: {{ display: false }},
             tooltip: {{
                 callbacks: {{
-                    label: (context) => `${{isExport ? 'Teruglevering' : 'Verbruik'}}: ${{context.parsed.y}} W`
+                    title: (items) => formatClock(items[0].parsed.x),
+                    label: (context) => `${{context.parsed.y < 0 ? 'Teruglevering' : 'Verbruik'}}: ${{Math.abs(context.parsed.y).toFixed(0)}} W`
                 }}
             }}
         }},
         scales: {{
             x: {{
+                type: 'linear',
                 grid: {{ display: false, drawBorder: false }},
-                ticks: {{ color: '#aaaaaa' }}
+                ticks: {{ color: '#aaaaaa', maxTicksLimit: 6, callback: (value) => formatClock(value).slice(0, 5) }}
             }},
             y: {{
                 grid: {{ color: gridColor, drawBorder: false }},
-                ticks: {{ color: '#aaaaaa', callback: (value) => `${{value}} W` }},
-                beginAtZero: true
+                ticks: {{ color: '#aaaaaa', callback: (value) => `${{value}} W` }}
             }}
         }},
-        animation: {{ duration: 1000 }}
+        animation: false
     }};
-    
+
     if (chart) {{
         chart.destroy();
     }}
     chart = new Chart(ctx, {{
-        type: 'bar',
+        type: 'line',
         data: chartData,
         options: options
     }});
-    
+    updateNowView();
+
     document.getElementById('btnPrev').disabled = true;
     document.getElementById('btnCurrent').disabled = true;
     document.getElementById('btnNext').disabled = true;
+    document.getElementById('btnFullDay').hidden = true;
 }}
 
-function renderNoData() {{
-    document.getElementById('periodTitle').textContent = 'Geen data beschikbaar';
+// Werkt de live grafiek en de laatste meting bij zonder de grafiek opnieuw op te bouwen
+function updateNowView() {{
+    const isExport = lastRecord.is_export;
+    document.getElementById('periodTitle').textContent = 'Huidig verbruik';
+    document.getElementById('periodTotals').innerHTML =
+        `<span class="${{isExport ? 'export' : 'import'}}">${{isExport ? 'Teruglevering' : 'Verbruik'}}: ${{Math.abs(lastRecord.active_w).toFixed(0)}} W</span> • ` +
+        `Laatste meting: ${{lastRecord.ts}}`;
+
+    if (livePoints.length) chart.data.datasets[0].data = livePoints;
+    const points = chart.data.datasets[0].data;
+    const end = points[points.length - 1].x;
+    chart.options.scales.x.min = end - LIVE_WINDOW_MS;
+    chart.options.scales.x.max = end;
+    chart.update('none');
+}}
+
+function renderNoData(message) {{
+    state.chartKey = null;
+    document.getElementById('periodTitle').textContent = message || 'Geen data beschikbaar';
     document.getElementById('periodTotals').innerHTML = '';
     
     if (chart) {{
@@ -938,10 +1971,11 @@ function renderNoData() {{
     document.getElementById('btnPrev').disabled = true;
     document.getElementById('btnCurrent').disabled = true;
     document.getElementById('btnNext').disabled = true;
+    document.getElementById('btnFullDay').hidden = true;
 }}
 
 function updateNavigationButtons() {{
-    const sortedKeys = Object.keys(allData[state.period]).sort();
+    const sortedKeys = periodIndex[state.period];
     const currentIndex = sortedKeys.indexOf(state.currentKey);
     
     document.getElementById('btnPrev').disabled = currentIndex === 0;
@@ -951,6 +1985,8 @@ function updateNavigationButtons() {{
 
 function setPeriod(period) {{
     clickedStates = {{}}; // Reset clicked states
+    state.fullDay = false;
+    document.getElementById('btnFullDay').classList.remove('active');
     document.querySelectorAll('.period-nav button').forEach(btn => {{
         btn.classList.remove('active');
     }});
@@ -973,7 +2009,7 @@ function setPeriod(period) {{
 
     let newKey = state.lastKeys[period]; // Default to the latest available key
 
-    if (prevPeriod !== 'now' && prevKey) {{
+    if (period !== 'now' && prevPeriod !== 'now' && prevKey) {{
         const today = new Date();
         let contextDate = null;
 
@@ -1003,11 +2039,11 @@ function setPeriod(period) {{
             // Find the ideal key in the new period based on the context date
             const potentialKey = findPeriodKey(period, contextDate);
 
-            if (allData[period][potentialKey]) {{
+            if (periodIndex[period].includes(potentialKey)) {{
                 newKey = potentialKey;
             }} else {{
                 // Fallback: find the last available key within the previous context
-                const sortedKeys = Object.keys(allData[period]).sort();
+                const sortedKeys = periodIndex[period];
                 let filteredKeys = [];
 
                 if (prevPeriod === 'year' || prevPeriod === 'month') {{
@@ -1029,7 +2065,7 @@ function setPeriod(period) {{
 function navigatie(direction) {{
     if (state.period === 'now') return;
     
-    const sortedKeys = Object.keys(allData[state.period]).sort();
+    const sortedKeys = periodIndex[state.period];
     let currentIndex = sortedKeys.indexOf(state.currentKey);
 
     if (direction === 0) {{ // Current button
@@ -1051,12 +2087,206 @@ function navigatie(direction) {{
 document.addEventListener('DOMContentLoaded', function() {{
     init();
 }});
-</script>
+"""
+
+def render_html_parts(assets):
+    '''
+    Genereert de HTML-shell in delen (kop, opmaak en scripts). `assets` bevat de URL's van de stylesheet ("css"),
+    het script ("js") en Chart.js ("chart", met de extra attributen van de script-tag in "chart_attrs"); de shell
+    zelf bevat geen data en verandert alleen met deze code.
+    '''
+    yield f"""
+<!DOCTYPE html>
+<html lang="nl">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Energie Dashboard</title>
+<link rel="stylesheet" href="{assets['css']}">
+<script src="{assets['chart']}"{assets['chart_attrs']}></script>
+</head>
+"""
+    yield f"""<body>
+<div class="container">
+    <div class="header">
+        <h1>Energie Dashboard</h1>
+        <button id="refreshBtn" onclick="refreshDashboard()" style="padding: 8px 16px; border-radius: 20px; border: none; background: var(--accent-active); color: var(--text-primary); cursor: pointer; font-size: 14px; margin-top: 10px;">Vernieuwen</button>
+        <div id="refreshStatus" class="info-text" style="margin-top: 5px;"></div>
+    </div>
+
+    <div class="period-title" id="periodTitle">Huidig verbruik</div>
+    
+    <div class="period-totals" id="periodTotals"></div>
+
+    <div class="chart-container">
+        <canvas id="energyChart" class="chart-canvas"></canvas>
+    </div>
+
+    <div class="nav-controls">
+        <button id="btnPrev" onclick="navigatie(-1)" disabled>←</button>
+        <button id="btnCurrent" onclick="navigatie(0)" disabled>Huidige</button>
+        <button id="btnNext" onclick="navigatie(1)" disabled>→</button>
+        <button id="btnFullDay" onclick="toggleFullDay()" hidden>Alle punten</button>
+    </div>
+
+    <div class="period-nav">
+        <button id="btnNow" onclick="setPeriod('now')">Nu</button>
+        <button id="btnYears" onclick="setPeriod('years')">Jaren</button>
+        <button id="btnDay" onclick="setPeriod('day')">Dag</button>
+        <button id="btnWeek" onclick="setPeriod('week')">Week</button>
+        <button id="btnMonth" onclick="setPeriod('month')">Maand</button>
+                <select id="yearSelector" class="period-nav-button" onchange="showYear(this.value)"><option value="">Jaar</option></select>
+    </div>
+
+    <div class="info-text" id="updateInfo"></div>
+</div>
+
+"""
+    yield f"""<script src="{assets['js']}"></script>
 </body>
 </html>
 """
 
 # === BLOK 10: BESTANDSOPERATIE ===
-os.makedirs(os.path.dirname(output_file), exist_ok=True)
-with open(output_file, "w", encoding="utf-8") as f:
-    f.write(html_content)
+# zlib-standaard: vrijwel even klein als niveau 9, maar een veelvoud sneller op de telefoon
+GZIP_LEVEL = 6
+# Map naast de pagina met de onveranderlijke bestanden (stylesheet, script en Chart.js)
+STATIC_DIR_NAME = "static"
+# Lijst in static/ met de bestanden van de huidige en de vorige generatie van de shell
+STATIC_MANIFEST_NAME = "generaties.json"
+
+def write_precompressed(parts, path):
+    '''
+    Schrijft de delen (str of bytes) één voor één naar `path`, met daarnaast een gzip-versie (`path`.gz)
+    en de SHA-256 van de inhoud (`path`.sha256) waarmee de server ETags en 304-antwoorden geeft.
+    Alles gaat eerst naar tijdelijke bestanden die daarna met os.replace op hun plaats worden gezet, zodat de
+    server nooit een half geschreven bestand serveert. De hash wordt als laatste vervangen.
+    '''
+    if isinstance(parts, (str, bytes)):
+        parts = (parts,)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    targets = (path, path + ".gz", path + ".sha256")
+    tmp_paths = [target + ".tmp" for target in targets]
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_paths[0], "wb") as f, open(tmp_paths[1], "wb") as gz_file:
+            # Lege bestandsnaam en mtime=0: dezelfde inhoud geeft altijd hetzelfde gzip-bestand
+            with gzip.GzipFile(filename="", mode="wb", fileobj=gz_file, compresslevel=GZIP_LEVEL, mtime=0) as gz:
+                for part in parts:
+                    data = part.encode("utf-8") if isinstance(part, str) else part
+                    f.write(data)
+                    gz.write(data)
+                    digest.update(data)
+        with open(tmp_paths[2], "w", encoding="utf-8") as f:
+            f.write(digest.hexdigest())
+        for tmp_path, target in zip(tmp_paths, targets):
+            os.replace(tmp_path, target)
+    except BaseException:
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        raise
+
+def write_static_asset(content, static_dir, stem, ext):
+    '''
+    Schrijft `content` als `stem.<hash>ext` in `static_dir`, tenzij dat bestand er al staat, en retourneert de naam.
+    Nieuwe inhoud krijgt zo altijd een nieuwe naam, en de server kan de bestanden onbeperkt laten cachen.
+    '''
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    name = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+    path = os.path.join(static_dir, name)
+    # De .sha256 wordt als laatste geschreven: bestaat die, dan is het bestand compleet
+    if not os.path.exists(path + ".sha256"):
+        write_precompressed(data, path)
+    return name
+
+def write_dashboard(last, path):
+    '''
+    Schrijft het dashboard naar de map van `path`:
+    - in static/ de stylesheet, het script en Chart.js onder een naam met hun inhoudshash, alleen als ze nieuw zijn;
+    - `path`: de HTML-shell die daarnaar verwijst, alleen als de inhoud veranderd is;
+    - `path` met extensie .json: het databestand met de laatste meting, bij elke generatie.
+    Een refresh vervangt dus alleen het databestand. In static/ blijven de bestanden van de huidige en de vorige
+    versie van de shell staan, zodat een browser die de vorige shell net geladen heeft die nog kan ophalen;
+    oudere versies worden opgeruimd.
+    '''
+    static_dir = os.path.join(os.path.dirname(path), STATIC_DIR_NAME)
+    os.makedirs(static_dir, exist_ok=True)
+    data_path = os.path.splitext(path)[0] + ".json"
+
+    names = [
+        write_static_asset(render_css(), static_dir, "dashboard", ".css"),
+        write_static_asset(render_js(os.path.basename(data_path)), static_dir, "dashboard", ".js"),
+    ]
+    assets = {
+        "css": f"{STATIC_DIR_NAME}/{names[0]}",
+        "js": f"{STATIC_DIR_NAME}/{names[1]}",
+        "chart": CHARTJS_CDN_URL,
+        "chart_attrs": f' integrity="{CHARTJS_CDN_INTEGRITY}" crossorigin="anonymous"',
+    }
+    if os.path.exists(CHARTJS_VENDOR_FILE):
+        with open(CHARTJS_VENDOR_FILE, "rb") as f:
+            chartjs = f.read()
+        if hashlib.sha256(chartjs).hexdigest() == CHARTJS_VENDOR_SHA256:
+            names.append(write_static_asset(chartjs, static_dir, "chart.umd", ".js"))
+            assets["chart"] = f"{STATIC_DIR_NAME}/{names[-1]}"
+            assets["chart_attrs"] = ""
+        else:
+            print(f"Let op: '{CHARTJS_VENDOR_FILE}' heeft niet de verwachte SHA-256, Chart.js wordt van het CDN geladen.")
+    else:
+        print(f"Let op: '{CHARTJS_VENDOR_FILE}' niet gevonden, Chart.js wordt van het CDN geladen.")
+
+    html = "".join(render_html_parts(assets)).encode("utf-8")
+    try:
+        with open(path + ".sha256", encoding="utf-8") as f:
+            current_hash = f.read().strip()
+    except FileNotFoundError:
+        current_hash = None
+    if current_hash != hashlib.sha256(html).hexdigest() or not os.path.exists(path):
+        write_precompressed(html, path)
+
+    data = {"generated": datetime.now().strftime('%d-%m-%Y %H:%M'), "last": last_record(last)}
+    write_precompressed(json.dumps(data), data_path)
+
+    # De vorige generatie is de vorige lijst met namen zolang de namen niet veranderen
+    manifest_path = os.path.join(static_dir, STATIC_MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {"current": [], "previous": []}
+    previous = manifest["previous"] if manifest["current"] == names else manifest["current"]
+    if manifest != {"current": names, "previous": previous}:
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"current": names, "previous": previous}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    # Bestanden van oudere versies van de stylesheet, het script of Chart.js
+    keep = set(names) | set(previous) | {STATIC_MANIFEST_NAME}
+    for name in os.listdir(static_dir):
+        base = name
+        for suffix in (".gz", ".sha256", ".tmp"):
+            base = base.removesuffix(suffix)
+        if base not in keep:
+            os.remove(os.path.join(static_dir, name))
+
+def build_dashboard(output_path=None, full=False, day_bin_minutes=DAY_BIN_MINUTES, day_gap_minutes=DAY_GAP_MINUTES):
+    '''
+    Genereert het dashboard eenmalig naar `output_path` (standaard `output_file`) en retourneert `all_periods`.
+    Gebruik een `DashboardEngine` om de aggregaties tussen meerdere generaties in het geheugen te houden.
+    '''
+    engine = DashboardEngine(output_path, day_bin_minutes=day_bin_minutes, day_gap_minutes=day_gap_minutes)
+    return engine.refresh(full=full)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genereert het energiedashboard uit de SQLite database.")
+    parser.add_argument('--full', action='store_true', help="Bereken alle daggrafieken opnieuw, ook als er opgeslagen dagreeksen zijn.")
+    parser.add_argument('--day-bin', type=int, default=DAY_BIN_MINUTES, help="Breedte van de bins in de daggrafiek in minuten (1-60).")
+    parser.add_argument('--day-gap', type=int, default=DAY_GAP_MINUTES, help="Minuten zonder meting die als gat in de daggrafiek gelden.")
+    args = parser.parse_args()
+    if not 1 <= args.day_bin <= 60:
+        parser.error("--day-bin moet 1 tot en met 60 minuten zijn.")
+    try:
+        build_dashboard(full=args.full, day_bin_minutes=args.day_bin, day_gap_minutes=args.day_gap)
+    except LookupError as e:
+        raise SystemExit(str(e))
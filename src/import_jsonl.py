@@ -1,19 +1,437 @@
-
 '''
-Dit script leest alle .jsonl bestanden uit de 'sample_logs' map, 
+Dit script leest alle .jsonl bestanden (ook gecomprimeerd als .gz, .bz2 of .xz) uit de 'sample_logs' map,
 verwerkt de data en voegt deze toe aan de SQLite database.
 Het is ontworpen om om te gaan met variaties in de JSON-structuur.
 '''
 
 import os
+import re
+import bz2
 import glob
+import gzip
+import lzma
 import json
+import mmap
+import time
+import heapq
 import sqlite3
+import argparse
+import multiprocessing
+from itertools import islice
+from operator import itemgetter
 from datetime import datetime
 
-def import_jsonl_to_sqlite():
+# Aantal regels dat per keer wordt geparset en met executemany wordt ingevoegd
+CHUNK_SIZE = 5000
+
+# PRAGMA's voor de import: WAL en synchronous=NORMAL beperken het aantal fsyncs,
+# een grotere cache (in KiB, negatief) houdt de B-tree van de primary key in het geheugen.
+IMPORT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,
+    "temp_store": "MEMORY",
+}
+
+# Grootte van de byte-bereiken die in parallelle modus naar een worker gaan
+PARALLEL_RANGE_BYTES = 8 * 1024 * 1024
+
+# Aantal geparste rijen dat in parallelle modus wordt verzameld en op timestamp samengevoegd
+# voordat het wordt ingevoegd (ca. 30 MB geheugen, ongeveer een maand aan logs met een meting per 10 s)
+PARALLEL_MERGE_ROWS = 250000
+
+# Gecomprimeerde logbestanden worden zonder tijdelijk bestand regel voor regel uitgepakt
+COMPRESSED_OPENERS = {
+    ".jsonl.gz": gzip.open,
+    ".jsonl.bz2": bz2.open,
+    ".jsonl.xz": lzma.open,
+}
+LOG_PATTERNS = ["*.jsonl"] + [f"*{suffix}" for suffix in COMPRESSED_OPENERS]
+
+# Tabel waarin per logbestand wordt bijgehouden tot welke byte het al is geïmporteerd
+MANIFEST_TABLE = "import_manifest"
+
+# Zie BLOK 2.1 van generate_P1_dashboard.py: metingen van vóór de high-water mark van de rollups verhogen
+# de generatie, zodat het dashboard de rollups en dagreeksen opnieuw opbouwt. Nieuwere metingen worden gewoon aangevuld.
+ROLLUP_STATE_TABLE = "rollup_state"
+GENERATION_TABLE = "metingen_generatie"
+
+# 'YYYY-MM-DDTHH:MM:SS' met optioneel 3 of 6 cijfers achter de komma, zonder tijdzone
+NAIVE_TIMESTAMP_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{3}|\d{6}))?', re.ASCII)
+
+def parse_timestamp(timestamp_str, hour_cache):
+    """
+    Converteert een ISO 8601 timestamp naar een Unix timestamp, met hetzelfde resultaat als
+    `datetime.fromisoformat(timestamp_str.split('+')[0]).timestamp()`.
+    Voor het gangbare formaat wordt de lokale tijd van het hele uur één keer berekend en gecachet.
+    """
+    # Verwijdert eventuele timezone info voor compatibiliteit
+    naive_str = timestamp_str.split('+')[0]
+    match = NAIVE_TIMESTAMP_RE.fullmatch(naive_str)
+    if match:
+        year, month, day, hour, minute, second, fraction = match.groups()
+        hour_key = naive_str[:13]
+        base = hour_cache.get(hour_key)
+        if base is None:
+            hour_start = datetime(int(year), int(month), int(day), int(hour))
+            base = int(hour_start.timestamp())
+            # Uren met een zomer-/wintertijdwissel niet cachen
+            if datetime(int(year), int(month), int(day), int(hour), 59, 59).timestamp() - base != 3599:
+                base = False
+            hour_cache[hour_key] = base
+        if base is not False and int(minute) < 60 and int(second) < 60:
+            microsecond = int(fraction.ljust(6, '0')) if fraction else 0
+            return (base + int(minute) * 60 + int(second)) + microsecond / 1e6
+
+    return datetime.fromisoformat(naive_str).timestamp()
+
+def parse_line(line, hour_cache):
+    """
+    Zet één regel uit een logbestand om naar een rij voor de database.
+    Retourneert None als de regel geen bruikbare meting bevat.
+    """
+    try:
+        record = json.loads(line)
+        data = record.get('data', {})
+        timestamp_str = record.get('timestamp')
+
+        # Sla records zonder timestamp of data-object over
+        if not timestamp_str or not data:
+            return None
+
+        # Converteer ISO 8601 timestamp naar Unix timestamp
+        unix_timestamp = parse_timestamp(timestamp_str, hour_cache)
+
+        # Haal benodigde velden op, met standaardwaarden voor ontbrekende velden
+        active_power = data.get('active_power_w', 0.0)
+        import_kwh = data.get('total_power_import_kwh')
+        export_kwh = data.get('total_power_export_kwh')
+
+        # Sla record over als essentiële data ontbreekt
+        if import_kwh is None or export_kwh is None:
+            return None
+
+        return (
+            unix_timestamp,
+            active_power,
+            import_kwh,
+            export_kwh
+        )
+
+    except (json.JSONDecodeError, TypeError, ValueError, AttributeError):
+        # print(f"Waarschuwing: Regel overgeslagen door fout: {e} -> '{line.strip()}'")
+        return None
+
+def get_schema_version(conn, table_name):
+    # Schema v2 (zie migrate_schema_v2.py) slaat hele seconden en meterstanden in Wh op
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+    return 2 if "import_wh" in columns else 1
+
+def is_backfill(conn, table_name, first_ts):
+    """Geeft aan of een meting op `first_ts` niet nieuwer is dan de high-water mark van de rollups."""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ROLLUP_STATE_TABLE,)).fetchone()
+    if not exists:
+        return False
+    row = conn.execute(f"SELECT last_ts FROM {ROLLUP_STATE_TABLE} WHERE source_table = ?", (table_name,)).fetchone()
+    return row is not None and first_ts <= row[0]
+
+def bump_generation(conn, table_name):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {GENERATION_TABLE} (
+            source_table TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL
+        )
+    ''')
+    conn.execute(f'''
+        INSERT INTO {GENERATION_TABLE} (source_table, generation) VALUES (?, 1)
+        ON CONFLICT(source_table) DO UPDATE SET generation = generation + 1
+    ''', (table_name,))
+
+def insert_rows(conn, table_name, rows):
+    """
+    Voegt rijen (timestamp, active_power_w, import_kwh, export_kwh) in met één executemany
+    en retourneert het aantal nieuw toegevoegde rijen. Bij schema v2 rekent SQLite ze om.
+    Zitten er metingen van vóór de vorige dashboard-update bij, dan wordt de generatie verhoogd.
+    """
+    changes_before = conn.total_changes
+    first_ts = min(row[0] for row in rows)
+    # Voeg toe aan database, negeer als timestamp al bestaat
+    if get_schema_version(conn, table_name) == 2:
+        first_ts = int(first_ts)
+        conn.executemany(f'''
+            INSERT OR IGNORE INTO {table_name} (timestamp, active_power_w, import_wh, export_wh)
+            VALUES (CAST(? AS INTEGER), CAST(ROUND(?) AS INTEGER), CAST(ROUND(? * 1000) AS INTEGER), CAST(ROUND(? * 1000) AS INTEGER))
+        ''', rows)
+    else:
+        conn.executemany(f'''
+            INSERT OR IGNORE INTO {table_name} (timestamp, active_power_w, total_power_import_kwh, total_power_export_kwh)
+            VALUES (?, ?, ?, ?)
+        ''', rows)
+    added = conn.total_changes - changes_before
+    if added and is_backfill(conn, table_name, first_ts):
+        bump_generation(conn, table_name)
+    return added
+
+def import_lines(conn, table_name, lines):
+    """
+    Parset regels in blokken van CHUNK_SIZE en voegt ze per blok in.
+    Retourneert (verwerkt, toegevoegd, overgeslagen); de aanroeper beheert de transactie.
+    """
+    processed = 0
+    inserted = 0
+    skipped = 0
+    hour_cache = {}
+
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, CHUNK_SIZE))
+        if not chunk:
+            break
+        processed += len(chunk)
+
+        rows = []
+        for line in chunk:
+            row = parse_line(line, hour_cache)
+            if row is None:
+                skipped += 1
+            else:
+                rows.append(row)
+
+        if rows:
+            added = insert_rows(conn, table_name, rows)
+            inserted += added
+            skipped += len(rows) - added # Record was al aanwezig (duplicaat)
+
+    return processed, inserted, skipped
+
+def create_manifest_table(conn):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            inode INTEGER NOT NULL,
+            offset INTEGER NOT NULL
+        )
+    ''')
+
+def get_opener(file_path):
+    """Retourneert de open-functie voor een gecomprimeerd logbestand, of None voor platte tekst."""
+    for suffix, opener in COMPRESSED_OPENERS.items():
+        if file_path.endswith(suffix):
+            return opener
+    return None
+
+def get_start_offset(conn, file_path, stat, compressed=False):
+    """
+    Bepaalt vanaf welke byte een bestand gelezen moet worden, of None als het bestand
+    sinds de vorige import niet is gewijzigd. Een ander inode-nummer of een bestand dat
+    kleiner is dan de opgeslagen offset (rotatie of truncatie) wordt opnieuw vanaf het begin gelezen.
+    Een gewijzigd gecomprimeerd bestand wordt altijd opnieuw vanaf het begin gelezen.
+    """
+    row = conn.execute(f"SELECT size, mtime, inode, offset FROM {MANIFEST_TABLE} WHERE path = ?", (file_path,)).fetchone()
+    if row is None:
+        return 0
+
+    size, mtime, inode, offset = row
+    if size == stat.st_size and mtime == stat.st_mtime and inode == stat.st_ino:
+        return None
+    if compressed or inode != stat.st_ino or stat.st_size < offset:
+        return 0
+    return offset
+
+def update_manifest(conn, file_path, stat, offset):
+    conn.execute(f'''
+        INSERT OR REPLACE INTO {MANIFEST_TABLE} (path, size, mtime, inode, offset)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (file_path, stat.st_size, stat.st_mtime, stat.st_ino, offset))
+
+def iter_complete_lines(f, progress):
+    """
+    Levert de regels van een binair geopend bestand en houdt in progress["offset"] bij
+    tot waar het bestand verwerkt is. Een laatste regel zonder newline die (nog) geen geldige
+    JSON is, wordt niet meegenomen: die wordt waarschijnlijk nog geschreven.
+    """
+    for line in f:
+        if not line.endswith(b'\n'):
+            try:
+                json.loads(line)
+            except ValueError:
+                return
+        progress["offset"] += len(line)
+        yield line
+
+def iter_decompressed_lines(f, file_path):
+    """Levert de regels van een gecomprimeerd bestand; een afgebroken of beschadigd bestand wordt tot de fout gelezen."""
+    try:
+        yield from f
+    except (EOFError, OSError, lzma.LZMAError) as e:
+        print(f"Waarschuwing: {os.path.basename(file_path)} is onvolledig of beschadigd ({e}), alleen gelezen tot de fout.")
+
+def find_complete_end(mm, start):
+    """Zelfde regel als iter_complete_lines: tot en met de laatste newline, plus een geldige laatste regel."""
+    last_newline = mm.rfind(b'\n', start)
+    end = last_newline + 1 if last_newline >= 0 else start
+    if end < len(mm):
+        try:
+            json.loads(mm[end:])
+            end = len(mm)
+        except ValueError:
+            pass
+    return end
+
+def split_line_ranges(mm, start, end):
+    """Verdeelt [start, end) in bereiken van ongeveer PARALLEL_RANGE_BYTES die op een newline eindigen."""
+    ranges = []
+    pos = start
+    while pos < end:
+        cut = pos + PARALLEL_RANGE_BYTES
+        if cut >= end:
+            cut = end
+        else:
+            newline = mm.find(b'\n', cut, end)
+            cut = newline + 1 if newline >= 0 else end
+        ranges.append((pos, cut))
+        pos = cut
+    return ranges
+
+def parse_range(task):
+    """
+    Worker: parset één byte-bereik van een logbestand via mmap. Retourneert de rijen
+    gesorteerd op timestamp (stabiel, dus bij gelijke timestamp in bestandsvolgorde),
+    het aantal regels en het aantal onbruikbare regels.
+    """
+    file_path, start, end = task
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+
+    lines = data.split(b'\n')
+    if data.endswith(b'\n'):
+        lines.pop()
+
+    rows = []
+    skipped = 0
+    hour_cache = {}
+    for line in lines:
+        row = parse_line(line, hour_cache)
+        if row is None:
+            skipped += 1
+        else:
+            rows.append(row)
+    rows.sort(key=itemgetter(0))
+    return rows, len(lines), skipped
+
+def merge_runs(runs):
+    """
+    Voegt de gesorteerde rijen van opeenvolgende bereiken samen op timestamp. Sluiten de bereiken
+    in de tijd op elkaar aan (het gewone geval), dan volstaat aan elkaar plakken. heapq.merge is
+    stabiel: bij gelijke timestamps komt de rij uit het eerdere bereik eerst.
+    """
+    if all(prev[-1][0] <= run[0][0] for prev, run in zip(runs, runs[1:])):
+        return [row for run in runs for row in run]
+    return list(heapq.merge(*runs, key=itemgetter(0)))
+
+def import_ranges_parallel(conn, table_name, file_path, start_offset, pool):
+    """
+    Laat de workers de nieuwe bytes van een bestand parsen en voegt de rijen vanuit dit proces in,
+    op volgorde van timestamp. Elke worker sorteert zijn eigen bereik; de bereiken worden per
+    venster van PARALLEL_MERGE_ROWS rijen samengevoegd, zodat ook een klok die terugspringt of
+    aan elkaar geplakte logs op volgorde in de B-tree komen. Een bestand met minder nieuwe rijen
+    dan het venster gaat dus volledig gesorteerd naar SQLite; bij grotere bestanden is alleen een
+    sprong terug over de grens van een venster niet gesorteerd. Voor de inhoud van de database maakt
+    dat niet uit: de vensters volgen de bestandsvolgorde en de samenvoeging is stabiel, dus bij een
+    dubbele timestamp wint, net als bij sequentieel inlezen, de eerste regel in het bestand.
+    Retourneert (tellingen, nieuwe offset).
+    """
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = find_complete_end(mm, start_offset)
+        ranges = split_line_ranges(mm, start_offset, end)
+
+    processed = 0
+    inserted = 0
+    skipped = 0
+    runs = []
+    buffered = 0
+
+    def flush_runs():
+        nonlocal inserted, skipped
+        rows = merge_runs(runs)
+        added = insert_rows(conn, table_name, rows)
+        inserted += added
+        skipped += len(rows) - added # Record was al aanwezig (duplicaat)
+        runs.clear()
+
+    for rows, range_processed, range_skipped in pool.imap(parse_range, [(file_path, a, b) for a, b in ranges]):
+        processed += range_processed
+        skipped += range_skipped
+        if not rows:
+            continue
+        runs.append(rows)
+        buffered += len(rows)
+        if buffered >= PARALLEL_MERGE_ROWS:
+            flush_runs()
+            buffered = 0
+    if runs:
+        flush_runs()
+
+    return (processed, inserted, skipped), end
+
+def import_file(conn, table_name, file_path, pool=None):
+    """
+    Importeert de nieuwe regels van één logbestand in één transactie, inclusief de
+    bijgewerkte manifest-regel. Met een worker-pool wordt het parsen over meerdere
+    processen verdeeld; gecomprimeerde bestanden worden altijd als stroom gelezen.
+    Retourneert (verwerkt, toegevoegd, overgeslagen), of None als het bestand ongewijzigd is.
+    """
+    stat = os.stat(file_path)
+    opener = get_opener(file_path)
+    start_offset = get_start_offset(conn, file_path, stat, compressed=opener is not None)
+    if start_offset is None:
+        return None
+
+    if opener is not None:
+        # De offset is hier de positie in de uitgepakte data en dient alleen ter informatie
+        with opener(file_path, 'rb') as f:
+            progress = {"offset": 0}
+            counts = import_lines(conn, table_name, iter_complete_lines(iter_decompressed_lines(f, file_path), progress))
+        update_manifest(conn, file_path, stat, progress["offset"])
+        conn.commit()
+        return counts
+
+    with open(file_path, 'rb') as f:
+        if start_offset > 0:
+            # Alleen verder lezen als de offset precies na een newline ligt
+            f.seek(start_offset - 1)
+            if f.read(1) != b'\n':
+                start_offset = 0
+            f.seek(start_offset)
+
+        if pool is not None and stat.st_size > start_offset:
+            counts, offset = import_ranges_parallel(conn, table_name, file_path, start_offset, pool)
+        else:
+            progress = {"offset": start_offset}
+            counts = import_lines(conn, table_name, iter_complete_lines(f, progress))
+            offset = progress["offset"]
+
+    update_manifest(conn, file_path, stat, offset)
+    conn.commit()
+    return counts
+
+def create_worker_pool(workers):
+    """Start een worker-pool, of retourneert None als dat op dit platform niet kan (bijv. Termux zonder sem_open)."""
+    if workers <= 1:
+        return None
+    try:
+        return multiprocessing.Pool(workers)
+    except (ImportError, OSError) as e:
+        print(f"Parallel parsen niet beschikbaar ({e}), er wordt met één proces geïmporteerd.")
+        return None
+
+def import_jsonl_to_sqlite(workers=1):
     """
     Leest .jsonl-bestanden uit de logmap en importeert de data in SQLite.
+    Met workers > 1 wordt het parsen over meerdere processen verdeeld. Of dat op een toestel met
+    meerdere kernen sneller is, is niet gemeten; meet het met benchmarks/bench_import_jsonl.py.
     """
     # --- Padinstellingen ---
     # Bepaal de log-map dynamisch
@@ -28,20 +446,22 @@ def import_jsonl_to_sqlite():
     else: # Fallback for other environments (e.g., Windows)
         project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
         db_path = os.path.join(project_root, 'p1_data.db')
-    
+
     table_name = "metingen"
 
-    # Vind alle .jsonl bestanden in de logmap
-    jsonl_files = glob.glob(os.path.join(logs_dir, '*.jsonl'))
+    # Vind alle .jsonl bestanden (ook gecomprimeerd) in de logmap, op naam gesorteerd
+    jsonl_files = sorted(path for pattern in LOG_PATTERNS for path in glob.glob(os.path.join(logs_dir, pattern)))
     if not jsonl_files:
         print(f"Geen .jsonl bestanden gevonden in '{logs_dir}'.")
         return
 
-    print(f"{len(jsonl_files)} .jsonl bestanden gevonden om te verwerken.")
+    print(f"{len(jsonl_files)} .jsonl bestanden gevonden om te verwerken (inclusief .gz/.bz2/.xz).")
 
     # --- Databaseverbinding en tabel creatie ---
     try:
         conn = sqlite3.connect(db_path)
+        for pragma, value in IMPORT_PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
         cursor = conn.cursor()
         # Maak de tabel aan als deze nog niet bestaat
         cursor.execute(f'''
@@ -52,6 +472,7 @@ def import_jsonl_to_sqlite():
                 total_power_export_kwh REAL
             )
         ''')
+        create_manifest_table(conn)
         conn.commit()
     except sqlite3.Error as e:
         print(f"SQLite fout bij verbinden of tabel aanmaken: {e}")
@@ -61,68 +482,46 @@ def import_jsonl_to_sqlite():
     total_processed = 0
     total_inserted = 0
     total_skipped = 0
+    start_time = time.perf_counter()
+
+    unchanged_files = 0
+    pool = create_worker_pool(workers)
 
     for file_path in jsonl_files:
-        print(f"\nVerwerken van bestand: {os.path.basename(file_path)}...")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                total_processed += 1
-                try:
-                    record = json.loads(line)
-                    data = record.get('data', {})
-                    timestamp_str = record.get('timestamp')
-
-                    # Sla records zonder timestamp of data-object over
-                    if not timestamp_str or not data:
-                        total_skipped += 1
-                        continue
-
-                    # Converteer ISO 8601 timestamp naar Unix timestamp
-                    # Verwijdert eventuele timezone info voor compatibiliteit
-                    dt_object = datetime.fromisoformat(timestamp_str.split('+')[0])
-                    unix_timestamp = dt_object.timestamp()
-
-                    # Haal benodigde velden op, met standaardwaarden voor ontbrekende velden
-                    active_power = data.get('active_power_w', 0.0)
-                    import_kwh = data.get('total_power_import_kwh')
-                    export_kwh = data.get('total_power_export_kwh')
-
-                    # Sla record over als essentiële data ontbreekt
-                    if import_kwh is None or export_kwh is None:
-                        total_skipped += 1
-                        continue
-
-                    # Data voorbereiden voor invoegen
-                    data_tuple = (
-                        unix_timestamp,
-                        active_power,
-                        import_kwh,
-                        export_kwh
-                    )
-
-                    # Voeg toe aan database, negeer als timestamp al bestaat
-                    cursor.execute(f'''
-                        INSERT OR IGNORE INTO {table_name} (timestamp, active_power_w, total_power_import_kwh, total_power_export_kwh)
-                        VALUES (?, ?, ?, ?)
-                    ''', data_tuple)
-
-                    if cursor.rowcount > 0:
-                        total_inserted += 1
-                    else:
-                        total_skipped += 1 # Record was al aanwezig (duplicaat)
-
-                except (json.JSONDecodeError, TypeError, ValueError) as e:
-                    # print(f"Waarschuwing: Regel overgeslagen door fout: {e} -> '{line.strip()}'")
-                    total_skipped += 1
-    
+        file_path = os.path.abspath(file_path)
+        file_start = time.perf_counter()
+        counts = import_file(conn, table_name, file_path, pool)
+        if counts is None:
+            unchanged_files += 1
+            continue
+
+        processed, inserted, skipped = counts
+        elapsed = time.perf_counter() - file_start
+        print(f"\nVerwerkt: {os.path.basename(file_path)}")
+        print(f"  {processed} nieuwe regels, {inserted} toegevoegd in {elapsed:.2f} s ({processed / max(elapsed, 1e-9):.0f} regels/s)")
+
+        total_processed += processed
+        total_inserted += inserted
+        total_skipped += skipped
+
     # --- Afronding ---
-    conn.commit()
+    if pool is not None:
+        pool.close()
+        pool.join()
     conn.close()
+    total_elapsed = time.perf_counter() - start_time
 
     print("\n--- Import Voltooid ---")
+    print(f"Ongewijzigde bestanden:       {unchanged_files} (overgeslagen)")
     print(f"Totaal aantal regels verwerkt: {total_processed}")
     print(f"Nieuwe records toegevoegd:    {total_inserted}")
     print(f"Records overgeslagen:        {total_skipped} (fouten of duplicaten)")
+    print(f"Doorvoer:                    {total_processed / max(total_elapsed, 1e-9):.0f} regels/s")
 
 if __name__ == '__main__':
-    import_jsonl_to_sqlite()
+    parser = argparse.ArgumentParser(description="Importeert .jsonl logbestanden in de SQLite database.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Aantal processen voor het parsen (0 = aantal CPU-kernen, standaard 1).")
+    args = parser.parse_args()
+    import_jsonl_to_sqlite(workers=args.workers or os.cpu_count() or 1)
+
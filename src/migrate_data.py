@@ -1,12 +1,12 @@
-
 '''
 Dit script is voor een eenmalige datamigratie van een ChromaDB database naar een SQLite database.
 Het leest de meterstanden uit de "smartmeter_master" collectie en schrijft deze naar een tabel genaamd "metingen" in een `p1_data.db` bestand.
+De collectie wordt in batches doorlopen; een afgebroken migratie gaat bij een volgende run verder na de laatst gemigreerde batch.
 '''
 
 import os
+import time
 import sqlite3
-import chromadb
 
 # --- CONFIGURATIE ---
 
@@ -23,6 +23,138 @@ COLLECTION_NAME = "smartmeter_master"
 SQLITE_DB_PATH = os.path.join(PROJECT_ROOT, 'p1_data.db')
 SQLITE_TABLE_NAME = "metingen"
 
+# Aantal records dat per keer uit ChromaDB wordt opgehaald en ingevoegd
+BATCH_SIZE = 5000
+
+# Tabel waarin wordt bijgehouden hoeveel records van een collectie al gemigreerd zijn
+PROGRESS_TABLE = "migratie_voortgang"
+
+# Zie BLOK 2.1 van generate_P1_dashboard.py: metingen van vóór de high-water mark van de rollups verhogen
+# de generatie, zodat het dashboard de rollups en dagreeksen opnieuw opbouwt
+ROLLUP_STATE_TABLE = "rollup_state"
+GENERATION_TABLE = "metingen_generatie"
+
+# INSERT per schemaversie; schema v2 (migrate_schema_v2.py) slaat hele seconden en Wh op, SQLite rekent om
+INSERT_SQL = {
+    1: f'''
+        INSERT OR IGNORE INTO {SQLITE_TABLE_NAME} (timestamp, active_power_w, total_power_import_kwh, total_power_export_kwh)
+        VALUES (?, ?, ?, ?)
+    ''',
+    2: f'''
+        INSERT OR IGNORE INTO {SQLITE_TABLE_NAME} (timestamp, active_power_w, import_wh, export_wh)
+        VALUES (CAST(? AS INTEGER), CAST(ROUND(?) AS INTEGER), CAST(ROUND(? * 1000) AS INTEGER), CAST(ROUND(? * 1000) AS INTEGER))
+    ''',
+}
+
+
+def create_tables(conn):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {SQLITE_TABLE_NAME} (
+            timestamp REAL PRIMARY KEY,
+            active_power_w REAL,
+            total_power_import_kwh REAL,
+            total_power_export_kwh REAL
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} (
+            collection TEXT PRIMARY KEY,
+            migrated_offset INTEGER NOT NULL
+        )
+    ''')
+    conn.commit()
+
+
+def get_schema_version(conn):
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({SQLITE_TABLE_NAME})")}
+    return 2 if "import_wh" in columns else 1
+
+
+def get_resume_offset(conn, collection_name):
+    row = conn.execute(f"SELECT migrated_offset FROM {PROGRESS_TABLE} WHERE collection = ?", (collection_name,)).fetchone()
+    return row[0] if row else 0
+
+
+def is_backfill(conn, first_ts):
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ROLLUP_STATE_TABLE,)).fetchone()
+    if not exists:
+        return False
+    row = conn.execute(f"SELECT last_ts FROM {ROLLUP_STATE_TABLE} WHERE source_table = ?", (SQLITE_TABLE_NAME,)).fetchone()
+    return row is not None and first_ts <= row[0]
+
+
+def bump_generation(conn):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {GENERATION_TABLE} (
+            source_table TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL
+        )
+    ''')
+    conn.execute(f'''
+        INSERT INTO {GENERATION_TABLE} (source_table, generation) VALUES (?, 1)
+        ON CONFLICT(source_table) DO UPDATE SET generation = generation + 1
+    ''', (SQLITE_TABLE_NAME,))
+
+
+def migrate_collection(collection, conn, collection_name=COLLECTION_NAME, batch_size=BATCH_SIZE):
+    """
+    Migreert een (ChromaDB-)collectie in batches van `batch_size` naar de metingen-tabel, in schema v1 of v2.
+    Per batch worden alleen de metadatas opgehaald en met één executemany ingevoegd; de
+    batch en de nieuwe voortgang worden samen gecommit, zodat een afgebroken migratie
+    hervat kan worden. Retourneert (gemigreerd, overgeslagen).
+    """
+    total = collection.count()
+    offset = get_resume_offset(conn, collection_name)
+    if offset:
+        print(f"Migratie wordt hervat vanaf record {offset} van {total}.")
+
+    schema_version = get_schema_version(conn)
+    migrated_count = 0
+    skipped_count = 0
+    start_time = time.perf_counter()
+
+    while offset < total:
+        batch = collection.get(limit=batch_size, offset=offset, include=["metadatas"])
+        metadatas = batch.get('metadatas') or []
+        if not metadatas:
+            break
+
+        rows = []
+        for meta in metadatas:
+            try:
+                rows.append((
+                    meta["timestamp"],
+                    meta.get("active_power_w", 0),
+                    meta["total_power_import_kwh"],
+                    meta["total_power_export_kwh"]
+                ))
+            except KeyError as e:
+                print(f"Record overgeslagen wegens ontbrekende sleutel: {e}. Record: {meta}")
+                skipped_count += 1
+
+        # Gebruik INSERT OR IGNORE om fouten bij dubbele timestamps te voorkomen
+        changes_before = conn.total_changes
+        conn.executemany(INSERT_SQL[schema_version], rows)
+        inserted = conn.total_changes - changes_before
+        # ChromaDB levert de records niet op volgorde van timestamp; schema v2 slaat hele seconden op
+        first_ts = min(row[0] for row in rows)
+        if inserted and is_backfill(conn, int(first_ts) if schema_version == 2 else first_ts):
+            bump_generation(conn)
+        migrated_count += inserted
+        skipped_count += len(rows) - inserted
+
+        offset += len(metadatas)
+        conn.execute(f'''
+            INSERT OR REPLACE INTO {PROGRESS_TABLE} (collection, migrated_offset) VALUES (?, ?)
+        ''', (collection_name, offset))
+        conn.commit()
+
+        elapsed = time.perf_counter() - start_time
+        print(f"  {offset}/{total} records verwerkt ({offset / max(total, 1):.0%}), "
+              f"{migrated_count + skipped_count} in deze run met {(migrated_count + skipped_count) / max(elapsed, 1e-9):.0f} records/s")
+
+    return migrated_count, skipped_count
+
 
 def migrate_chroma_to_sqlite():
     """
@@ -30,7 +162,7 @@ def migrate_chroma_to_sqlite():
     """
     print("--- Start Datamigratie ---")
 
-    # 1. Verbind met ChromaDB en haal data op
+    # 1. Verbind met ChromaDB
     print(f"Verbinden met ChromaDB op: {CHROMA_DB_PATH}")
     if not os.path.exists(CHROMA_DB_PATH):
         print(f"Fout: ChromaDB database niet gevonden op '{CHROMA_DB_PATH}'.")
@@ -38,72 +170,38 @@ def migrate_chroma_to_sqlite():
         return
 
     try:
+        import chromadb
         client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
         collection = client.get_collection(name=COLLECTION_NAME)
-        db_results = collection.get()
+        record_count = collection.count()
         print(f"Succesvol verbonden met collectie '{COLLECTION_NAME}'.")
     except Exception as e:
         print(f"Fout bij het verbinden met ChromaDB of ophalen van de collectie: {e}")
         return
 
-    if not db_results or not db_results.get('ids'):
+    if not record_count:
         print("Geen records gevonden in ChromaDB. Niets te migreren.")
         return
 
-    records_to_migrate = db_results['metadatas']
-    print(f"{len(records_to_migrate)} records gevonden om te migreren.")
+    print(f"{record_count} records gevonden om te migreren.")
 
-    # 2. Verbind met SQLite en maak de tabel aan
+    # 2. Verbind met SQLite en maak de tabellen aan
     print(f"Aanmaken/verbinden met SQLite database op: {SQLITE_DB_PATH}")
     try:
         conn = sqlite3.connect(SQLITE_DB_PATH)
-        cursor = conn.cursor()
 
         print(f"Tabel '{SQLITE_TABLE_NAME}' aanmaken (indien niet bestaand).")
-        cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {SQLITE_TABLE_NAME} (
-                timestamp REAL PRIMARY KEY,
-                active_power_w REAL,
-                total_power_import_kwh REAL,
-                total_power_export_kwh REAL
-            )
-        ''')
-        conn.commit()
+        create_tables(conn)
     except sqlite3.Error as e:
         print(f"SQLite fout tijdens setup: {e}")
         return
 
-    # 3. Voeg data toe aan SQLite
-    print("Records worden in SQLite ingevoegd...")
-    migrated_count = 0
-    skipped_count = 0
-    for meta in records_to_migrate:
-        try:
-            data_tuple = (
-                meta["timestamp"],
-                meta.get("active_power_w", 0),
-                meta["total_power_import_kwh"],
-                meta["total_power_export_kwh"]
-            )
-            
-            # Gebruik INSERT OR IGNORE om fouten bij dubbele timestamps te voorkomen
-            cursor.execute(f'''
-                INSERT OR IGNORE INTO {SQLITE_TABLE_NAME} (timestamp, active_power_w, total_power_import_kwh, total_power_export_kwh)
-                VALUES (?, ?, ?, ?)
-            ''', data_tuple)
-            
-            if cursor.rowcount > 0:
-                migrated_count += 1
-            else:
-                skipped_count += 1
-
-        except KeyError as e:
-            print(f"Record overgeslagen wegens ontbrekende sleutel: {e}. Record: {meta}")
-            skipped_count += 1
-
-    # Wijzigingen opslaan en verbinding sluiten
-    conn.commit()
-    conn.close()
+    # 3. Voeg data in batches toe aan SQLite
+    print(f"Records worden in batches van {BATCH_SIZE} in SQLite ingevoegd...")
+    try:
+        migrated_count, skipped_count = migrate_collection(collection, conn)
+    finally:
+        conn.close()
 
     print("\n--- Migratie Voltooid ---")
     print(f"Succesvol gemigreerd: {migrated_count} records.")
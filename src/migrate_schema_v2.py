@@ -0,0 +1,251 @@
+'''
+Dit script zet de tabel "metingen" in `p1_data.db` om naar het compacte schema v2:
+- timestamp als hele seconden (INTEGER) in een WITHOUT ROWID tabel, dus geen aparte rowid-B-tree;
+- meterstanden als gehele Wh (import_wh/export_wh) in plaats van REAL kWh, zonder afrondingsdrift.
+
+De data wordt in batches gekopieerd terwijl de logger gewoon door kan schrijven. Alleen de
+laatste stap (resterende rijen kopiëren en de tabellen omwisselen) gebeurt in één korte transactie.
+
+Let op, de omzetting is niet verliesvrij:
+- metingen binnen dezelfde seconde worden samengevoegd tot de eerste, de rest vervalt;
+- het vermogen wordt afgerond op hele W en de meterstanden op hele Wh.
+Het rapport noemt vooraf en na afloop hoeveel rijen dit raakt.
+'''
+
+import os
+import time
+import sqlite3
+import argparse
+
+# --- CONFIGURATIE ---
+
+# Bepaal database pad dynamisch
+if os.path.isdir("/data/data/com.termux/files/home"): # Check if on Termux
+    DB_PATH = os.path.join(os.path.expanduser('~'), 'p1_data.db')
+else: # Fallback for other environments (e.g., Windows)
+    DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'p1_data.db'))
+
+TABLE_NAME = "metingen"
+V2_TABLE_NAME = "metingen_v2"
+BACKUP_TABLE_NAME = "metingen_v1"
+
+# Zie BLOK 2.1 van generate_P1_dashboard.py: een nieuwe generatie laat het dashboard de rollups
+# en dagreeksen opnieuw opbouwen uit de omgezette (afgeronde en samengevoegde) metingen
+GENERATION_TABLE = "metingen_generatie"
+
+# Aantal rijen per kopieerbatch
+BATCH_SIZE = 50000
+
+# Conversie van een v1-rij naar v2, in SQL zodat alle schrijvers hetzelfde afronden
+V2_VALUES_SQL = '''
+    CAST(timestamp AS INTEGER),
+    CAST(ROUND(active_power_w) AS INTEGER),
+    CAST(ROUND(total_power_import_kwh * 1000) AS INTEGER),
+    CAST(ROUND(total_power_export_kwh * 1000) AS INTEGER)
+'''
+
+
+def get_schema_version(conn):
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE_NAME})")}
+    if not columns:
+        return 0
+    return 2 if "import_wh" in columns else 1
+
+
+def get_file_size(db_path):
+    return sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+
+
+def time_range_scan(conn, import_column):
+    """
+    Meet de snelste van vijf range-scans over de laatste 30 dagen aan metingen.
+    Retourneert (aantal rijen, seconden).
+    """
+    last_ts = conn.execute(f"SELECT MAX(timestamp) FROM {TABLE_NAME}").fetchone()[0]
+    if last_ts is None:
+        return 0, 0.0
+
+    best = None
+    count = 0
+    for _ in range(5):
+        start = time.perf_counter()
+        count, _total = conn.execute(f'''
+            SELECT COUNT(*), SUM({import_column}) FROM {TABLE_NAME}
+            WHERE timestamp BETWEEN ? AND ?
+        ''', (last_ts - 30 * 86400, last_ts)).fetchone()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def count_data_loss(conn):
+    """
+    Telt wat de omzetting naar v2 kost. Retourneert een dict met het aantal rijen dat wegvalt
+    (onvolledig of samengevoegd met een eerdere meting in dezelfde seconde) en het aantal
+    volledige rijen waarvan het vermogen of een meterstand wordt afgerond.
+    """
+    total, complete, seconds, power_rounded, wh_rounded = conn.execute(f'''
+        SELECT COUNT(*),
+               COUNT(active_power_w + total_power_import_kwh + total_power_export_kwh),
+               COUNT(DISTINCT CASE WHEN active_power_w IS NOT NULL AND total_power_import_kwh IS NOT NULL
+                                        AND total_power_export_kwh IS NOT NULL
+                                   THEN CAST(timestamp AS INTEGER) END),
+               COALESCE(SUM(active_power_w != ROUND(active_power_w)), 0),
+               COALESCE(SUM(ABS(total_power_import_kwh * 1000 - ROUND(total_power_import_kwh * 1000)) > 1e-6
+                            OR ABS(total_power_export_kwh * 1000 - ROUND(total_power_export_kwh * 1000)) > 1e-6), 0)
+        FROM {TABLE_NAME}
+    ''').fetchone()
+    return {
+        "rows": total,
+        "incomplete": total - complete,
+        "merged": complete - seconds,
+        "power_rounded": power_rounded,
+        "wh_rounded": wh_rounded,
+    }
+
+
+def print_data_loss(loss):
+    print(f"  Onvolledig (vervallen):              {loss['incomplete']} rijen")
+    print(f"  Zelfde seconde (samengevoegd):       {loss['merged']} rijen")
+    print(f"  Vermogen afgerond op hele W:         {loss['power_rounded']} rijen")
+    print(f"  Meterstand afgerond op hele Wh:      {loss['wh_rounded']} rijen")
+
+
+def create_v2_table(conn, table):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            timestamp INTEGER PRIMARY KEY,
+            active_power_w INTEGER NOT NULL,
+            import_wh INTEGER NOT NULL,
+            export_wh INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+
+def copy_batch(conn, after_ts, batch_size):
+    """
+    Kopieert de volgende `batch_size` v1-rijen na `after_ts` naar de v2-tabel.
+    Rijen met ontbrekende waarden vallen af op de NOT NULL-constraints.
+    Retourneert de laatste gekopieerde v1-timestamp, of None als er niets meer te kopiëren was.
+    """
+    row = conn.execute(f'''
+        SELECT MAX(timestamp) FROM (
+            SELECT timestamp FROM {TABLE_NAME} WHERE timestamp > ? ORDER BY timestamp LIMIT ?
+        )
+    ''', (after_ts, batch_size)).fetchone()
+    upper_ts = row[0]
+    if upper_ts is None:
+        return None
+
+    conn.execute(f'''
+        INSERT OR IGNORE INTO {V2_TABLE_NAME} (timestamp, active_power_w, import_wh, export_wh)
+        SELECT {V2_VALUES_SQL} FROM {TABLE_NAME}
+        WHERE timestamp > ? AND timestamp <= ?
+        ORDER BY timestamp
+    ''', (after_ts, upper_ts))
+    return upper_ts
+
+
+def bump_generation(conn):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {GENERATION_TABLE} (
+            source_table TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL
+        )
+    ''')
+    conn.execute(f'''
+        INSERT INTO {GENERATION_TABLE} (source_table, generation) VALUES (?, 1)
+        ON CONFLICT(source_table) DO UPDATE SET generation = generation + 1
+    ''', (TABLE_NAME,))
+
+
+def migrate_to_v2(db_path=DB_PATH, batch_size=BATCH_SIZE, keep_backup=False):
+    """
+    Zet de metingen-tabel om naar schema v2 en rapporteert bestandsgrootte en range-scan snelheid.
+    """
+    print("--- Start Schemamigratie naar v2 ---")
+    if not os.path.exists(db_path):
+        print(f"Fout: Database '{db_path}' niet gevonden.")
+        return
+
+    # Transacties worden hieronder expliciet gestart; ruime timeout omdat de logger een batch open kan hebben
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=120)
+    version = get_schema_version(conn)
+    if version == 0:
+        print(f"Fout: Tabel '{TABLE_NAME}' bestaat niet in '{db_path}'.")
+        conn.close()
+        return
+    if version == 2:
+        print(f"Tabel '{TABLE_NAME}' gebruikt al schema v2. Niets te doen.")
+        conn.close()
+        return
+
+    size_before = get_file_size(db_path)
+    loss = count_data_loss(conn)
+    print(f"Gegevensverlies bij omzetten van {loss['rows']} rijen:")
+    print_data_loss(loss)
+    rows_before, scan_before = time_range_scan(conn, "total_power_import_kwh")
+
+    # 1. Kopiëren in batches; hervat na een eerdere afgebroken run
+    create_v2_table(conn, V2_TABLE_NAME)
+    resume_ts = conn.execute(f"SELECT MAX(timestamp) FROM {V2_TABLE_NAME}").fetchone()[0]
+    # Een v2-seconde kan meerdere v1-rijen bevatten; vanaf het begin van die seconde verder (dubbelen worden genegeerd)
+    after_ts = resume_ts - 1 if resume_ts is not None else float("-inf")
+    if resume_ts is not None:
+        print(f"Migratie wordt hervat na timestamp {resume_ts}.")
+
+    total_rows = loss["rows"]
+    copied = 0
+    start_time = time.perf_counter()
+    while True:
+        conn.execute("BEGIN")
+        upper_ts = copy_batch(conn, after_ts, batch_size)
+        conn.execute("COMMIT")
+        if upper_ts is None:
+            break
+        after_ts = upper_ts
+        copied += batch_size
+        elapsed = time.perf_counter() - start_time
+        print(f"  ~{min(copied, total_rows)}/{total_rows} rijen gekopieerd ({min(copied, total_rows) / max(elapsed, 1e-9):.0f} rijen/s)")
+
+    # 2. Laatste rijen kopiëren en tabellen omwisselen; BEGIN IMMEDIATE houdt schrijvers even tegen
+    conn.execute("BEGIN IMMEDIATE")
+    while True:
+        upper_ts = copy_batch(conn, after_ts, batch_size)
+        if upper_ts is None:
+            break
+        after_ts = upper_ts
+    # Alleen de rijen die de logger tijdens het kopiëren schreef zijn nog niet geteld
+    added_rows = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0] - loss["rows"]
+    conn.execute(f"ALTER TABLE {TABLE_NAME} RENAME TO {BACKUP_TABLE_NAME}")
+    conn.execute(f"ALTER TABLE {V2_TABLE_NAME} RENAME TO {TABLE_NAME}")
+    if not keep_backup:
+        conn.execute(f"DROP TABLE {BACKUP_TABLE_NAME}")
+    bump_generation(conn)
+    conn.execute("COMMIT")
+
+    if not keep_backup:
+        print("Ruimte van de oude tabel vrijgeven (VACUUM)...")
+        conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    size_after = get_file_size(db_path)
+    rows_after, scan_after = time_range_scan(conn, "import_wh")
+    v2_rows = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+    conn.close()
+
+    print("\n--- Schemamigratie Voltooid ---")
+    print(f"Rijen:                  {loss['rows'] + added_rows} -> {v2_rows} ({loss['rows'] + added_rows - v2_rows} vervallen)")
+    print(f"Gegevensverlies (van de {loss['rows']} rijen bij de start; {added_rows} rijen kwamen tijdens het kopiëren binnen):")
+    print_data_loss(loss)
+    print(f"Bestandsgrootte:        {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+    print(f"Range-scan (30 dagen):  {rows_before} rijen in {scan_before * 1000:.1f} ms -> {rows_after} rijen in {scan_after * 1000:.1f} ms")
+    if keep_backup:
+        print(f"De oude tabel is bewaard als '{BACKUP_TABLE_NAME}'.")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Zet de metingen-tabel om naar het compacte schema v2.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Aantal rijen per kopieerbatch.")
+    parser.add_argument('--keep-backup', action='store_true', help=f"Bewaar de oude tabel als '{BACKUP_TABLE_NAME}'.")
+    args = parser.parse_args()
+    migrate_to_v2(batch_size=args.batch_size, keep_backup=args.keep_backup)
@@ -1,11 +1,20 @@
 '''
 Dit script haalt P1-meterdata op en schrijft deze direct naar een SQLite-database.
-Het is bedoeld om via een cron-taak te worden uitgevoerd.
+Het is bedoeld om via een cron-taak te worden uitgevoerd, of met --daemon als
+langlopend proces dat de meter met een vast interval uitleest. In daemon-modus komt
+elke meting in een gedeelde ringbuffer (voor /api/recent van de Flask-server) en gaat
+per blok van --store-interval seconden één samengevatte meting naar de database.
 '''
 import requests
+import argparse
 import datetime
+import math
+import mmap
 import os
+import signal
 import sqlite3
+import struct
+import time
 
 # --- Configuratie ---
 P1_IP = "192.168.178.128"
@@ -15,9 +24,170 @@ API_URL = f"http://{P1_IP}/api/v1/data"
 DB_PATH = os.path.join(os.path.expanduser('~'), 'p1_data.db')
 TABLE_NAME = "metingen"
 
+# Standaardwaarden voor de daemon-modus
+DAEMON_INTERVAL_S = 1.0
+DAEMON_STORE_INTERVAL_S = 10.0
+DAEMON_BATCH_SIZE = 30
+DAEMON_BATCH_SECONDS = 60.0
+# Zo lang wacht de daemon op een andere schrijver; daarna blijft de batch staan tot de volgende meting
+DAEMON_BUSY_TIMEOUT_S = 0.5
+
+# Ringbuffer met de recente metingen op volle resolutie. In het geheugen (/dev/shm) als dat bestaat,
+# anders naast de database; dezelfde indeling wordt gelezen door flask_http_server.py.
+RECENT_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else os.path.expanduser('~')
+RECENT_PATH = os.path.join(RECENT_DIR, 'p1_recent.bin')
+RECENT_CAPACITY = 3600
+RECENT_MAGIC = b"P1RB"
+RECENT_VERSION = 1
+# Kop: magic, versie, capaciteit, recordgrootte en op offset 16 het aantal ooit geschreven metingen (u64)
+RECENT_HEADER = struct.Struct("<4sIIIQ8x")
+RECENT_COUNT = struct.Struct("<Q")
+RECENT_COUNT_OFFSET = 16
+# Record: timestamp, active_power_w, total_power_import_kwh, total_power_export_kwh zoals in de database
+RECENT_RECORD = struct.Struct("<dddd")
+
+# INSERT per schemaversie; schema v2 (migrate_schema_v2.py) slaat hele seconden en Wh op
+INSERT_SQL = {
+    1: f'''
+        INSERT OR IGNORE INTO {TABLE_NAME} (timestamp, active_power_w, total_power_import_kwh, total_power_export_kwh)
+        VALUES (?, ?, ?, ?)
+    ''',
+    2: f'''
+        INSERT OR IGNORE INTO {TABLE_NAME} (timestamp, active_power_w, import_wh, export_wh)
+        VALUES (CAST(? AS INTEGER), CAST(ROUND(?) AS INTEGER), CAST(ROUND(? * 1000) AS INTEGER), CAST(ROUND(? * 1000) AS INTEGER))
+    ''',
+}
+
+def get_schema_version(conn):
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE_NAME})")}
+    return 2 if "import_wh" in columns else 1
+
+def is_busy_error(error):
+    """SQLITE_BUSY of SQLITE_LOCKED: een andere verbinding schrijft, later opnieuw proberen."""
+    return "locked" in str(error)
+
+def is_schema_error(error):
+    """De tabel is intussen gemigreerd of vervangen, bijv. door migrate_schema_v2.py."""
+    message = str(error)
+    return "no such table" in message or "no such column" in message or "has no column named" in message
+
+def store_rows(conn, schema_version, rows):
+    """
+    Schrijft `rows` in één korte transactie weg en retourneert de schemaversie die daarbij gebruikt is.
+    Bij een fout wordt de transactie teruggedraaid en de fout doorgegeven; de aanroeper houdt de rijen.
+    """
+    try:
+        try:
+            conn.executemany(INSERT_SQL[schema_version], rows)
+        except sqlite3.OperationalError as e:
+            if not is_schema_error(e):
+                raise
+            conn.rollback()
+            schema_version = get_schema_version(conn)
+            conn.executemany(INSERT_SQL[schema_version], rows)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return schema_version
+
+def parse_measurement(data, unix_timestamp):
+    """
+    Zet een API-response om naar een rij voor de database, of None als essentiële data ontbreekt.
+    Geeft ValueError als de response geen JSON-object is, net als bij ongeldige JSON.
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"verwacht een JSON-object, kreeg {type(data).__name__}")
+    active_power = data.get('active_power_w', 0.0)
+    import_kwh = data.get('total_power_import_kwh')
+    export_kwh = data.get('total_power_export_kwh')
+
+    if import_kwh is None or export_kwh is None:
+        return None
+
+    return (
+        unix_timestamp,
+        active_power,
+        import_kwh,
+        export_kwh
+    )
+
+class SlotAggregate:
+    '''
+    Vat de metingen van één blok van `store_interval` seconden samen tot één rij voor de database:
+    de timestamp en meterstanden van de laatste meting en het gemiddelde vermogen van alle metingen.
+    Met de laatste meterstanden blijven de energietotalen exact; het gemiddelde houdt korte pieken mee
+    in het vermogen in plaats van alleen de toevallige eerste meting van het blok.
+    '''
+
+    def __init__(self, slot, row):
+        self.slot = slot
+        self.last = row
+        self.power_sum = 0.0
+        self.power_count = 0
+        self.add(row)
+
+    def add(self, row):
+        self.last = row
+        if row[1] is not None:
+            self.power_sum += row[1]
+            self.power_count += 1
+
+    def row(self):
+        mean_power = self.power_sum / self.power_count if self.power_count else None
+        return (self.last[0], mean_power, self.last[2], self.last[3])
+
+class RecentBuffer:
+    '''
+    Ringbuffer met de laatste `capacity` metingen in een memory-mapped bestand, met precies één schrijver.
+    Een meting gaat naar record `count % capacity`; pas daarna wordt de teller `count` in de kop verhoogd.
+    Lezers hebben dus geen lock nodig: wat ze lezen is geldig zolang de teller intussen niet zo ver is
+    opgeschoven dat het record opnieuw beschreven kan zijn.
+    Een bestaande buffer met dezelfde indeling wordt voortgezet; anders wordt een nieuw bestand op zijn
+    plaats gezet (nooit ingekort, zodat een lezer met de oude mapping geen SIGBUS krijgt).
+    '''
+
+    def __init__(self, path=RECENT_PATH, capacity=RECENT_CAPACITY):
+        self.capacity = capacity
+        size = RECENT_HEADER.size + capacity * RECENT_RECORD.size
+        fd = None
+        try:
+            fd = os.open(path, os.O_RDWR)
+            if os.fstat(fd).st_size != size:
+                raise ValueError("afwijkende grootte")
+            self.map = mmap.mmap(fd, size)
+            magic, version, stored_capacity, record_size, self.count = RECENT_HEADER.unpack_from(self.map)
+            if (magic, version, stored_capacity, record_size) != (RECENT_MAGIC, RECENT_VERSION, capacity, RECENT_RECORD.size):
+                self.map.close()
+                raise ValueError("afwijkende indeling")
+        except (FileNotFoundError, ValueError):
+            if fd is not None:
+                os.close(fd)
+                fd = None
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(RECENT_HEADER.pack(RECENT_MAGIC, RECENT_VERSION, capacity, RECENT_RECORD.size, 0))
+                f.truncate(size)
+            os.replace(tmp_path, path)
+            fd = os.open(path, os.O_RDWR)
+            self.map = mmap.mmap(fd, size)
+            self.count = 0
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def append(self, row):
+        values = tuple(math.nan if value is None else value for value in row)
+        RECENT_RECORD.pack_into(self.map, RECENT_HEADER.size + (self.count % self.capacity) * RECENT_RECORD.size, *values)
+        self.count += 1
+        RECENT_COUNT.pack_into(self.map, RECENT_COUNT_OFFSET, self.count)
+
+    def close(self):
+        self.map.close()
+
 def log_to_sqlite():
     """Haalt P1-data op en schrijft deze direct naar de SQLite-database."""
-    
+
     if not os.path.exists(DB_PATH):
         print(f"Fout: Database '{DB_PATH}' niet gevonden. Zorg dat de database bestaat.")
         return
@@ -25,38 +195,24 @@ def log_to_sqlite():
     try:
         # 1. Data ophalen van de P1 meter API
         response = requests.get(API_URL, timeout=10)
-        response.raise_for_status() 
+        response.raise_for_status()
         data = response.json()
         print("Data succesvol opgehaald van P1 meter.")
 
         # 2. Benodigde velden uit de JSON-data halen
-        active_power = data.get('active_power_w', 0.0)
-        import_kwh = data.get('total_power_import_kwh')
-        export_kwh = data.get('total_power_export_kwh')
+        # Gebruik de huidige tijd voor de timestamp
+        data_tuple = parse_measurement(data, datetime.datetime.now().timestamp())
 
-        if import_kwh is None or export_kwh is None:
+        if data_tuple is None:
             print("Fout: Essentiële data (import/export kWh) ontbreekt in API response.")
             return
-            
-        # Gebruik de huidige tijd voor de timestamp
-        unix_timestamp = datetime.datetime.now().timestamp()
 
         # 3. Data naar SQLite schrijven
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
 
-        data_tuple = (
-            unix_timestamp,
-            active_power,
-            import_kwh,
-            export_kwh
-        )
-
-        cursor.execute(f'''
-            INSERT OR IGNORE INTO {TABLE_NAME} (timestamp, active_power_w, total_power_import_kwh, total_power_export_kwh)
-            VALUES (?, ?, ?, ?)
-        ''', data_tuple)
-        
+        cursor.execute(INSERT_SQL[get_schema_version(conn)], data_tuple)
+
         conn.commit()
         conn.close()
 
@@ -69,5 +225,149 @@ def log_to_sqlite():
     except Exception as e:
         print(f"Een onverwachte fout is opgetreden: {e}")
 
+def run_daemon(api_url=API_URL, db_path=DB_PATH, interval=DAEMON_INTERVAL_S,
+               batch_size=DAEMON_BATCH_SIZE, batch_seconds=DAEMON_BATCH_SECONDS, max_samples=None,
+               store_interval=DAEMON_STORE_INTERVAL_S, recent_path=RECENT_PATH, recent_capacity=RECENT_CAPACITY):
+    """
+    Leest de P1-meter continu uit met één HTTP-sessie en één databaseverbinding.
+
+    De metingen worden ingepland op vaste tijdstippen (start + n * interval), zodat de
+    looptijd van een request niet optelt. Gemiste tijdstippen worden overgeslagen.
+    Elke meting gaat naar de ringbuffer in `recent_path` (tenzij None); naar de database gaat
+    per blok van `store_interval` seconden één rij met het gemiddelde vermogen en de laatste
+    meterstanden (zie SlotAggregate), wat het aantal schrijfacties op de flash-opslag beperkt.
+    De op te slaan metingen worden in het geheugen verzameld en na `batch_size` metingen of
+    `batch_seconds` seconden in één transactie weggeschreven. Is de database bezet, dan blijven ze
+    staan en volgt een nieuwe poging bij de volgende meting; bij SIGTERM/SIGINT wordt de batch
+    eerst weggeschreven.
+    """
+    if interval <= 0 or store_interval <= 0:
+        raise ValueError(f"interval en store_interval moeten groter dan 0 zijn, niet {interval} en {store_interval}.")
+    if not os.path.exists(db_path):
+        print(f"Fout: Database '{db_path}' niet gevonden. Zorg dat de database bestaat.")
+        return
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    previous_handlers = {sig: signal.signal(sig, request_stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+
+    session = requests.Session()
+    conn = sqlite3.connect(db_path, timeout=DAEMON_BUSY_TIMEOUT_S)
+    schema_version = get_schema_version(conn)
+    recent = RecentBuffer(recent_path, recent_capacity) if recent_path else None
+    pending = []
+    busy = False
+    last_commit = time.monotonic()
+    samples = 0
+    stored = 0
+    aggregate = None
+
+    print(f"Daemon gestart: elke {interval} s uitlezen, elke {store_interval} s naar {os.path.basename(db_path)}, commit per {batch_size} metingen of {batch_seconds} s.")
+    if recent is not None:
+        print(f"Recente metingen in ringbuffer {recent_path} ({recent_capacity} metingen).")
+    try:
+        start = time.monotonic()
+        tick = 0
+        while not stopping:
+            try:
+                response = session.get(api_url, timeout=max(1.0, min(10.0, interval)))
+                response.raise_for_status()
+                data_tuple = parse_measurement(response.json(), time.time())
+                if data_tuple is None:
+                    print("Fout: Essentiële data (import/export kWh) ontbreekt in API response.")
+                else:
+                    samples += 1
+                    if recent is not None:
+                        recent.append(data_tuple)
+                    # Eén samengevatte rij per blok van store_interval seconden op de klok naar de database;
+                    # een blok is af zodra de eerste meting van een volgend blok binnenkomt
+                    slot = int(data_tuple[0] // store_interval)
+                    if aggregate is not None and aggregate.slot == slot:
+                        aggregate.add(data_tuple)
+                    else:
+                        if aggregate is not None:
+                            pending.append(aggregate.row())
+                        aggregate = SlotAggregate(slot, data_tuple)
+            except requests.RequestException as e:
+                print(f"Fout bij ophalen data: {e}")
+            except ValueError as e:
+                print(f"Fout bij lezen API response: {e}")
+
+            now = time.monotonic()
+            if pending and (len(pending) >= batch_size or now - last_commit >= batch_seconds):
+                try:
+                    schema_version = store_rows(conn, schema_version, pending)
+                except sqlite3.OperationalError as e:
+                    if not is_busy_error(e):
+                        raise
+                    if not busy:
+                        print(f"Database bezet ({e}), {len(pending)} metingen worden later opnieuw weggeschreven.")
+                    busy = True
+                else:
+                    stored += len(pending)
+                    pending = []
+                    busy = False
+                    last_commit = now
+
+            if max_samples is not None and samples >= max_samples:
+                break
+
+            # Volgend tijdstip op het vaste rooster; bij achterstand direct door naar het eerstvolgende
+            tick = max(tick + 1, int((now - start) / interval) + 1)
+            # In korte stappen slapen zodat een stopsignaal snel wordt opgepakt
+            next_run = start + tick * interval
+            while not stopping:
+                delay = next_run - time.monotonic()
+                if delay <= 0:
+                    break
+                time.sleep(min(delay, 0.5))
+    except sqlite3.Error as e:
+        print(f"Fout bij schrijven naar database: {e}")
+    finally:
+        if aggregate is not None:
+            # Het laatste, nog lopende blok
+            pending.append(aggregate.row())
+        try:
+            if pending:
+                # Bij het stoppen langer op een andere schrijver wachten dan tijdens het uitlezen
+                conn.execute("PRAGMA busy_timeout = 10000")
+                store_rows(conn, schema_version, pending)
+                stored += len(pending)
+        except sqlite3.Error as e:
+            print(f"Fout bij schrijven naar database: {e}, {len(pending)} metingen niet opgeslagen.")
+        finally:
+            conn.close()
+            session.close()
+            if recent is not None:
+                recent.close()
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+        print(f"Daemon gestopt, {samples} metingen gelezen en {stored} opgeslagen.")
+
+def positive_float(value):
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"moet groter dan 0 zijn, niet {value}")
+    return number
+
 if __name__ == '__main__':
-    log_to_sqlite()
+    parser = argparse.ArgumentParser(description="Schrijft P1-meterdata naar SQLite.")
+    parser.add_argument('--daemon', action='store_true', help="Blijf draaien en lees de meter met een vast interval uit.")
+    parser.add_argument('--interval', type=positive_float, default=DAEMON_INTERVAL_S, help="Interval in seconden (daemon-modus).")
+    parser.add_argument('--batch-size', type=int, default=DAEMON_BATCH_SIZE, help="Commit na dit aantal metingen (daemon-modus).")
+    parser.add_argument('--batch-seconds', type=float, default=DAEMON_BATCH_SECONDS, help="Commit uiterlijk na dit aantal seconden (daemon-modus).")
+    parser.add_argument('--store-interval', type=positive_float, default=DAEMON_STORE_INTERVAL_S, help="Sla per blok van dit aantal seconden één rij (gemiddeld vermogen, laatste meterstanden) op in de database (daemon-modus).")
+    parser.add_argument('--recent-capacity', type=int, default=RECENT_CAPACITY, help="Aantal metingen in de ringbuffer (daemon-modus).")
+    parser.add_argument('--no-recent', action='store_true', help="Geen ringbuffer met recente metingen bijhouden (daemon-modus).")
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon(interval=args.interval, batch_size=args.batch_size, batch_seconds=args.batch_seconds,
+                   store_interval=args.store_interval, recent_path=None if args.no_recent else RECENT_PATH,
+                   recent_capacity=args.recent_capacity)
+    else:
+        log_to_sqlite()
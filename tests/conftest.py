@@ -0,0 +1,62 @@
+"""
+Gedeelde hulpmiddelen voor de tests: de scripts in src/ en termux/ importeerbaar maken, een vaste tijdzone
+(de dag-, week- en maandindeling volgt de lokale tijd) en een database met de metingen uit tests/fixtures.
+"""
+import os
+import sys
+import csv
+import time
+import sqlite3
+
+import pytest
+
+# Alle golden bestanden zijn in Nederlandse tijd gemaakt; de fixture loopt over de overgang naar zomertijd
+os.environ["TZ"] = "Europe/Amsterdam"
+time.tzset()
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+for script_dir in ("src", "termux"):
+    sys.path.insert(0, os.path.join(ROOT_DIR, script_dir))
+
+import generate_P1_dashboard
+
+def load_fixture_rows():
+    """
+    Leest tests/fixtures/metingen.csv: twee weken metingen per kwartier (25 maart - 7 april 2024) met
+    een gat van vijf uur, een meterreset en een rij zonder vermogen. Lege velden worden None.
+    """
+    with open(os.path.join(FIXTURES_DIR, "metingen.csv"), newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        return [tuple(float(value) if value != "" else None for value in row) for row in reader]
+
+def create_v1_db(path, rows=()):
+    """Maakt een database met de tabel metingen in schema v1 (zoals migrate_data.py) en de gegeven rijen."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS metingen (
+            timestamp REAL PRIMARY KEY,
+            active_power_w REAL,
+            total_power_import_kwh REAL,
+            total_power_export_kwh REAL
+        )
+    """)
+    conn.executemany("INSERT INTO metingen VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    return conn
+
+@pytest.fixture
+def fixture_rows():
+    return load_fixture_rows()
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Pad van een lege database waar de generator naar kijkt."""
+    path = str(tmp_path / "p1_data.db")
+    monkeypatch.setattr(generate_P1_dashboard, "get_db_path", lambda: path)
+    return path
+
+@pytest.fixture
+def output_path(tmp_path):
+    return str(tmp_path / "output" / "energie_dashboard.html")
@@ -0,0 +1,104 @@
+"""
+Tests voor src/compact_metingen.py: na het uitdunnen geeft de generator dezelfde dag-, week-, maand- en
+jaartotalen, en --dry-run laat de database ongemoeid.
+"""
+import hashlib
+import sqlite3
+from datetime import datetime
+
+import generate_P1_dashboard as g
+import compact_metingen
+from conftest import create_v1_db
+
+PERIODS = ("day", "week", "month", "year", "years")
+
+def make_rows():
+    """
+    Een meting per minuut van 29 maart tot en met 2 april 2024 (over de overgang naar zomertijd en een
+    maandgrens), met wisselend verbruik en teruglevering en één meterreset. Alles is ouder dan 90 dagen.
+    """
+    start = int(datetime(2024, 3, 29).timestamp())
+    end = int(datetime(2024, 4, 3).timestamp())
+    reset_ts = int(datetime(2024, 3, 30, 14, 7).timestamp())
+    rows = []
+    import_wh = 1000000
+    export_wh = 500000
+    for i, ts in enumerate(range(start, end, 60)):
+        power = (i * 37) % 2400 - 600
+        if power > 0:
+            import_wh += power // 60
+        else:
+            export_wh -= power // 60
+        if ts == reset_ts:
+            import_wh = 0
+        rows.append((float(ts), float(power), import_wh / 1000, export_wh / 1000))
+    return rows
+
+def period_totals(all_data):
+    """De totalen per periode, en voor de overzichten ook de staven per dag, week of maand."""
+    totals = {}
+    for period in PERIODS:
+        for key, dataset in all_data[period].items():
+            value = (dataset["total_import"], dataset["total_export"])
+            if period != "day":
+                value += (dataset["imports"], dataset["exports"])
+            totals[(period, key)] = value
+    return totals
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def row_count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM metingen").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_compaction_keeps_period_totals(db_path, output_path):
+    rows = make_rows()
+    create_v1_db(db_path, rows).close()
+    # De rollups staan al in de database, zoals bij een dashboard dat al een tijd draait
+    before = period_totals(g.DashboardEngine(output_path).refresh())
+
+    removed = compact_metingen.compact_metingen(db_path=db_path, keep_days=90, bucket_minutes=15)
+
+    assert removed > 0.8 * len(rows)
+    assert row_count(db_path) == len(rows) - removed
+    # Een nieuwe engine vult aan vanaf de opgeslagen rollups, een volledige refresh rekent alles opnieuw uit
+    assert period_totals(g.DashboardEngine(output_path).refresh()) == before
+    assert period_totals(g.DashboardEngine(output_path).refresh(full=True)) == before
+
+def test_compaction_skips_bucket_with_meter_reset(db_path):
+    rows = make_rows()
+    create_v1_db(db_path, rows).close()
+    compact_metingen.compact_metingen(db_path=db_path, keep_days=90, bucket_minutes=15)
+
+    # Het blok van 14:00 tot 14:15 met de meterreset blijft op volle resolutie staan
+    bucket_start = datetime(2024, 3, 30, 14).timestamp()
+    conn = sqlite3.connect(db_path)
+    try:
+        kept = conn.execute("SELECT COUNT(*) FROM metingen WHERE timestamp >= ? AND timestamp < ?",
+                            (bucket_start, bucket_start + 900)).fetchone()[0]
+    finally:
+        conn.close()
+    assert kept == 15
+
+def test_dry_run_leaves_database_untouched(db_path, capsys):
+    create_v1_db(db_path, make_rows()).close()
+    digest = file_digest(db_path)
+
+    planned = compact_metingen.compact_metingen(db_path=db_path, keep_days=90, bucket_minutes=15, dry_run=True)
+
+    assert planned > 0
+    assert f"({planned} te verwijderen)" in capsys.readouterr().out
+    assert file_digest(db_path) == digest
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+    assert tables == {"metingen"}
+    # De echte run verwijdert precies wat de dry-run voorspelde
+    assert compact_metingen.compact_metingen(db_path=db_path, keep_days=90, bucket_minutes=15) == planned
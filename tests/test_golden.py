@@ -0,0 +1,90 @@
+"""
+Vergelijkt allData van de generator met golden bestanden voor de fixture in tests/fixtures/metingen.csv.
+
+- golden_all_data.json is allData van de oorspronkelijke generator (alle metingen in één keer in het geheugen).
+  De week-, maand-, jaar- en jarenoverzichten en de totalen en titels van de dagen moeten daar exact aan gelijk
+  blijven, ook nu ze uit de rollups en de opgeslagen dagreeksen komen.
+- golden_day_series.json bevat de daggrafieken in bins van 5 minuten met gaten vanaf 30 minuten. Die vervangen
+  de reeksen per meting van de oorspronkelijke generator en zijn daarom apart vastgelegd.
+"""
+import os
+import json
+
+import pytest
+
+import generate_P1_dashboard as g
+from conftest import FIXTURES_DIR, create_v1_db
+
+DAY_SERIES_FIELDS = ("labels", "imports", "exports")
+
+def load_golden():
+    with open(os.path.join(FIXTURES_DIR, "golden_all_data.json"), encoding="utf-8") as f:
+        all_data = json.load(f)
+    with open(os.path.join(FIXTURES_DIR, "golden_day_series.json"), encoding="utf-8") as f:
+        day_series = json.load(f)
+    for day_key, series in day_series.items():
+        all_data["day"][day_key].update(series)
+    return all_data
+
+def refresh(output_path, full=False, engine=None):
+    engine = engine or g.DashboardEngine(output_path, day_bin_minutes=5, day_gap_minutes=30)
+    # Via JSON, zoals de pagina en de API het zien
+    return json.loads(json.dumps(engine.refresh(full=full)))
+
+def assert_matches_golden(all_periods):
+    golden = load_golden()
+    assert sorted(all_periods) == sorted(golden)
+    for period in golden:
+        assert sorted(all_periods[period]) == sorted(golden[period]), period
+        for key, dataset in golden[period].items():
+            assert all_periods[period][key] == dataset, (period, key)
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_full_refresh_matches_golden(db_path, output_path, fixture_rows, monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(g, "np", None)
+    elif g.np is None:
+        pytest.skip("NumPy is niet geïnstalleerd")
+    create_v1_db(db_path, fixture_rows).close()
+
+    assert_matches_golden(refresh(output_path, full=True))
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_incomplete_rows_are_skipped(db_path, output_path, fixture_rows, monkeypatch, capsys, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(g, "np", None)
+    elif g.np is None:
+        pytest.skip("NumPy is niet geïnstalleerd")
+    # Tussen de metingen staan rijen zonder meterstand of vermogen; beide leespaden slaan ze over
+    incomplete = [(row[0] + 0.5, None, row[2], row[3]) if i % 2 else (row[0] + 0.5, row[1], None, row[3])
+                  for i, row in enumerate(fixture_rows[::50])]
+    create_v1_db(db_path, fixture_rows + incomplete).close()
+
+    assert_matches_golden(refresh(output_path, full=True))
+    assert "Fout bij het verwerken" not in capsys.readouterr().out
+
+def test_incremental_refresh_matches_golden(db_path, output_path, fixture_rows):
+    # Eerst tot halverwege een dag, daarna de rest: de rollups en dagreeksen worden aangevuld
+    split = next(i for i, row in enumerate(fixture_rows) if row[0] >= 1712000000)
+    conn = create_v1_db(db_path, fixture_rows[:split])
+    engine = g.DashboardEngine(output_path, day_bin_minutes=5, day_gap_minutes=30)
+    refresh(output_path, engine=engine)
+
+    conn.executemany("INSERT INTO metingen VALUES (?, ?, ?, ?)", fixture_rows[split:])
+    conn.commit()
+    conn.close()
+
+    assert_matches_golden(refresh(output_path, engine=engine))
+    # Een nieuwe engine begint vanaf de opgeslagen rollups en dagreeksen in de database
+    assert_matches_golden(refresh(output_path))
+
+def test_dashboard_files_are_written(db_path, output_path, fixture_rows):
+    create_v1_db(db_path, fixture_rows).close()
+    refresh(output_path)
+
+    with open(os.path.splitext(output_path)[0] + ".json", encoding="utf-8") as f:
+        data = json.load(f)
+    last = fixture_rows[-1]
+    assert data["last"]["total_import"] == round(last[2], 3)
+    assert data["last"]["total_export"] == round(last[3], 3)
+    assert os.path.exists(output_path + ".gz") and os.path.exists(output_path + ".sha256")
@@ -0,0 +1,80 @@
+"""
+Tests voor de parallelle import van src/import_jsonl.py: dezelfde database als sequentieel inlezen, en de rijen
+gaan op volgorde van timestamp naar SQLite, ook als bereiken van het bestand elkaar in de tijd overlappen.
+"""
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import import_jsonl
+from conftest import create_v1_db
+
+def write_log(path, timestamps):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, ts in enumerate(timestamps):
+            f.write(json.dumps({
+                "timestamp": ts.isoformat(),
+                "data": {"active_power_w": 100 + i, "total_power_import_kwh": 1000 + i * 0.001, "total_power_export_kwh": 500.0},
+            }) + "\n")
+
+def import_log(db_path, log_path, pool=None):
+    conn = create_v1_db(db_path)
+    import_jsonl.create_manifest_table(conn)
+    counts = import_jsonl.import_file(conn, "metingen", log_path, pool)
+    rows = conn.execute("SELECT * FROM metingen ORDER BY timestamp").fetchall()
+    conn.close()
+    return counts, rows
+
+@pytest.fixture
+def pool():
+    pool = import_jsonl.create_worker_pool(2)
+    if pool is None:
+        pytest.skip("Geen multiprocessing op dit platform")
+    yield pool
+    pool.close()
+    pool.join()
+
+def test_parallel_import_inserts_in_timestamp_order(tmp_path, monkeypatch, pool):
+    # Drie blokken van een uur: het tweede ligt in de tijd vóór het eerste (klok teruggezet), het derde erna.
+    # De tweede helft van het eerste blok valt samen met het tweede blok: dubbele timestamps.
+    base = datetime(2024, 5, 1, 12)
+    timestamps = ([base + timedelta(seconds=10 * i) for i in range(360)]
+                  + [base - timedelta(minutes=30) + timedelta(seconds=10 * i) for i in range(360)]
+                  + [base + timedelta(hours=2, seconds=10 * i) for i in range(360)])
+    log_path = str(tmp_path / "p1.jsonl")
+    write_log(log_path, timestamps)
+
+    expected_counts, expected_rows = import_log(str(tmp_path / "sequentieel.db"), log_path)
+
+    inserted = []
+    insert_rows = import_jsonl.insert_rows
+    def recording_insert_rows(conn, table_name, rows):
+        inserted.extend(row[0] for row in rows)
+        return insert_rows(conn, table_name, rows)
+    monkeypatch.setattr(import_jsonl, "insert_rows", recording_insert_rows)
+    # Kleine bereiken, zodat elk blok over meerdere workers verdeeld wordt
+    monkeypatch.setattr(import_jsonl, "PARALLEL_RANGE_BYTES", 16 * 1024)
+    counts, rows = import_log(str(tmp_path / "parallel.db"), log_path, pool)
+
+    assert inserted == sorted(inserted)
+    assert len(inserted) == len(timestamps)
+    assert counts == expected_counts
+    assert rows == expected_rows
+
+def test_parallel_import_with_small_merge_window(tmp_path, monkeypatch, pool):
+    # Een venster kleiner dan de sprong terug in de tijd: de volgorde is dan per venster, de inhoud blijft gelijk
+    base = datetime(2024, 5, 1, 12)
+    timestamps = ([base + timedelta(seconds=10 * i) for i in range(360)]
+                  + [base - timedelta(minutes=30) + timedelta(seconds=10 * i) for i in range(360)])
+    log_path = str(tmp_path / "p1.jsonl")
+    write_log(log_path, timestamps)
+
+    expected_counts, expected_rows = import_log(str(tmp_path / "sequentieel.db"), log_path)
+    monkeypatch.setattr(import_jsonl, "PARALLEL_RANGE_BYTES", 16 * 1024)
+    monkeypatch.setattr(import_jsonl, "PARALLEL_MERGE_ROWS", 100)
+    counts, rows = import_log(str(tmp_path / "parallel.db"), log_path, pool)
+
+    assert counts == expected_counts
+    assert rows == expected_rows
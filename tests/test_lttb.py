@@ -0,0 +1,50 @@
+"""
+Tests voor het uitdunnen van daggrafieken met LTTB (BLOK 5.2 van generate_P1_dashboard.py).
+"""
+import pytest
+
+import generate_P1_dashboard as g
+
+def make_day_dataset(bin_minutes):
+    """Een daggrafiek met verbruik, teruglevering midden op de dag, één piek per soort en een gat van 03:00 tot 04:00."""
+    labels, imports, exports = [], [], []
+    for minute in range(0, 24 * 60, bin_minutes):
+        labels.append(f"{minute // 60:02d}:{minute % 60:02d}")
+        if 3 * 60 <= minute < 4 * 60:
+            imports.append(None)
+            exports.append(None)
+        elif 10 * 60 <= minute < 16 * 60:
+            imports.append(0.0)
+            exports.append(900.0 + minute % 37 + (2000.0 if minute == 13 * 60 + 1 else 0.0))
+        else:
+            imports.append(300.0 + minute % 53 + (2500.0 if minute == 19 * 60 + 7 else 0.0))
+            exports.append(0.0)
+    return {"labels": labels, "imports": imports, "exports": exports,
+            "total_import": 8.0, "total_export": 4.0, "title": "test", "type": "line"}
+
+def test_default_bins_fit_the_budget():
+    # 288 bins van 5 minuten: er valt niets uit te dunnen en de pagina toont geen knop "Alle punten"
+    dataset = make_day_dataset(g.DAY_BIN_MINUTES)
+    assert len(dataset["labels"]) <= g.DAY_POINT_BUDGET
+    sampled = g.downsample_day_dataset(dataset)
+    assert sampled is dataset
+    assert "full_count" not in sampled
+
+def test_one_minute_bins_are_thinned_with_peaks_and_gap():
+    dataset = make_day_dataset(1)
+    sampled = g.downsample_day_dataset(dataset)
+
+    assert len(sampled["labels"]) == g.DAY_POINT_BUDGET
+    assert sampled["full_count"] == len(dataset["labels"])
+    assert max(v for v in sampled["imports"] if v is not None) == max(v for v in dataset["imports"] if v is not None)
+    assert max(v for v in sampled["exports"] if v is not None) == max(v for v in dataset["exports"] if v is not None)
+    assert None in sampled["imports"]
+
+def test_numpy_and_python_select_the_same_points(monkeypatch):
+    if g.np is None:
+        pytest.skip("NumPy is niet geïnstalleerd")
+    # Groot genoeg voor de NumPy-variant (minstens 20 punten per bucket)
+    values = [((i * 7919) % 1000) * (3 if i % 997 == 0 else 1) for i in range(20000)]
+    with_numpy = g.lttb_indices(values, 500)
+    monkeypatch.setattr(g, "np", None)
+    assert g.lttb_indices(values, 500) == with_numpy
@@ -0,0 +1,112 @@
+"""
+Tests voor de gebatchte migratie van src/migrate_data.py met een nagebootste ChromaDB-collectie,
+zodat chromadb zelf niet geïnstalleerd of geïmporteerd hoeft te worden.
+"""
+import sys
+import sqlite3
+
+import pytest
+
+import migrate_data
+import migrate_schema_v2
+
+class FakeCollection:
+    """
+    Bootst count() en get(limit, offset, include) van een ChromaDB-collectie na. Net als ChromaDB levert
+    ze de records niet op volgorde van timestamp. Met `fail_at_offset` breekt get() af bij die offset.
+    """
+
+    def __init__(self, metadatas, fail_at_offset=None):
+        self.metadatas = metadatas
+        self.fail_at_offset = fail_at_offset
+        self.requested = []
+
+    def count(self):
+        return len(self.metadatas)
+
+    def get(self, limit, offset, include):
+        assert include == ["metadatas"]
+        if offset == self.fail_at_offset:
+            raise RuntimeError("verbinding met ChromaDB verbroken")
+        self.requested.append((offset, limit))
+        return {"ids": [f"id{i}" for i in range(offset, offset + limit)], "metadatas": self.metadatas[offset:offset + limit]}
+
+def make_metadatas(count):
+    # Records in een door elkaar gehusselde volgorde, steeds een minuut uit elkaar
+    order = [(i * 7) % count for i in range(count)]
+    return [{"timestamp": 1712000000.0 + 60 * i, "active_power_w": 100 + i,
+             "total_power_import_kwh": 1000 + i * 0.01, "total_power_export_kwh": 500.0} for i in order]
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "p1_data.db"))
+    migrate_data.create_tables(conn)
+    yield conn
+    conn.close()
+
+def stored_timestamps(conn):
+    return [row[0] for row in conn.execute("SELECT timestamp FROM metingen ORDER BY timestamp")]
+
+def test_pagination_covers_every_record(conn):
+    # 23 records in batches van 5: de laatste batch is niet vol
+    metadatas = make_metadatas(23)
+    collection = FakeCollection(metadatas)
+
+    migrated, skipped = migrate_data.migrate_collection(collection, conn, batch_size=5)
+
+    assert (migrated, skipped) == (23, 0)
+    assert collection.requested == [(0, 5), (5, 5), (10, 5), (15, 5), (20, 5)]
+    assert stored_timestamps(conn) == sorted(meta["timestamp"] for meta in metadatas)
+    assert migrate_data.get_resume_offset(conn, migrate_data.COLLECTION_NAME) == 23
+
+def test_interrupted_run_resumes_without_duplicates(conn, capsys):
+    metadatas = make_metadatas(23)
+    with pytest.raises(RuntimeError):
+        migrate_data.migrate_collection(FakeCollection(metadatas, fail_at_offset=10), conn, batch_size=5)
+    # Twee volledige batches zijn samen met de voortgang gecommit
+    assert migrate_data.get_resume_offset(conn, migrate_data.COLLECTION_NAME) == 10
+    assert len(stored_timestamps(conn)) == 10
+
+    collection = FakeCollection(metadatas)
+    migrated, skipped = migrate_data.migrate_collection(collection, conn, batch_size=5)
+
+    assert "hervat vanaf record 10 van 23" in capsys.readouterr().out
+    # Alleen de rest wordt opgehaald; niets wordt twee keer ingevoegd of als duplicaat overgeslagen
+    assert collection.requested == [(10, 5), (15, 5), (20, 5)]
+    assert (migrated, skipped) == (13, 0)
+    assert stored_timestamps(conn) == sorted(meta["timestamp"] for meta in metadatas)
+
+def test_completed_migration_fetches_nothing(conn):
+    metadatas = make_metadatas(12)
+    migrate_data.migrate_collection(FakeCollection(metadatas), conn, batch_size=5)
+
+    collection = FakeCollection(metadatas)
+    assert migrate_data.migrate_collection(collection, conn, batch_size=5) == (0, 0)
+    assert collection.requested == []
+
+def test_chromadb_is_not_imported_with_injected_collection(conn, monkeypatch):
+    # None in sys.modules laat elke 'import chromadb' mislukken
+    monkeypatch.delitem(sys.modules, "chromadb", raising=False)
+    monkeypatch.setitem(sys.modules, "chromadb", None)
+
+    migrated, _ = migrate_data.migrate_collection(FakeCollection(make_metadatas(8)), conn, batch_size=5)
+
+    assert migrated == 8
+    assert sys.modules["chromadb"] is None
+
+def test_migration_into_schema_v2(conn):
+    migrate_data.migrate_collection(FakeCollection(make_metadatas(4)), conn, batch_size=5)
+    conn.commit()
+    migrate_schema_v2.create_v2_table(conn, migrate_schema_v2.V2_TABLE_NAME)
+    conn.execute("INSERT INTO metingen_v2 SELECT " + migrate_schema_v2.V2_VALUES_SQL + " FROM metingen")
+    conn.execute("DROP TABLE metingen")
+    conn.execute("ALTER TABLE metingen_v2 RENAME TO metingen")
+    conn.commit()
+
+    # Een collectie met de vier oude en acht nieuwe records, aangevuld in de v2-tabel
+    migrated, skipped = migrate_data.migrate_collection(FakeCollection(make_metadatas(12)), conn,
+                                                        collection_name="tweede", batch_size=5)
+
+    assert (migrated, skipped) == (8, 4)
+    rows = conn.execute("SELECT timestamp, active_power_w, import_wh, export_wh FROM metingen ORDER BY timestamp").fetchall()
+    assert rows == [(1712000000 + 60 * i, 100 + i, 1000000 + 10 * i, 500000) for i in range(12)]
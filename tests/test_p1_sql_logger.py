@@ -0,0 +1,176 @@
+"""
+Tests voor de daemon-modus van termux/p1_sql_logger.py tegen een lokale http.server die /api/v1/data nabootst.
+"""
+import json
+import time
+import types
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import p1_sql_logger
+import migrate_schema_v2
+from conftest import create_v1_db
+
+class FakeMeter:
+    """
+    Een P1-meter op een vrije poort. Elke request geeft een hogere meterstand; `actions` koppelt het
+    volgnummer van een request aan een functie die vóór het antwoord in de serverthread wordt uitgevoerd,
+    `bodies` aan een afwijkend antwoord.
+    """
+
+    def __init__(self, actions=None, bodies=None):
+        self.requests = 0
+        self.actions = actions or {}
+        self.bodies = bodies or {}
+        meter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/api/v1/data":
+                    self.send_error(404)
+                    return
+                meter.requests += 1
+                action = meter.actions.get(meter.requests)
+                if action is not None:
+                    action()
+                body = json.dumps(meter.bodies.get(meter.requests, {
+                    "active_power_w": 100.0 + meter.requests,
+                    "total_power_import_kwh": 1000.0 + meter.requests * 0.001,
+                    "total_power_export_kwh": 500.0,
+                })).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/v1/data"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def logger_db(tmp_path):
+    path = str(tmp_path / "p1_data.db")
+    create_v1_db(path).close()
+    return path
+
+@pytest.fixture
+def traced_connections(monkeypatch):
+    """Telt de verbindingen van de daemon en legt de SQL-statements per verbinding vast."""
+    connections = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        statements = []
+        conn.set_trace_callback(statements.append)
+        connections.append(statements)
+        return conn
+
+    monkeypatch.setattr(p1_sql_logger.sqlite3, "connect", traced_connect)
+    return connections
+
+def run_daemon(meter, db_path, samples, batch_size=3, store_interval=0.001):
+    # Standaard is store_interval kleiner dan interval: elke meting gaat als eigen rij naar de database
+    p1_sql_logger.run_daemon(api_url=meter.url, db_path=db_path, interval=0.02, batch_size=batch_size,
+                             batch_seconds=60, max_samples=samples, store_interval=store_interval, recent_path=None)
+
+def stored_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM metingen").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_daemon_batches_inserts_on_one_connection(logger_db, traced_connections):
+    with FakeMeter() as meter:
+        run_daemon(meter, logger_db, samples=7)
+
+    # Eén verbinding voor de hele run; per batch van 3 één commit, plus de rest bij het stoppen
+    assert len(traced_connections) == 1
+    statements = traced_connections[0]
+    assert sum(1 for sql in statements if "INSERT" in sql) == 7
+    assert sum(1 for sql in statements if sql.strip().upper() == "COMMIT") == 3
+    assert meter.requests == 7
+    assert stored_rows(logger_db) == 7
+
+def test_daemon_keeps_rows_while_database_is_locked(logger_db, monkeypatch, capsys):
+    monkeypatch.setattr(p1_sql_logger, "DAEMON_BUSY_TIMEOUT_S", 0.01)
+    locker = sqlite3.connect(logger_db, isolation_level=None, check_same_thread=False)
+
+    # Een andere schrijver houdt de database bezet van request 2 tot en met 6; de batch na meting 3 moet wachten
+    actions = {2: lambda: locker.execute("BEGIN IMMEDIATE"), 7: lambda: locker.execute("ROLLBACK")}
+    with FakeMeter(actions) as meter:
+        run_daemon(meter, logger_db, samples=9)
+    locker.close()
+
+    output = capsys.readouterr().out
+    assert "Database bezet" in output
+    assert "9 metingen gelezen en 9 opgeslagen" in output
+    assert meter.requests == 9
+    assert stored_rows(logger_db) == 9
+
+def test_daemon_follows_schema_migration(logger_db, monkeypatch, capsys):
+    # Een vaste klok: elke meting 0.4 s na de vorige, dus acht metingen verdeeld over drie hele seconden
+    clock = iter(1712000000.0 + 0.4 * i for i in range(8))
+    monkeypatch.setattr(p1_sql_logger, "time", types.SimpleNamespace(
+        time=lambda: next(clock), monotonic=time.monotonic, sleep=time.sleep))
+    # Halverwege de run wordt de tabel naar schema v2 omgezet; de daemon moet het nieuwe schema herkennen
+    actions = {5: lambda: migrate_schema_v2.migrate_to_v2(logger_db)}
+    with FakeMeter(actions) as meter:
+        run_daemon(meter, logger_db, samples=8, batch_size=2)
+
+    output = capsys.readouterr().out
+    assert "Fout bij schrijven" not in output
+    assert "8 metingen gelezen en 8 opgeslagen" in output
+    # Bij de migratie stonden de eerste twee metingen (beide in seconde 0) in de database
+    assert "Zelfde seconde (samengevoegd):       1 rijen" in output
+    conn = sqlite3.connect(logger_db)
+    try:
+        assert "import_wh" in {row[1] for row in conn.execute("PRAGMA table_info(metingen)")}
+        # Metingen binnen dezelfde seconde worden in schema v2 samengevoegd tot de eerste
+        rows = conn.execute("SELECT timestamp, active_power_w FROM metingen ORDER BY timestamp").fetchall()
+    finally:
+        conn.close()
+    assert rows == [(1712000000, 101), (1712000001, 104), (1712000002, 106)]
+
+def test_daemon_stores_one_aggregate_per_slot(logger_db):
+    # Alle metingen vallen in één blok: één rij met het gemiddelde vermogen en de laatste meterstanden
+    with FakeMeter() as meter:
+        run_daemon(meter, logger_db, samples=5, store_interval=1e9)
+
+    conn = sqlite3.connect(logger_db)
+    try:
+        rows = conn.execute("SELECT active_power_w, total_power_import_kwh, total_power_export_kwh FROM metingen").fetchall()
+    finally:
+        conn.close()
+    assert rows == [(pytest.approx(103.0), pytest.approx(1000.005), 500.0)]
+
+def test_daemon_skips_response_that_is_not_an_object(logger_db, capsys):
+    with FakeMeter(bodies={2: [1, 2, 3]}) as meter:
+        run_daemon(meter, logger_db, samples=4)
+
+    output = capsys.readouterr().out
+    assert "Fout bij lezen API response: verwacht een JSON-object, kreeg list" in output
+    assert meter.requests == 5
+    assert stored_rows(logger_db) == 4
+
+@pytest.mark.parametrize("store_interval", [0, -10])
+def test_daemon_rejects_non_positive_store_interval(logger_db, store_interval):
+    with pytest.raises(ValueError):
+        p1_sql_logger.run_daemon(api_url="http://127.0.0.1:9/api/v1/data", db_path=logger_db,
+                                 store_interval=store_interval, recent_path=None)
@@ -0,0 +1,60 @@
+"""
+Controleert dat een warme refresh (één nieuwe meting) niet duurder wordt naarmate de meetgeschiedenis groeit:
+de rollups en de opgeslagen dagreeksen worden aangevuld zonder de hele tabel metingen te lezen of te tellen.
+De test telt SQLite VM-instructies in plaats van tijd; benchmarks/bench_refresh.py meet de tijd.
+"""
+import sqlite3
+
+import generate_P1_dashboard as g
+from conftest import create_v1_db
+
+SAMPLE_SECONDS = 120
+START_TS = 1704063600  # 1 januari 2024, lokale middernacht
+
+def fill_db(path, days):
+    conn = create_v1_db(path)
+    conn.execute("""
+        INSERT INTO metingen
+        WITH RECURSIVE r(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM r WHERE i < ?)
+        SELECT ? + i * ?, 200 + i % 97 * 10, 1000 + i * 0.002, 500 + i * 0.0005 FROM r
+    """, (days * 86400 // SAMPLE_SECONDS - 1, START_TS, SAMPLE_SECONDS))
+    conn.commit()
+    return conn
+
+def append_reading(conn):
+    ts, power, import_kwh, export_kwh = conn.execute(
+        "SELECT * FROM metingen ORDER BY timestamp DESC LIMIT 1").fetchone()
+    conn.execute("INSERT INTO metingen VALUES (?, ?, ?, ?)", (ts + SAMPLE_SECONDS, power, import_kwh + 0.002, export_kwh))
+    conn.commit()
+
+def measure_warm_refresh(path, output_path, days, monkeypatch):
+    """Retourneert het aantal SQLite VM-instructies van een warme refresh met een nieuwe engine."""
+    conn = fill_db(path, days)
+    monkeypatch.setattr(g, "get_db_path", lambda: path)
+    g.DashboardEngine(output_path).refresh()
+    append_reading(conn)
+    conn.close()
+
+    steps = [0]
+    def count_steps():
+        steps[0] += 1
+        return 0
+    connect = sqlite3.connect
+    def counting_connect(*args, **kwargs):
+        db = connect(*args, **kwargs)
+        db.set_progress_handler(count_steps, 100)
+        return db
+
+    # Een nieuwe engine begint vanaf de opgeslagen stand in de database, zoals na een herstart van de server
+    engine = g.DashboardEngine(output_path)
+    with monkeypatch.context() as patch:
+        patch.setattr(g.sqlite3, "connect", counting_connect)
+        engine.refresh()
+    return steps[0] * 100
+
+def test_warm_refresh_cost_is_flat(tmp_path, monkeypatch):
+    small_steps = measure_warm_refresh(str(tmp_path / "klein.db"), str(tmp_path / "klein" / "e.html"), 20, monkeypatch)
+    large_steps = measure_warm_refresh(str(tmp_path / "groot.db"), str(tmp_path / "groot" / "e.html"), 200, monkeypatch)
+
+    # Tien keer zoveel metingen: de SQL-kosten blijven gelijk (een telling van alle rijen zou ze vertienvoudigen)
+    assert large_steps < 1.5 * small_steps
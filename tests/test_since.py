@@ -0,0 +1,50 @@
+"""
+Tests voor het bijwerken van een geopende pagina: DashboardEngine.changes_since en /api/since.
+"""
+import pytest
+
+import generate_P1_dashboard as g
+from conftest import create_v1_db
+
+@pytest.fixture
+def engine(db_path, output_path, fixture_rows):
+    create_v1_db(db_path, fixture_rows).close()
+    engine = g.DashboardEngine(output_path)
+    engine.refresh()
+    return engine
+
+def complete_rows(rows):
+    return [row for row in rows if None not in row]
+
+def test_changes_since_returns_new_readings_and_periods(engine, fixture_rows):
+    rows = complete_rows(fixture_rows)
+    changes = engine.changes_since(rows[-6][0])
+
+    assert changes["reload"] is False
+    assert changes["ts"] == rows[-1][0]
+    assert [reading[0] for reading in changes["readings"]] == [row[0] for row in rows[-5:]]
+    # Zelfde eenheden als de rest van de pagina (active_w = active_power_w / 10, zie read_data_from_sqlite)
+    assert changes["readings"][-1] == [rows[-1][0], rows[-1][1] / 10.0, rows[-1][2], rows[-1][3]]
+    assert sorted(changes["periods"]) == ["day", "month", "week", "year", "years"]
+
+def test_changes_since_caps_readings_to_most_recent(engine, fixture_rows):
+    rows = complete_rows(fixture_rows)
+    changes = engine.changes_since(rows[-200][0], max_readings=10)
+
+    assert [reading[0] for reading in changes["readings"]] == [row[0] for row in rows[-10:]]
+
+def test_changes_since_asks_for_reload_after_long_gap(engine, fixture_rows):
+    changes = engine.changes_since(fixture_rows[-1][0] - 40 * 86400)
+
+    assert changes["reload"] is True
+    assert changes["readings"] == [] and changes["periods"] == {}
+
+def test_api_since(engine, fixture_rows, monkeypatch):
+    flask_http_server = pytest.importorskip("flask_http_server")
+    monkeypatch.setattr(flask_http_server, "engine", engine)
+    client = flask_http_server.app.test_client()
+
+    response = client.get(f"/api/since?ts={fixture_rows[-3][0]}")
+    assert response.status_code == 200
+    assert [reading[0] for reading in response.get_json()["readings"]] == [row[0] for row in complete_rows(fixture_rows)[-2:]]
+    assert client.get("/api/since?ts=nan").status_code == 400
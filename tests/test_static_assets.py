@@ -0,0 +1,39 @@
+"""
+Tests voor de statische bestanden van het dashboard: de meegeleverde Chart.js en de terugval op het CDN.
+"""
+import base64
+import hashlib
+
+import generate_P1_dashboard as g
+from conftest import create_v1_db
+
+def test_vendored_chartjs_matches_pinned_hashes():
+    with open(g.CHARTJS_VENDOR_FILE, "rb") as f:
+        chartjs = f.read()
+    assert chartjs.startswith(b"/*!\n * Chart.js v4.5.1\n")
+    assert hashlib.sha256(chartjs).hexdigest() == g.CHARTJS_VENDOR_SHA256
+    # Het CDN moet precies hetzelfde bestand leveren
+    assert g.CHARTJS_CDN_INTEGRITY == "sha384-" + base64.b64encode(hashlib.sha384(chartjs).digest()).decode()
+    assert "@4.5.1/" in g.CHARTJS_CDN_URL
+
+def read_chart_tag(output_path):
+    with open(output_path, encoding="utf-8") as f:
+        return next(line.strip() for line in f if "<script" in line and "chart" in line.lower())
+
+def test_shell_serves_vendored_chartjs(db_path, output_path, fixture_rows):
+    create_v1_db(db_path, fixture_rows).close()
+    g.DashboardEngine(output_path).refresh()
+
+    assert read_chart_tag(output_path) == f'<script src="static/chart.umd.{g.CHARTJS_VENDOR_SHA256[:12]}.js"></script>'
+
+def test_cdn_fallback_has_integrity(db_path, output_path, fixture_rows, tmp_path, monkeypatch, capsys):
+    # Een gewijzigd bestand wordt niet geserveerd; de pagina laadt Chart.js van het CDN met SRI
+    tampered = tmp_path / "chart.umd.js"
+    tampered.write_bytes(b"window.Chart = null;")
+    monkeypatch.setattr(g, "CHARTJS_VENDOR_FILE", str(tampered))
+    create_v1_db(db_path, fixture_rows).close()
+    g.DashboardEngine(output_path).refresh()
+
+    assert "niet de verwachte SHA-256" in capsys.readouterr().out
+    assert read_chart_tag(output_path) == (f'<script src="{g.CHARTJS_CDN_URL}" integrity="{g.CHARTJS_CDN_INTEGRITY}" '
+                                           f'crossorigin="anonymous"></script>')